@@ -0,0 +1,131 @@
+#============================================================================================
+#   Name        :   benchmark_datastore.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Builds synthetic tag maps of different register counts
+#                   2.  Times one publish tick into the pymodbus list datastore (one
+#                       setValues call per contiguous run) and into the numpy datastore
+#                       (one assignment and a buffer swap)
+#                   3.  Times a 125 register client read from each datastore
+#                   4.  Prints a comparison table
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import frame_engine
+from core import numpy_datastore
+from pymodbus.datastore import ModbusSlaveContext
+import pandas as pd
+import numpy as np
+import time
+
+#Variable definition
+LIST_REGISTER_COUNTS    =   [1000, 10000, 60000]
+INT_RUN_LENGTH          =   100
+INT_GAP_LENGTH          =   1
+INT_TIMESTEPS           =   60
+INT_TICKS               =   20
+INT_READ_COUNT          =   125
+INT_READS               =   2000
+
+#Function Definitions
+def build_frame_engine(int_register_count):
+
+    #=====================================================================================
+    #   Function Name  :  build_frame_engine
+    #   Description    :  Builds a frame engine for a synthetic tag map made of runs of
+    #                     INT_RUN_LENGTH registers separated by INT_GAP_LENGTH addresses
+    #=====================================================================================
+
+    #Addresses laid out in runs with gaps between them
+    arr_index               =   np.arange(int_register_count)
+    arr_addresses           =   arr_index + (arr_index // INT_RUN_LENGTH) * INT_GAP_LENGTH
+    dict_server_tag_list    =   {f"TAG_{int_tag}": int(int_address) for int_tag, int_address in zip(arr_index, arr_addresses)}
+
+    #Synthetic data table
+    arr_values              =   (np.arange(INT_TIMESTEPS)[:, None] + arr_index[None, :]) % 60
+    df_server_data          =   pd.DataFrame(arr_values, columns=list(dict_server_tag_list.keys()))
+
+    return frame_engine.DataSimFrameEngine().load_frames(df_server_data=df_server_data, dict_server_tag_list=dict_server_tag_list)
+
+def time_ticks(obj_frame_engine, bool_numpy):
+
+    #=====================================================================================
+    #   Function Name  :  time_ticks
+    #   Description    :  Publishes INT_TICKS frames and returns the store and the mean
+    #                     tick time in milliseconds
+    #=====================================================================================
+
+    int_fc          =   utils.DEFAULT_HOLDING_REG_FUNCTION_CODE_HEX
+
+    if bool_numpy:
+        obj_store   =   numpy_datastore.create_numpy_slave_context()
+        obj_store.store['h'].set_layout(arr_addresses=obj_frame_engine.arr_addresses)
+    else:
+        obj_store   =   ModbusSlaveContext()
+
+    float_start     =   time.perf_counter()
+
+    for _ in range(INT_TICKS):
+
+        arr_frame   =   obj_frame_engine.next_frame()
+
+        if bool_numpy:
+            obj_store.store['h'].publish(arr_frame=arr_frame)
+        else:
+            for int_start_address, int_start_column, int_end_column in obj_frame_engine.list_runs:
+                obj_store.setValues(int_fc, int_start_address, arr_frame[int_start_column:int_end_column].tolist())
+
+    return obj_store, (time.perf_counter() - float_start) * 1000 / INT_TICKS
+
+def time_reads(obj_store, int_register_count):
+
+    #=====================================================================================
+    #   Function Name  :  time_reads
+    #   Description    :  Returns the mean time of a INT_READ_COUNT register read in
+    #                     microseconds, reads are spread over the register range
+    #=====================================================================================
+
+    int_fc          =   utils.DEFAULT_HOLDING_REG_FUNCTION_CODE_HEX
+    list_starts     =   np.random.default_rng(0).integers(0, max(int_register_count - INT_READ_COUNT, 1), INT_READS).tolist()
+
+    float_start     =   time.perf_counter()
+
+    for int_start_address in list_starts:
+        obj_store.getValues(int_fc, int_start_address, INT_READ_COUNT)
+
+    return (time.perf_counter() - float_start) * 1e6 / INT_READS
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Prints the tick and read times for each register count
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*19}\n{' '*2}Datastore Benchmark\n{'='*19}")
+    print(f"\n{'Registers':>10} {'Runs':>6} {'List Tick (ms)':>15} {'Numpy Tick (ms)':>16} {'Speedup':>8} {'List Read (us)':>15} {'Numpy Read (us)':>16}")
+
+    for int_register_count in LIST_REGISTER_COUNTS:
+
+        obj_frame_engine                =   build_frame_engine(int_register_count)
+        obj_list_store, float_list_ms   =   time_ticks(obj_frame_engine, False)
+        obj_numpy_store, float_numpy_ms =   time_ticks(obj_frame_engine, True)
+        float_list_read_us              =   time_reads(obj_list_store, int_register_count)
+        float_numpy_read_us             =   time_reads(obj_numpy_store, int_register_count)
+
+        print(f"{int_register_count:>10} {len(obj_frame_engine.list_runs):>6} {float_list_ms:>15.3f} {float_numpy_ms:>16.3f} {float_list_ms/float_numpy_ms:>7.1f}x {float_list_read_us:>15.1f} {float_numpy_read_us:>16.1f}")
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Function Call
+    run_benchmark()
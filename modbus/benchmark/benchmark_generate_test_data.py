@@ -0,0 +1,117 @@
+#============================================================================================
+#   Name        :   benchmark_generate_test_data.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Writes synthetic tag lists (all data types, integer and float
+#                       scaling) to a temporary folder
+#                   2.  Generates the test data of each one in a fresh process
+#                   3.  Prints the throughput in rows/s and cells/s, the CSV size and
+#                       the peak RSS of the generating process
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","simulator"))
+
+#Import libraries
+import generate_test_data
+import pandas as pd
+import numpy as np
+import subprocess
+import tempfile
+import resource
+import json
+import time
+
+#Variable definition
+LIST_CASES                  =   [
+                                    #(tags, duration, sample period)
+                                    (13, '1D', '1s'),
+                                    (1000, '1h', '1s'),
+                                    (10000, '1h', '1s'),
+                                    (100000, '5min', '1s')
+                                ]
+LIST_DATA_TYPES             =   list(generate_test_data.DICT_BASE_MODELS.keys())
+
+#Function Definitions
+def write_tag_list(str_tag_list_filepath, int_tag_count):
+
+    #=====================================================================================
+    #   Function Name  :  write_tag_list
+    #   Description    :  Writes a synthetic tag list cycling through the data types,
+    #                     every tenth tag has a float scaling
+    #=====================================================================================
+
+    arr_tags    =   np.arange(int_tag_count)
+    pd.DataFrame({
+                    'address'   :   arr_tags,
+                    'name'      :   [f"TAG {int_tag}" for int_tag in arr_tags],
+                    'data type' :   [LIST_DATA_TYPES[int_tag % len(LIST_DATA_TYPES)] for int_tag in arr_tags],
+                    'scaling'   :   np.where(arr_tags % 10 == 0, 0.1, 1.0),
+                    'offset'    :   arr_tags % 7
+                }).to_csv(str_tag_list_filepath, index=False)
+
+def measure(str_tag_list_filepath, str_duration, str_sample_period):
+
+    #=====================================================================================
+    #   Function Name  :  measure
+    #   Description    :  Generates the data in this process and prints the time, the
+    #                     row count, the output size and the peak RSS as JSON
+    #=====================================================================================
+
+    str_output_path =   str_tag_list_filepath.replace('.csv', '_data.csv')
+
+    float_start     =   time.perf_counter()
+    int_row_count   =   generate_test_data.generate_tag_data(str_tag_list_filepath, str_output_path, str_duration=str_duration, str_sample_period=str_sample_period)
+    float_seconds   =   time.perf_counter() - float_start
+
+    print(json.dumps({
+                        'float_seconds'     :   float_seconds,
+                        'int_row_count'     :   int_row_count,
+                        'int_output_bytes'  :   os.path.getsize(str_output_path),
+                        'int_peak_rss_bytes':   resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+                    }))
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Runs measure in a fresh process for every case
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*30}\n{' '*1}Generate Test Data Benchmark\n{'='*30}")
+    print(f"\n{'Tags':>8} {'Duration':>9} {'Period':>7} {'Rows':>8} {'Cells':>11} {'Time (s)':>9} {'Rows/s':>10} {'Cells/s':>12} {'CSV (MiB)':>10} {'Peak RSS (MiB)':>15}")
+
+    with tempfile.TemporaryDirectory() as str_folder:
+
+        for int_tag_count, str_duration, str_sample_period in LIST_CASES:
+
+            str_tag_list_filepath   =   os.path.join(str_folder, f"bench_{int_tag_count}_tag_list.csv")
+            write_tag_list(str_tag_list_filepath, int_tag_count)
+
+            str_output  =   subprocess.run  (
+                                                [sys.executable, os.path.abspath(__file__), str_tag_list_filepath, str_duration, str_sample_period],
+                                                capture_output  =   True,
+                                                text            =   True,
+                                                check           =   True
+                                            ).stdout
+            dict_result =   json.loads(str_output.strip().splitlines()[-1])
+            int_cells   =   dict_result['int_row_count'] * int_tag_count
+
+            print(f"{int_tag_count:>8} {str_duration:>9} {str_sample_period:>7} {dict_result['int_row_count']:>8} {int_cells:>11} {dict_result['float_seconds']:>9.2f} "
+                  f"{dict_result['int_row_count']/dict_result['float_seconds']:>10.0f} {int_cells/dict_result['float_seconds']:>12.0f} "
+                  f"{dict_result['int_output_bytes']/2**20:>10.1f} {dict_result['int_peak_rss_bytes']/2**20:>15.1f}")
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Measure a single case when called with arguments
+    if len(sys.argv) == 4:
+        measure(sys.argv[1], sys.argv[2], sys.argv[3])
+    else:
+        run_benchmark()
@@ -0,0 +1,104 @@
+#============================================================================================
+#   Name        :   benchmark_load.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Starts a simulator on a localhost port in a separate process
+#                   2.  Runs the Modbus TCP load generator against it for growing
+#                       connection counts, at a fixed polling rate and unthrottled
+#                   3.  Prints the achieved requests/s, registers/s, latency percentiles,
+#                       timeouts and wire bandwidth of every case
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from client import load_generator
+import subprocess
+import socket
+import time
+
+#Variable definition
+STR_ASSET_TYPE          =   'bms'
+INT_PORT                =   5599
+STR_RANGES              =   '0:12'
+LIST_CASES              =   [
+                                #(connections, requests/s per connection, 0 is unthrottled)
+                                (1, 10.0),
+                                (10, 10.0),
+                                (100, 10.0),
+                                (1, 0),
+                                (10, 0),
+                                (100, 0)
+                            ]
+FLOAT_DURATION          =   10.0
+FLOAT_STARTUP_TIMEOUT   =   120.0
+
+#Function Definitions
+def start_simulator():
+
+    #=====================================================================================
+    #   Function Name  :  start_simulator
+    #   Description    :  Starts the simulator and waits until its port accepts
+    #                     connections
+    #=====================================================================================
+
+    obj_process     =   subprocess.Popen    (
+                                                [sys.executable, os.path.join(os.sep,"ess_datasim","modbus","simulator","start.py"), '--asset', STR_ASSET_TYPE, '--port', str(INT_PORT)],
+                                                stdout  =   subprocess.DEVNULL,
+                                                stderr  =   subprocess.DEVNULL
+                                            )
+    float_deadline  =   time.monotonic() + FLOAT_STARTUP_TIMEOUT
+
+    while time.monotonic() < float_deadline:
+        try:
+            socket.create_connection(('127.0.0.1', INT_PORT), timeout=1).close()
+            return obj_process
+        except OSError:
+            time.sleep(0.5)
+
+    obj_process.kill()
+    raise RuntimeError(f"Simulator did not start on port {INT_PORT}")
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Prints the load test results of every case
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*18}\n{' '*2}Load Benchmark\n{'='*18}")
+    print(f"\n{'Conns':>6} {'Target/s':>9} {'Req/s':>8} {'Regs/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Max (ms)':>9} {'Timeouts':>9} {'Mbit/s':>7}")
+
+    obj_process     =   start_simulator()
+
+    try:
+        for int_connection_count, float_rate in LIST_CASES:
+
+            dict_summary    =   load_generator.DataSimLoadGenerator (
+                                                                        str_targets             =   f"127.0.0.1:{INT_PORT}",
+                                                                        str_ranges              =   STR_RANGES,
+                                                                        int_connection_count    =   int_connection_count,
+                                                                        float_rate              =   float_rate,
+                                                                        float_duration          =   FLOAT_DURATION
+                                                                    ).run()
+            str_target      =   f"{float_rate * int_connection_count:.0f}" if float_rate else 'max'
+
+            print(f"{int_connection_count:>6} {str_target:>9} {dict_summary['float_requests_per_s']:>8.0f} {dict_summary['float_registers_per_s']:>9.0f} "
+                  f"{dict_summary['float_latency_p50_ms'] or 0:>9.2f} {dict_summary['float_latency_p99_ms'] or 0:>9.2f} {dict_summary['float_latency_max_ms'] or 0:>9.2f} "
+                  f"{dict_summary['int_timeouts']:>9} {dict_summary['float_wire_bits_per_s']/1e6:>7.3f}")
+
+    finally:
+        obj_process.terminate()
+        obj_process.wait()
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Function Call
+    run_benchmark()
@@ -0,0 +1,101 @@
+#============================================================================================
+#   Name        :   benchmark_multi_device.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Builds a multi-device server (one store per unit ID) in a fresh
+#                       process for each device count and registers per device
+#                   2.  Measures the tags served per process, the process RSS, the RSS
+#                       added per 1k tags and the time of one batched publish tick
+#                   3.  Prints a comparison table
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import frame_engine
+from core import modbus_server
+import pandas as pd
+import numpy as np
+import subprocess
+import json
+import time
+
+#Variable definition
+LIST_REGISTERS_PER_DEVICE   =   [13, 1000]
+LIST_DEVICE_COUNTS          =   [1, 10, 100, 247]
+INT_TIMESTEPS               =   60
+INT_TICKS                   =   10
+
+#Function Definitions
+def measure(int_registers_per_device, int_device_count):
+
+    #=====================================================================================
+    #   Function Name  :  measure
+    #   Description    :  Builds the server in this process and prints the RSS growth
+    #                     and the mean tick time as JSON
+    #=====================================================================================
+
+    obj_utils               =   utils.DataSimUtils()
+    int_rss_start           =   obj_utils.get_rss_bytes()
+
+    #Synthetic tag map and data table
+    dict_server_tag_list    =   {f"TAG_{int_tag}": int_tag for int_tag in range(int_registers_per_device)}
+    arr_values              =   (np.arange(INT_TIMESTEPS)[:, None] + np.arange(int_registers_per_device)[None, :]) % 60
+    df_server_data          =   pd.DataFrame(arr_values, columns=list(dict_server_tag_list.keys()))
+
+    #Frame engine and multi-device server
+    obj_frame_engine        =   frame_engine.DataSimFrameEngine().load_frames(df_server_data=df_server_data, dict_server_tag_list=dict_server_tag_list)
+    obj_frame_engine.set_devices(int_device_count=int_device_count)
+    obj_modbus_server       =   modbus_server.DataSimModbus (
+                                                                list_unit_ids       =   list(range(1, int_device_count + 1)),
+                                                                int_register_count  =   int_registers_per_device
+                                                            )
+
+    #Time the batched publish
+    obj_modbus_server.set_register_layout(arr_addresses=obj_frame_engine.arr_addresses)
+    float_start             =   time.perf_counter()
+    for _ in range(INT_TICKS):
+        obj_modbus_server.publish_frames(arr_device_frames=obj_frame_engine.next_frames())
+    float_tick_ms           =   (time.perf_counter() - float_start) * 1000 / INT_TICKS
+
+    print(json.dumps({'int_rss_bytes': obj_utils.get_rss_bytes() - int_rss_start, 'int_process_rss_bytes': obj_utils.get_rss_bytes(), 'float_tick_ms': float_tick_ms}))
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Runs measure in a fresh process for every case
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*24}\n{' '*1}Multi Device Benchmark\n{'='*24}")
+    print(f"\n{'Regs/Dev':>9} {'Devices':>8} {'Tags':>8} {'Process RSS (MiB)':>18} {'Added RSS (MiB)':>16} {'Added RSS/1k Tags (KiB)':>24} {'Tick (ms)':>10}")
+
+    for int_registers_per_device in LIST_REGISTERS_PER_DEVICE:
+        for int_device_count in LIST_DEVICE_COUNTS:
+
+            str_output  =   subprocess.run  (
+                                                [sys.executable, os.path.abspath(__file__), str(int_registers_per_device), str(int_device_count)],
+                                                capture_output  =   True,
+                                                text            =   True,
+                                                check           =   True
+                                            ).stdout
+            dict_result =   json.loads(str_output.strip().splitlines()[-1])
+            int_tags    =   int_registers_per_device * int_device_count
+
+            print(f"{int_registers_per_device:>9} {int_device_count:>8} {int_tags:>8} {dict_result['int_process_rss_bytes']/2**20:>18.1f} {dict_result['int_rss_bytes']/2**20:>16.2f} {dict_result['int_rss_bytes']/1024/(int_tags/1000):>24.1f} {dict_result['float_tick_ms']:>10.3f}")
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Measure a single case when called with arguments
+    if len(sys.argv) == 3:
+        measure(int(sys.argv[1]), int(sys.argv[2]))
+    else:
+        run_benchmark()
@@ -0,0 +1,102 @@
+#============================================================================================
+#   Name        :   benchmark_register_writes.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Builds synthetic tag maps of different register counts
+#                   2.  Times one publish tick with one setValues call per register
+#                   3.  Times one publish tick with one setValues call per contiguous run
+#                   4.  Prints a tick time comparison table
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import frame_engine
+from pymodbus.datastore import ModbusSlaveContext
+import pandas as pd
+import numpy as np
+import time
+
+#Variable definition
+LIST_REGISTER_COUNTS    =   [100, 1000, 10000, 50000]
+INT_RUN_LENGTH          =   100
+INT_GAP_LENGTH          =   10
+INT_TIMESTEPS           =   60
+INT_TICKS               =   20
+
+#Function Definitions
+def build_frame_engine(int_register_count):
+
+    #=====================================================================================
+    #   Function Name  :  build_frame_engine
+    #   Description    :  Builds a frame engine for a synthetic tag map made of runs of
+    #                     INT_RUN_LENGTH registers separated by INT_GAP_LENGTH addresses
+    #=====================================================================================
+
+    #Addresses laid out in runs with gaps between them
+    arr_index               =   np.arange(int_register_count)
+    arr_addresses           =   arr_index + (arr_index // INT_RUN_LENGTH) * INT_GAP_LENGTH
+    dict_server_tag_list    =   {f"TAG_{int_tag}": int(int_address) for int_tag, int_address in zip(arr_index, arr_addresses)}
+
+    #Synthetic data table
+    arr_values              =   (np.arange(INT_TIMESTEPS)[:, None] + arr_index[None, :]) % 60
+    df_server_data          =   pd.DataFrame(arr_values, columns=list(dict_server_tag_list.keys()))
+
+    return frame_engine.DataSimFrameEngine().load_frames(df_server_data=df_server_data, dict_server_tag_list=dict_server_tag_list)
+
+def time_ticks(obj_frame_engine, bool_coalesce):
+
+    #=====================================================================================
+    #   Function Name  :  time_ticks
+    #   Description    :  Returns the mean tick time in milliseconds
+    #=====================================================================================
+
+    obj_store       =   ModbusSlaveContext()
+    int_fc          =   utils.DEFAULT_HOLDING_REG_FUNCTION_CODE_HEX
+    list_addresses  =   obj_frame_engine.arr_addresses.tolist()
+
+    float_start     =   time.perf_counter()
+
+    for _ in range(INT_TICKS):
+
+        arr_frame   =   obj_frame_engine.next_frame()
+
+        if bool_coalesce:
+            for int_start_address, int_start_column, int_end_column in obj_frame_engine.list_runs:
+                obj_store.setValues(int_fc, int_start_address, arr_frame[int_start_column:int_end_column].tolist())
+        else:
+            for int_reg_address, int_reg_value in zip(list_addresses, arr_frame.tolist()):
+                obj_store.setValues(int_fc, int_reg_address, [int_reg_value])
+
+    return (time.perf_counter() - float_start) * 1000 / INT_TICKS
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Prints the tick time for each register count
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*24}\n{' '*2}Register Write Benchmark\n{'='*24}")
+    print(f"\n{'Registers':>10} {'Runs':>6} {'Per Register (ms)':>18} {'Per Run (ms)':>13} {'Speedup':>8}")
+
+    for int_register_count in LIST_REGISTER_COUNTS:
+
+        obj_frame_engine        =   build_frame_engine(int_register_count)
+        float_per_register_ms   =   time_ticks(obj_frame_engine, False)
+        float_per_run_ms        =   time_ticks(obj_frame_engine, True)
+
+        print(f"{int_register_count:>10} {len(obj_frame_engine.list_runs):>6} {float_per_register_ms:>18.3f} {float_per_run_ms:>13.3f} {float_per_register_ms/float_per_run_ms:>7.1f}x")
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Function Call
+    run_benchmark()
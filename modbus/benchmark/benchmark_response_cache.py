@@ -0,0 +1,127 @@
+#============================================================================================
+#   Name        :   benchmark_response_cache.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Starts a simulator on a localhost port in a separate process, with
+#                       and without the response cache
+#                   2.  Runs the unthrottled Modbus TCP load generator against it, so many
+#                       connections read the same ranges within every tick
+#                   3.  Prints the achieved requests/s, latency percentiles and the cache
+#                       hit ratio of every case
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from client import load_generator
+import urllib.request
+import subprocess
+import socket
+import time
+
+#Variable definition
+STR_ASSET_TYPE          =   'bms'
+INT_PORT                =   5598
+INT_METRICS_PORT        =   9598
+STR_RANGES              =   '0:11,0:124'
+LIST_CONNECTION_COUNTS  =   [1, 10, 100]
+FLOAT_DURATION          =   10.0
+FLOAT_STARTUP_TIMEOUT   =   120.0
+
+#Function Definitions
+def start_simulator(bool_response_cache):
+
+    #=====================================================================================
+    #   Function Name  :  start_simulator
+    #   Description    :  Starts the simulator and waits until its port accepts
+    #                     connections
+    #=====================================================================================
+
+    list_args       =   ['--asset', STR_ASSET_TYPE, '--port', str(INT_PORT), '--metrics_port', str(INT_METRICS_PORT)]
+    if bool_response_cache:
+        list_args   +=  ['--response_cache']
+
+    obj_process     =   subprocess.Popen    (
+                                                [sys.executable, os.path.join(os.sep,"ess_datasim","modbus","simulator","start.py")] + list_args,
+                                                stdout  =   subprocess.DEVNULL,
+                                                stderr  =   subprocess.DEVNULL
+                                            )
+    float_deadline  =   time.monotonic() + FLOAT_STARTUP_TIMEOUT
+
+    while time.monotonic() < float_deadline:
+        try:
+            socket.create_connection(('127.0.0.1', INT_PORT), timeout=1).close()
+            return obj_process
+        except OSError:
+            time.sleep(0.5)
+
+    obj_process.kill()
+    raise RuntimeError(f"Simulator did not start on port {INT_PORT}")
+
+def get_cache_counters():
+
+    #=====================================================================================
+    #   Function Name  :  get_cache_counters
+    #   Description    :  Returns the cache hits and misses scraped from the metrics
+    #                     endpoint, zeros without the cache
+    #=====================================================================================
+
+    dict_counters   =   {'essds_response_cache_hits_total': 0, 'essds_response_cache_misses_total': 0}
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{INT_METRICS_PORT}/metrics", timeout=5) as obj_response:
+        for str_line in obj_response.read().decode().splitlines():
+            list_fields     =   str_line.split()
+            if len(list_fields) == 2 and list_fields[0] in dict_counters:
+                dict_counters[list_fields[0]]   =   int(float(list_fields[1]))
+
+    return dict_counters['essds_response_cache_hits_total'], dict_counters['essds_response_cache_misses_total']
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Prints the load test results with and without the cache
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*28}\n{' '*2}Response Cache Benchmark\n{'='*28}")
+    print(f"\n{'Cache':>6} {'Conns':>6} {'Req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Max (ms)':>9} {'Timeouts':>9} {'Hit %':>6}")
+
+    for bool_response_cache in [False, True]:
+
+        obj_process     =   start_simulator(bool_response_cache)
+
+        try:
+            for int_connection_count in LIST_CONNECTION_COUNTS:
+
+                int_hits_start, int_misses_start    =   get_cache_counters()
+                dict_summary    =   load_generator.DataSimLoadGenerator (
+                                                                            str_targets             =   f"127.0.0.1:{INT_PORT}",
+                                                                            str_ranges              =   STR_RANGES,
+                                                                            int_connection_count    =   int_connection_count,
+                                                                            float_rate              =   0,
+                                                                            float_duration          =   FLOAT_DURATION
+                                                                        ).run()
+                int_hits, int_misses                =   get_cache_counters()
+                int_hits                            -=  int_hits_start
+                int_misses                          -=  int_misses_start
+                float_hit_ratio =   100 * int_hits / (int_hits + int_misses) if int_hits + int_misses else 0.0
+
+                print(f"{'on' if bool_response_cache else 'off':>6} {int_connection_count:>6} {dict_summary['float_requests_per_s']:>8.0f} "
+                      f"{dict_summary['float_latency_p50_ms'] or 0:>9.2f} {dict_summary['float_latency_p99_ms'] or 0:>9.2f} {dict_summary['float_latency_max_ms'] or 0:>9.2f} "
+                      f"{dict_summary['int_timeouts']:>9} {float_hit_ratio:>6.1f}")
+
+        finally:
+            obj_process.terminate()
+            obj_process.wait()
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Function Call
+    run_benchmark()
@@ -0,0 +1,153 @@
+#============================================================================================
+#   Name        :   benchmark_shared_frames.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Writes a synthetic tag list and tag data CSV to a temporary folder
+#                   2.  Starts several simulator-like processes of the same asset at once,
+#                       each either parsing the CSVs itself or attaching to the shared
+#                       frames segment published by the first one
+#                   3.  Measures the frame load time and the private memory added by each
+#                       process and prints a comparison table
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import frame_engine
+from core import shared_frames
+import pandas as pd
+import numpy as np
+import subprocess
+import tempfile
+import json
+import time
+import logging
+
+#Variable definition
+STR_ASSET_TYPE              =   'bench'
+INT_REGISTERS               =   2000
+INT_TIMESTEPS               =   3600
+INT_PROCESSES               =   4
+
+#Function Definitions
+def get_private_bytes():
+
+    #=====================================================================================
+    #   Function Name  :  get_private_bytes
+    #   Description    :  Returns the private (not shared) resident bytes of this process
+    #=====================================================================================
+
+    int_private_bytes   =   0
+    with open('/proc/self/smaps_rollup') as obj_file:
+        for str_line in obj_file:
+            if str_line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                int_private_bytes   +=  int(str_line.split()[1]) * 1024
+
+    return int_private_bytes
+
+def write_csvs(str_filepath):
+
+    #=====================================================================================
+    #   Function Name  :  write_csvs
+    #   Description    :  Writes the synthetic tag list and tag data CSVs
+    #=====================================================================================
+
+    list_tag_names  =   [f"TAG {int_tag}" for int_tag in range(INT_REGISTERS)]
+    arr_values      =   (np.arange(INT_TIMESTEPS)[:, None] + np.arange(INT_REGISTERS)[None, :]) % 1000
+
+    pd.DataFrame({'address': range(INT_REGISTERS), 'name': list_tag_names}).to_csv(os.path.join(str_filepath, STR_ASSET_TYPE+"_tag_list.csv"), index=False)
+    pd.DataFrame(arr_values, columns=list_tag_names).to_csv(os.path.join(str_filepath, STR_ASSET_TYPE+"_tag_data_auto_gen.csv"), index=False)
+
+def measure(str_filepath, bool_shared_frames):
+
+    #=====================================================================================
+    #   Function Name  :  measure
+    #   Description    :  Loads the frames in this process, prints the load time and the
+    #                     private memory added as JSON, then holds the frames until stdin
+    #                     is closed so the other processes can attach
+    #=====================================================================================
+
+    obj_utils           =   utils.DataSimUtils()
+    obj_frame_engine    =   frame_engine.DataSimFrameEngine()
+
+    def load_frames_from_csv():
+        df_server_data          =   pd.read_csv(os.path.join(str_filepath, STR_ASSET_TYPE+"_tag_data_auto_gen.csv"))
+        dict_server_tag_list    =   obj_utils.get_server_tag_list(str_filepath=str_filepath, str_asset_type=STR_ASSET_TYPE, obj_logger=logging.getLogger())
+        obj_frame_engine.load_frames(df_server_data=df_server_data, dict_server_tag_list=dict_server_tag_list)
+        return obj_frame_engine.arr_addresses, obj_frame_engine.arr_frames
+
+    int_private_start   =   get_private_bytes()
+    float_start         =   time.perf_counter()
+
+    if bool_shared_frames:
+        obj_shared_frames           =   shared_frames.DataSimSharedFrames(str_asset_type=STR_ASSET_TYPE, str_filepath=str_filepath)
+        arr_addresses, arr_frames   =   obj_shared_frames.attach_or_publish(func_build_frames=load_frames_from_csv)
+        obj_frame_engine.set_frames(arr_addresses=arr_addresses, arr_frames=arr_frames)
+        bool_published              =   obj_shared_frames.bool_published
+    else:
+        load_frames_from_csv()
+        bool_published              =   True
+
+    float_load_ms       =   (time.perf_counter() - float_start) * 1000
+
+    #Touch every frame like the publish loop does over one table cycle
+    int_checksum        =   int(obj_frame_engine.arr_frames.sum(dtype=np.int64))
+
+    print(json.dumps({'float_load_ms': float_load_ms, 'int_private_bytes': get_private_bytes() - int_private_start, 'bool_published': bool_published, 'int_checksum': int_checksum}), flush=True)
+
+    #Hold the frames until the benchmark is done
+    sys.stdin.read()
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Runs INT_PROCESSES concurrent processes per mode
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*24}\n{' '*1}Shared Frames Benchmark\n{'='*24}")
+    print(f"\n{INT_PROCESSES} processes, {INT_TIMESTEPS} timesteps x {INT_REGISTERS} registers ({INT_TIMESTEPS*INT_REGISTERS*2/2**20:.1f} MiB of frames)")
+    print(f"\n{'Mode':>8} {'Process':>8} {'Role':>10} {'Load (ms)':>10} {'Private Added (MiB)':>20}")
+
+    with tempfile.TemporaryDirectory() as str_filepath:
+
+        write_csvs(str_filepath)
+
+        for bool_shared_frames in [False, True]:
+
+            list_processes  =   []
+            for int_process in range(INT_PROCESSES):
+
+                #Start one at a time so the first one publishes
+                obj_process =   subprocess.Popen(
+                                                    [sys.executable, os.path.abspath(__file__), str_filepath, str(int(bool_shared_frames))],
+                                                    stdin   =   subprocess.PIPE,
+                                                    stdout  =   subprocess.PIPE,
+                                                    text    =   True
+                                                )
+                dict_result =   json.loads(obj_process.stdout.readline())
+                list_processes.append(obj_process)
+
+                str_role    =   ('publish' if dict_result['bool_published'] else 'attach') if bool_shared_frames else 'parse'
+                print(f"{'shared' if bool_shared_frames else 'private':>8} {int_process:>8} {str_role:>10} {dict_result['float_load_ms']:>10.1f} {dict_result['int_private_bytes']/2**20:>20.2f}")
+
+            #Release all processes
+            for obj_process in list_processes:
+                obj_process.stdin.close()
+                obj_process.wait()
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Measure a single process when called with arguments
+    if len(sys.argv) == 3:
+        measure(sys.argv[1], bool(int(sys.argv[2])))
+    else:
+        run_benchmark()
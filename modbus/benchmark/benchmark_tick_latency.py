@@ -0,0 +1,177 @@
+#============================================================================================
+#   Name        :   benchmark_tick_latency.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Serves a large procedural signal map (many devices, many tags)
+#                       in a separate process, with the frames computed on the event
+#                       loop and prepared ahead in the frame worker thread
+#                   2.  Polls it with the Modbus TCP load generator at a fixed rate, so
+#                       a share of the requests arrives while a tick is computed
+#                   3.  Prints the tick time and the client latency percentiles of both
+#                       modes, the tick spikes show up in p99 and above
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import signal_source
+from core import modbus_server
+from client import load_generator
+import logging
+import tempfile
+import subprocess
+import socket
+import time
+
+#Variable definition
+INT_PORT                =   5598
+INT_TAGS                =   1000
+INT_DEVICES             =   100
+FLOAT_PUBLISH_INTERVAL  =   0.2
+INT_CONNECTIONS         =   10
+FLOAT_RATE              =   50.0
+FLOAT_DURATION          =   15.0
+STR_RANGES              =   '0:124'
+FLOAT_STARTUP_TIMEOUT   =   60.0
+INT_TICKS               =   20
+
+#Function Definitions
+def build_server():
+
+    #=====================================================================================
+    #   Function Name  :  build_server
+    #   Description    :  Returns a signal source of INT_DEVICES devices of INT_TAGS
+    #                     random walk tags with noise and a multi-device server for it
+    #=====================================================================================
+
+    #Synthetic tag list
+    str_tag_list_filepath   =   os.path.join(tempfile.mkdtemp(), 'benchmark_tag_list.csv')
+    with open(str_tag_list_filepath, 'w') as obj_file:
+        obj_file.write("address,name,data type,scaling,offset,waveform,amplitude,period,noise\n")
+        for int_tag in range(INT_TAGS):
+            obj_file.write(f"{int_tag},TAG_{int_tag},Short,1,0,random_walk,1000,60,5\n")
+
+    #Signal source and multi-device server
+    obj_frame_engine        =   signal_source.DataSimSignalSource(
+                                                                    str_tag_list_filepath   =   str_tag_list_filepath,
+                                                                    dict_server_tag_list    =   {f"TAG_{int_tag}": int_tag for int_tag in range(INT_TAGS)}
+                                                                )
+    obj_frame_engine.set_devices(int_device_count=INT_DEVICES)
+    obj_frame_engine.set_playback(float_publish_interval=FLOAT_PUBLISH_INTERVAL)
+    obj_modbus_server       =   modbus_server.DataSimModbus (
+                                                                list_unit_ids       =   list(range(1, INT_DEVICES + 1)),
+                                                                int_register_count  =   INT_TAGS
+                                                            )
+    obj_modbus_server.set_register_layout(arr_addresses=obj_frame_engine.arr_addresses)
+
+    return obj_frame_engine, obj_modbus_server
+
+def measure_tick():
+
+    #=====================================================================================
+    #   Function Name  :  measure_tick
+    #   Description    :  Returns the mean milliseconds of the frame computation plus
+    #                     publish of one tick, the time the event loop is blocked per tick
+    #                     without prepare ahead
+    #=====================================================================================
+
+    obj_frame_engine, obj_modbus_server     =   build_server()
+    float_start                             =   time.perf_counter()
+
+    for _ in range(INT_TICKS):
+        obj_modbus_server.publish_frames(arr_device_frames=obj_frame_engine.next_frames())
+
+    return (time.perf_counter() - float_start) * 1000 / INT_TICKS
+
+def serve(bool_prepare_ahead):
+
+    #=====================================================================================
+    #   Function Name  :  serve
+    #   Description    :  Serves the benchmark map until terminated
+    #=====================================================================================
+
+    obj_frame_engine, obj_modbus_server     =   build_server()
+    obj_logger                              =   logging.getLogger('benchmark_tick_latency')
+    obj_logger.addHandler(logging.NullHandler())
+
+    modbus_server.utils.asyncio.run(obj_modbus_server.start_async_server(
+                                                                            obj_frame_engine        =   obj_frame_engine,
+                                                                            str_server_ip_address   =   '127.0.0.1',
+                                                                            str_server_port         =   INT_PORT,
+                                                                            str_server_unit_id      =   '1',
+                                                                            float_publish_interval  =   FLOAT_PUBLISH_INTERVAL,
+                                                                            int_log_trace_every     =   0,
+                                                                            bool_prepare_ahead      =   bool_prepare_ahead,
+                                                                            obj_logger              =   obj_logger
+                                                                        ))
+
+def start_server(bool_prepare_ahead):
+
+    #=====================================================================================
+    #   Function Name  :  start_server
+    #   Description    :  Starts serve in a separate process and waits until its port
+    #                     accepts connections
+    #=====================================================================================
+
+    obj_process     =   subprocess.Popen    (
+                                                [sys.executable, os.path.abspath(__file__), 'serve', str(int(bool_prepare_ahead))],
+                                                stdout  =   subprocess.DEVNULL
+                                            )
+    float_deadline  =   time.monotonic() + FLOAT_STARTUP_TIMEOUT
+
+    while time.monotonic() < float_deadline:
+        try:
+            socket.create_connection(('127.0.0.1', INT_PORT), timeout=1).close()
+            return obj_process
+        except OSError:
+            time.sleep(0.5)
+
+    obj_process.kill()
+    raise RuntimeError(f"Server did not start on port {INT_PORT}")
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Prints the client latency of both modes
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*24}\n{' '*1}Tick Latency Benchmark\n{'='*24}")
+    print(f"\n{INT_DEVICES} devices x {INT_TAGS} signal tags, tick every {FLOAT_PUBLISH_INTERVAL:g}s ({measure_tick():.1f} ms of compute and publish), {INT_CONNECTIONS} connections x {FLOAT_RATE:g} req/s of 125 registers for {FLOAT_DURATION:g}s")
+    print(f"\n{'Mode':>14} {'Req/s':>7} {'p50 (ms)':>9} {'p90 (ms)':>9} {'p99 (ms)':>9} {'p99.9 (ms)':>11} {'Max (ms)':>9} {'Timeouts':>9}")
+
+    for bool_prepare_ahead in [False, True]:
+
+        obj_process     =   start_server(bool_prepare_ahead)
+
+        try:
+            dict_summary    =   load_generator.DataSimLoadGenerator (
+                                                                        str_targets             =   f"127.0.0.1:{INT_PORT}",
+                                                                        str_ranges              =   STR_RANGES,
+                                                                        str_unit_ids            =   f"1-{INT_DEVICES}",
+                                                                        int_connection_count    =   INT_CONNECTIONS,
+                                                                        float_rate              =   FLOAT_RATE,
+                                                                        float_duration          =   FLOAT_DURATION
+                                                                    ).run()
+        finally:
+            obj_process.terminate()
+            obj_process.wait()
+
+        str_mode        =   'prepare ahead' if bool_prepare_ahead else 'event loop'
+        print(f"{str_mode:>14} {dict_summary['float_requests_per_s']:>7.0f} {dict_summary['float_latency_p50_ms']:>9.2f} {dict_summary['float_latency_p90_ms']:>9.2f} "
+              f"{dict_summary['float_latency_p99_ms']:>9.2f} {dict_summary['float_latency_p99.9_ms']:>11.2f} {dict_summary['float_latency_max_ms']:>9.2f} {dict_summary['int_timeouts']:>9}")
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Serve a single mode when called with arguments
+    if len(sys.argv) == 3 and sys.argv[1] == 'serve':
+        serve(sys.argv[2] == '1')
+    else:
+        run_benchmark()
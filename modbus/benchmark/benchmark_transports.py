@@ -0,0 +1,121 @@
+#============================================================================================
+#   Name        :   benchmark_transports.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Starts a simulator on a localhost port in a separate process for
+#                       every transport and framer: TCP, UDP, RTU over TCP and RTU over
+#                       UDP
+#                   2.  Runs the unthrottled Modbus load generator against it for growing
+#                       connection counts, UDP connections are separate sockets
+#                   3.  Prints the achieved requests/s, latency percentiles, timeouts and
+#                       wire bandwidth of every case
+#============================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from client import load_generator
+import subprocess
+import socket
+import time
+
+#Variable definition
+STR_ASSET_TYPE          =   'bms'
+INT_PORT                =   5597
+STR_RANGES              =   '0:11'
+LIST_MODES              =   [
+                                #(transport, framer)
+                                ('tcp', 'socket'),
+                                ('udp', 'socket'),
+                                ('tcp', 'rtu'),
+                                ('udp', 'rtu')
+                            ]
+LIST_CONNECTION_COUNTS  =   [1, 10, 100]
+FLOAT_DURATION          =   10.0
+FLOAT_STARTUP_TIMEOUT   =   120.0
+
+#Function Definitions
+def start_simulator(str_transport, str_framer):
+
+    #=====================================================================================
+    #   Function Name  :  start_simulator
+    #   Description    :  Starts the simulator and waits until it answers, a TCP port
+    #                     accepts connections and a UDP port answers a read
+    #=====================================================================================
+
+    obj_process     =   subprocess.Popen    (
+                                                [sys.executable, os.path.join(os.sep,"ess_datasim","modbus","simulator","start.py"), '--asset', STR_ASSET_TYPE, '--port', str(INT_PORT), '--transport', str_transport, '--framer', str_framer],
+                                                stdout  =   subprocess.DEVNULL,
+                                                stderr  =   subprocess.DEVNULL
+                                            )
+    float_deadline  =   time.monotonic() + FLOAT_STARTUP_TIMEOUT
+
+    while time.monotonic() < float_deadline:
+        if str_transport == 'tcp':
+            try:
+                socket.create_connection(('127.0.0.1', INT_PORT), timeout=1).close()
+                return obj_process
+            except OSError:
+                time.sleep(0.5)
+        else:
+            dict_summary    =   load_generator.DataSimLoadGenerator (
+                                                                        str_targets             =   f"127.0.0.1:{INT_PORT}",
+                                                                        str_ranges              =   STR_RANGES,
+                                                                        int_connection_count    =   1,
+                                                                        float_rate              =   1.0,
+                                                                        float_duration          =   0.5,
+                                                                        str_transport           =   str_transport,
+                                                                        str_framer              =   str_framer
+                                                                    ).run()
+            if dict_summary['int_responses']:
+                return obj_process
+
+    obj_process.kill()
+    raise RuntimeError(f"Simulator did not start on port {INT_PORT}")
+
+def run_benchmark():
+
+    #=====================================================================================
+    #   Function Name  :  run_benchmark
+    #   Description    :  Prints the load test results of every transport and framer
+    #=====================================================================================
+
+    #Print message
+    print(f"\n{'='*24}\n{' '*2}Transport Benchmark\n{'='*24}")
+    print(f"\n{'Transport':>9} {'Framer':>7} {'Conns':>6} {'Req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Max (ms)':>9} {'Timeouts':>9} {'Mbit/s':>7}")
+
+    for str_transport, str_framer in LIST_MODES:
+
+        obj_process     =   start_simulator(str_transport, str_framer)
+
+        try:
+            for int_connection_count in LIST_CONNECTION_COUNTS:
+
+                dict_summary    =   load_generator.DataSimLoadGenerator (
+                                                                            str_targets             =   f"127.0.0.1:{INT_PORT}",
+                                                                            str_ranges              =   STR_RANGES,
+                                                                            int_connection_count    =   int_connection_count,
+                                                                            float_rate              =   0,
+                                                                            float_duration          =   FLOAT_DURATION,
+                                                                            str_transport           =   str_transport,
+                                                                            str_framer              =   str_framer
+                                                                        ).run()
+
+                print(f"{str_transport:>9} {str_framer:>7} {int_connection_count:>6} {dict_summary['float_requests_per_s']:>8.0f} "
+                      f"{dict_summary['float_latency_p50_ms'] or 0:>9.2f} {dict_summary['float_latency_p99_ms'] or 0:>9.2f} {dict_summary['float_latency_max_ms'] or 0:>9.2f} "
+                      f"{dict_summary['int_timeouts']:>9} {dict_summary['float_wire_bits_per_s']/1e6:>7.3f}")
+
+        finally:
+            obj_process.terminate()
+            obj_process.wait()
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Function Call
+    run_benchmark()
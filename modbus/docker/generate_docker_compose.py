@@ -4,7 +4,12 @@
 #   Version     :   1.0
 #   Author      :   Shayan Sharif Zahid
 #   Description :   This module does the following:
-#                  
+#                   1.  Generates one docker compose file per server from the services of
+#                       docker_compose_config.csv
+#                   2.  Or plans the services with --plan: devices per container and
+#                       containers per host from a plan config and the measured per tag
+#                       costs, with non-conflicting IPs or host ports
+#                   3.  Measures the per tag costs of the assets with --calibrate
 #============================================================================================
 
 #Set path to current directory
@@ -13,11 +18,10 @@ import os
 sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
 
 #Import libraries
+from core import utils
+from server import capacity_planner
 import pandas as pd
 import yaml
-import psutil
-import subprocess
-import socket
 
 #Default values
 STR_DEFAULT_NETWORK_NAME            =   "ess_datasim_network"
@@ -26,32 +30,90 @@ STR_DEFAULT_PARENT_ETH              =   "enp2s0"
 STR_DEFAULT_SUBNET                  =   "10.0.0.0/24"
 STR_DEFAULT_GATEWAY                 =   "10.0.0.2"
 STR_DEFAULT_DOCKER_COMPOSE_FILENAME =   "docker_compose"
+STR_DEFAULT_DOCKER_CONFIG_FILENAME  =   "docker_compose_config"
+STR_DEFAULT_PLAN_DIRNAME            =   "plan"
 
+#Function Definitions
+def get_service(dict_service, str_context="./"):
 
-# Read the CSV file and generate docker-compose.yml
-def generate_docker_compose(**kwargs):
+    #=====================================================================================
+    #   Function Name  :  get_service
+    #   Description    :  Returns the compose definition of one service row, the network,
+    #                     port mapping and command only when the row has them. The build
+    #                     context is the repository root relative to the compose file.
+    #=====================================================================================
 
-    #Print message
-    print(f"\n{'='*24}\n{' '*8}Generate\n{' '*5}Docker Compose\n{'='*24}")
+    dict_compose_service    =   {
+                                    "build": {
+                                        "context": str_context,
+                                        "dockerfile": str(dict_service["dockerfile"])
+                                    },
+                                    "container_name": str(dict_service["container_name"]),
+                                    "restart": str(dict_service["restart"]),
+                                    "deploy": {
+                                        "resources": {
+                                            "limits": {
+                                                "cpus": str(dict_service["limits_cpus"]),
+                                                "memory": str(dict_service["limits_memory"]),
+                                            },
+                                            "reservations": {
+                                                "cpus": str(dict_service["reservations_cpus"]),
+                                                "memory": str(dict_service["reservations_memory"]),
+                                            }
+                                        }
+                                    },
+                                    "mem_limit": str(dict_service["mem_limit"]),
+                                    "memswap_limit": str(dict_service["memswap_limit"])
+                                }
+
+    if pd.notna(dict_service.get("ipv4_address")):
+        dict_compose_service["networks"]    =   {STR_DEFAULT_NETWORK_NAME: {"ipv4_address": str(dict_service["ipv4_address"])}}
+    if pd.notna(dict_service.get("ports")):
+        dict_compose_service["ports"]       =   [str(dict_service["ports"])]
+    if pd.notna(dict_service.get("command")):
+        dict_compose_service["command"]     =   str(dict_service["command"]).split()
+
+    return dict_compose_service
+
+def check_ports(df_services):
+
+    #=====================================================================================
+    #   Function Name  :  check_ports
+    #   Description    :  Raises a ValueError if two services of one server map the same
+    #                     host port
+    #=====================================================================================
+
+    df_ports        =   df_services.dropna(subset=["ports"])
+    sr_host_ports   =   df_ports["ports"].astype(str).str.rsplit(":", n=1).str[0]
+    sr_duplicates   =   pd.DataFrame({"server_name": df_ports["server_name"], "host_port": sr_host_ports}).duplicated(keep=False)
+
+    if sr_duplicates.any():
+        raise ValueError(f"Host ports mapped more than once on a server: {', '.join(df_ports.loc[sr_duplicates, 'service_name'] + ' (' + df_ports.loc[sr_duplicates, 'server_name'] + ' ' + sr_host_ports[sr_duplicates] + ')')}")
+
+def write_docker_compose(df_services, **kwargs):
+
+    #=====================================================================================
+    #   Function Name  :  write_docker_compose
+    #   Description    :  Writes one docker compose file per server of the service rows to
+    #                     str_output_path, by default the repository root, and returns
+    #                     their paths
+    #=====================================================================================
 
-    #Config filename for docker compose
-    str_config_filename         =       kwargs.get('str_docker_compose_config_filename', None)
-   
-    #Print the current file path
     str_current_working_dir     =   os.path.dirname(os.path.abspath(__file__))
-    print(f"\nCurrent Directory : {str_current_working_dir}")
+    str_modbus_path             =   str_current_working_dir.replace(os.path.join("modbus", "docker"),"")
 
-    #Create full path to CSV file
-    csv_data_file_path          =     os.path.join(os.sep,str_current_working_dir,str_config_filename+".csv")
-    
-    #Read the CSV file into a DataFrame
-    df_services                 =      pd.read_csv(csv_data_file_path)
+    #Extract keyword args
+    str_subnet                  =   kwargs.get('str_subnet', STR_DEFAULT_SUBNET)
+    str_gateway                 =   kwargs.get('str_gateway', STR_DEFAULT_GATEWAY)
+    str_output_path             =   kwargs.get('str_output_path', str_modbus_path)
 
-    #Group dataframe according to servers
-    df_grouped_servers          =      df_services.groupby("server_name")
+    check_ports(df_services)
 
-    for server_name,server_group in df_grouped_servers:
+    str_context                 =   os.path.join(os.path.relpath(str_modbus_path, str_output_path), "")
+    obj_dumper                  =   getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+    list_filepaths              =   []
 
+    for server_name, df_server in df_services.groupby("server_name"):
 
         #Define the docker-compose data structure
         docker_compose              =   {
@@ -63,71 +125,228 @@ def generate_docker_compose(**kwargs):
                                                     },
                                                     "ipam": {
                                                         "config": [
-                                                            {"subnet": STR_DEFAULT_SUBNET, "gateway": STR_DEFAULT_GATEWAY}
+                                                            {"subnet": str_subnet, "gateway": str_gateway}
                                                         ]
                                                     }
                                                 }
                                             },
-                                            "services": {}
+                                            "services": {str(dict_service["service_name"]): get_service(dict_service, str_context) for dict_service in df_server.to_dict(orient="records")}
                                         }
-        
-        #Populate services section
-        for _,row in server_group.iterrows():
-            
-            service                 =   row.to_dict()
-            list_services           =   []
-            list_services.append(service)
-
-            for service in list_services:
-
-                docker_compose["services"][str(service["service_name"])] = {
-                    "build": {
-                        "context": "./",
-                        "dockerfile": str(service["dockerfile"])
-                    },
-                    "container_name": str(service["container_name"]),
-                    "networks": {
-                        STR_DEFAULT_NETWORK_NAME: {
-                            "ipv4_address": service["ipv4_address"]
-                        }
-                    },
-                    "ports": [
-                        "502:502"
-                    ],
-                    "restart": "always",
-                    "deploy": {
-                    "resources": {
-                        "limits": {
-                            "cpus": str(service["limits_cpus"]),
-                            "memory": str(service["limits_memory"]),
-                        },
-                        "reservations": {
-                            "cpus": str(service["reservations_cpus"]),
-                            "memory": str(service["reservations_memory"]),
-                        }
-                    }
-                },
-                "mem_limit": str(service["mem_limit"]),
-                "memswap_limit": str(service["memswap_limit"])
-                }
-
-        #Print Message
-        print(f"Config Status     : YAML Generated")
-
-        #Convert to YAML format and write to docker-compose.yml
-        str_modbus_path = str_current_working_dir.replace(os.path.join("modbus", "docker"),"")
-        str_docker_compose_filepath = os.path.join(str_modbus_path,server_name+'_'+STR_DEFAULT_DOCKER_COMPOSE_FILENAME+".yml")
+
+        #Services without an IP use the default network
+        if df_server["ipv4_address"].isna().all():
+            del docker_compose["networks"]
 
         #Write values to the yaml file
+        str_docker_compose_filepath =   os.path.join(str_output_path,server_name+'_'+STR_DEFAULT_DOCKER_COMPOSE_FILENAME+".yml")
         with open(str_docker_compose_filepath, 'w') as yaml_file:
-            
-            yaml.dump(docker_compose, yaml_file, default_flow_style=False)
+            yaml.dump(docker_compose, yaml_file, Dumper=obj_dumper, default_flow_style=False)
+
+        list_filepaths.append(str_docker_compose_filepath)
+
+    return list_filepaths
+
+# Read the CSV file and generate docker-compose.yml
+def generate_docker_compose(**kwargs):
+
+    #Print message
+    print(f"\n{'='*24}\n{' '*8}Generate\n{' '*5}Docker Compose\n{'='*24}")
+
+    #Config filename for docker compose
+    str_config_filename         =       kwargs.get('str_docker_compose_config_filename', None)
+
+    #Print the current file path
+    str_current_working_dir     =   os.path.dirname(os.path.abspath(__file__))
+    print(f"\nCurrent Directory : {str_current_working_dir}")
+
+    #Create full path to CSV file
+    csv_data_file_path          =     os.path.join(os.sep,str_current_working_dir,str_config_filename+".csv")
+
+    #Read the CSV file into a DataFrame
+    df_services                 =      pd.read_csv(csv_data_file_path, encoding='utf-8-sig')
+
+    #Print Message
+    for str_docker_compose_filepath in write_docker_compose(df_services):
+        print(f"File Generated    : {str_docker_compose_filepath}")
+
+def plan_docker_compose(**kwargs):
+
+    #=====================================================================================
+    #   Function Name  :  plan_docker_compose
+    #   Description    :  Plans the services of a plan config, prints the plan, writes
+    #                     the planned services CSV and their docker compose files to the
+    #                     plan directory, apart from the committed compose files
+    #=====================================================================================
+
+    #Extract keyword args
+    obj_planner                 =   kwargs.get('obj_planner', None)
+
+    #Print message
+    print(f"\n{'='*24}\n{' '*9}Plan\n{' '*5}Docker Compose\n{'='*24}")
 
-        #Print Message
-        print(f"File Generated    : {str_docker_compose_filepath}\n")
+    df_plan                     =   obj_planner.get_plan()
+    df_services                 =   obj_planner.get_services(df_plan)
+
+    print(f"\n{'Asset':>8} {'Tags':>10} {'Devices':>8} {'Dev/Cont':>9} {'Containers':>11} {'CPU/Dev':>9} {'MiB/Dev':>8}")
+    for dict_row in df_plan.to_dict(orient="records"):
+        print(f"{dict_row['asset']:>8} {dict_row['target_tags']:>10} {dict_row['int_devices']:>8} {dict_row['int_container_devices']:>9} {dict_row['int_containers']:>11} {dict_row['float_device_cpus']:>9.5f} {dict_row['float_device_memory']/2**20:>8.3f}")
+    print(f"\nHosts             : {df_services['server_name'].nunique()}, {obj_planner.get_containers_per_host()} containers of {obj_planner.float_container_cpus:g} CPUs and {obj_planner.str_container_memory} per host")
+    print(f"Services          : {len(df_services)} containers, {df_services['int_devices'].sum()} devices")
+
+    #Planned services in the docker compose config columns, then their compose files
+    str_plan_path               =   os.path.join(os.path.dirname(os.path.abspath(__file__)), STR_DEFAULT_PLAN_DIRNAME)
+    os.makedirs(str_plan_path, exist_ok=True)
+
+    str_services_filepath       =   os.path.join(str_plan_path, os.path.basename(obj_planner.str_plan_config_filepath).replace('_config.csv', '') + "_services.csv")
+    df_services.drop(columns=['asset', 'int_devices']).to_csv(str_services_filepath, index=False)
+    print(f"Services CSV      : {str_services_filepath}")
+
+    list_filepaths              =   write_docker_compose(df_services, str_subnet=obj_planner.str_subnet, str_gateway=obj_planner.str_gateway, str_output_path=str_plan_path)
+    print(f"Files Generated   : {len(list_filepaths)}, {list_filepaths[0]} to {list_filepaths[-1]}")
+
+def parse_args():
+
+    #=====================================================================================
+    #   Function Name  :  parse_args
+    #   Description    :  Parses the command line arguments
+    #=====================================================================================
+
+    #Initialize argument parser
+    parser = utils.argparse.ArgumentParser(description='Arguments for Generating or Planning the Docker Compose Files of a Data Simulator Deployment')
+
+    #Define command line arguments
+    parser.add_argument(
+                            '--config',
+                            type    =   str,
+                            help    =   'Enter the docker compose config CSV (file name in modbus/docker) listing every service',
+                            default =   STR_DEFAULT_DOCKER_CONFIG_FILENAME
+                        )
+    parser.add_argument(
+                            '--plan',
+                            type    =   str,
+                            nargs   =   '?',
+                            const   =   utils.STR_DEFAULT_PLAN_CONFIG_FILENAME,
+                            help    =   'Plan the services from a plan config CSV (file name in modbus/docker) of asset, target_tags, poll_rate and pub_int instead of listing them',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--calibration',
+                            type    =   str,
+                            help    =   'Enter the calibration CSV (file name in modbus/docker) of the measured per tag costs',
+                            default =   utils.STR_DEFAULT_CALIBRATION_FILENAME
+                        )
+    parser.add_argument(
+                            '--calibrate',
+                            type    =   str,
+                            help    =   'Measure the per tag costs of the given assets, e.g. bms,cnv,inv, on this host and write the calibration CSV',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--calibration_devices',
+                            type    =   int,
+                            help    =   'Enter the number of devices of the calibration simulator',
+                            default =   utils.INT_DEFAULT_CALIBRATION_DEVICES
+                        )
+    parser.add_argument(
+                            '--calibration_seconds',
+                            type    =   float,
+                            help    =   'Enter the length of the idle and the loaded calibration measurement in seconds',
+                            default =   utils.FLOAT_DEFAULT_CALIBRATION_DURATION
+                        )
+    parser.add_argument(
+                            '--host_cpus',
+                            type    =   float,
+                            help    =   'Enter the CPUs of a host (default: this host)',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--host_memory',
+                            type    =   str,
+                            help    =   'Enter the memory of a host, e.g. 64G (default: this host)',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--container_cpus',
+                            type    =   float,
+                            help    =   'Enter the CPU limit of a container, a simulator uses at most one core',
+                            default =   utils.FLOAT_DEFAULT_CONTAINER_CPUS
+                        )
+    parser.add_argument(
+                            '--container_memory',
+                            type    =   str,
+                            help    =   'Enter the memory limit of a container, e.g. 512M',
+                            default =   utils.STR_DEFAULT_CONTAINER_MEMORY
+                        )
+    parser.add_argument(
+                            '--headroom',
+                            type    =   float,
+                            help    =   'Enter the share of the container and host CPU and memory the plan may use',
+                            default =   utils.FLOAT_DEFAULT_PLAN_HEADROOM
+                        )
+    parser.add_argument(
+                            '--bind',
+                            type    =   str,
+                            choices =   ['ip', 'port'],
+                            help    =   'Give every container its own IP of --subnet on port 502 (ip), or map host ports from --base_port on each host (port)',
+                            default =   utils.STR_DEFAULT_PLAN_BIND_MODE
+                        )
+    parser.add_argument(
+                            '--subnet',
+                            type    =   str,
+                            help    =   'Enter the subnet the container IPs are assigned from',
+                            default =   STR_DEFAULT_SUBNET
+                        )
+    parser.add_argument(
+                            '--gateway',
+                            type    =   str,
+                            help    =   'Enter the gateway of --subnet, it is not assigned to a container',
+                            default =   STR_DEFAULT_GATEWAY
+                        )
+    parser.add_argument(
+                            '--base_port',
+                            type    =   int,
+                            help    =   'Enter the first host port with --bind port',
+                            default =   utils.INT_DEFAULT_FLEET_BASE_PORT
+                        )
+
+    return parser.parse_args()
 
 #Main entry point when script is run directly
 if __name__ == '__main__':
-    
-    # Call the function to generate the docker-compose.yml
-    generate_docker_compose(str_docker_compose_config_filename="docker_compose_config")
\ No newline at end of file
+
+    #Parse command line arguments
+    args                    =   parse_args()
+    str_docker_path         =   os.path.dirname(os.path.abspath(__file__))
+
+    #Generate the listed services
+    if not args.plan and not args.calibrate:
+
+        # Call the function to generate the docker-compose.yml
+        generate_docker_compose(str_docker_compose_config_filename=args.config)
+
+    else:
+
+        obj_planner         =   capacity_planner.DataSimCapacityPlanner (
+                                                                            str_plan_config_filepath    =   os.path.join(str_docker_path, (args.plan or utils.STR_DEFAULT_PLAN_CONFIG_FILENAME)+".csv"),
+                                                                            str_calibration_filepath    =   os.path.join(str_docker_path, args.calibration+".csv"),
+                                                                            float_host_cpus             =   args.host_cpus,
+                                                                            str_host_memory             =   args.host_memory,
+                                                                            float_container_cpus        =   args.container_cpus,
+                                                                            str_container_memory        =   args.container_memory,
+                                                                            float_headroom              =   args.headroom,
+                                                                            str_bind_mode               =   args.bind,
+                                                                            str_subnet                  =   args.subnet,
+                                                                            str_gateway                 =   args.gateway,
+                                                                            int_base_port               =   args.base_port
+                                                                        )
+
+        #Measure the per tag costs first
+        if args.calibrate:
+            obj_planner.calibrate   (
+                                        list_asset_types    =   args.calibrate.split(','),
+                                        int_device_count    =   args.calibration_devices,
+                                        float_duration      =   args.calibration_seconds
+                                    )
+
+        if args.plan:
+            plan_docker_compose(obj_planner=obj_planner)
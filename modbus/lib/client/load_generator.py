@@ -0,0 +1,488 @@
+#=========================================================================================
+#   Name        :   load_generator.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a load generator module which does the following:
+#                       1.  Defines DataSimLoadGenerator class
+#                       2.  Opens N concurrent Modbus TCP or UDP client connections spread
+#                           over one or more simulator instances, optionally across several
+#                           client processes, with the socket (MBAP) or RTU framing
+#                       3.  Polls the configured register ranges and unit IDs on each
+#                           connection at a target rate, or as fast as the server answers
+#                       4.  Reports the achieved requests/s and registers/s, the latency
+#                           percentiles, timeouts, exception responses and the bytes on
+#                           the wire
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+import multiprocessing
+import asyncio
+import socket
+import struct
+import time
+import array
+import numpy as np
+
+#Variable definition
+LIST_LATENCY_PERCENTILES    =   [50, 90, 99, 99.9]
+LIST_COUNTER_KEYS           =   ['int_requests', 'int_responses', 'int_registers', 'int_timeouts', 'int_exceptions', 'int_errors', 'int_reconnects', 'int_bytes_sent', 'int_bytes_received']
+INT_RTU_CRC_BYTES           =   2
+LIST_RTU_WRITE_CODES        =   [5, 6, 15, 16]
+
+#Function Definitions
+def run_process(dict_config, list_connections):
+
+    #=====================================================================================
+    #   Function Name  :  run_process
+    #   Description    :  Client process entry point, runs a load generator for its share
+    #                     of the connections and returns the raw stats
+    #=====================================================================================
+
+    return DataSimLoadGenerator(**dict_config).run_connections(list_connections=list_connections)
+
+def get_crc16(bytes_frame):
+
+    #=====================================================================================
+    #   Function Name  :  get_crc16
+    #   Description    :  Returns the Modbus RTU CRC-16 of a frame, sent low byte first
+    #=====================================================================================
+
+    int_crc     =   0xFFFF
+
+    for int_byte in bytes_frame:
+        int_crc     ^=  int_byte
+        for _ in range(8):
+            int_crc     =   (int_crc >> 1) ^ 0xA001 if int_crc & 1 else int_crc >> 1
+
+    return int_crc
+
+#Class definitions
+class DataSimDatagramStream(asyncio.DatagramProtocol):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimDatagramStream
+    #   Description    :    Connected UDP socket with the write, readexactly and close of an
+    #                       asyncio stream, so a connection reads the frames the same way
+    #                       over both transports. Every response is one datagram.
+    #=====================================================================================
+
+    def __init__(self):
+
+        #Transport, received bytes and the pending read
+        self.obj_transport      =   None
+        self.bytearray_buffer   =   bytearray()
+        self.obj_waiter         =   None
+        self.obj_exception      =   None
+
+    def connection_made(self, transport):
+
+        #=====================================================================================
+        #   Function Name  :    connection_made
+        #   Description    :    Keeps the UDP transport
+        #=====================================================================================
+
+        self.obj_transport      =   transport
+
+    def datagram_received(self, data, addr):
+
+        #=====================================================================================
+        #   Function Name  :    datagram_received
+        #   Description    :    Buffers a received response
+        #=====================================================================================
+
+        self.bytearray_buffer   +=  data
+        self.wake()
+
+    def error_received(self, exc):
+
+        #=====================================================================================
+        #   Function Name  :    error_received
+        #   Description    :    Keeps an ICMP error (e.g. port unreachable while the server is
+        #                       down) for the pending read
+        #=====================================================================================
+
+        self.obj_exception      =   exc
+        self.wake()
+
+    def wake(self):
+
+        #=====================================================================================
+        #   Function Name  :    wake
+        #   Description    :    Resumes a pending readexactly
+        #=====================================================================================
+
+        if self.obj_waiter is not None and not self.obj_waiter.done():
+            self.obj_waiter.set_result(None)
+
+    async def readexactly(self, int_bytes):
+
+        #=====================================================================================
+        #   Function Name  :    readexactly
+        #   Description    :    Returns the next int_bytes received bytes
+        #=====================================================================================
+
+        while len(self.bytearray_buffer) < int_bytes:
+            if self.obj_exception is not None:
+                raise self.obj_exception
+            self.obj_waiter     =   asyncio.get_running_loop().create_future()
+            await self.obj_waiter
+
+        bytes_data  =   bytes(self.bytearray_buffer[:int_bytes])
+        del self.bytearray_buffer[:int_bytes]
+
+        return bytes_data
+
+    def write(self, bytes_data):
+
+        #=====================================================================================
+        #   Function Name  :    write
+        #   Description    :    Sends a request datagram
+        #=====================================================================================
+
+        self.obj_transport.sendto(bytes_data)
+
+    def close(self):
+
+        #=====================================================================================
+        #   Function Name  :    close
+        #   Description    :    Closes the socket, late responses are dropped with it
+        #=====================================================================================
+
+        self.obj_transport.close()
+
+class DataSimLoadGenerator:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimLoadGenerator
+    #   Description    :    Modbus TCP/UDP load generator. Requests are framed directly on
+    #                       asyncio streams so the client overhead stays small next to the
+    #                       server under test. Over UDP a connection is its own socket.
+    #                       Every connection has one request in flight
+    #                       and walks the request list from its own offset:
+    #                           1.  list_targets  : (host, port), connection n uses target
+    #                                               n % len(list_targets)
+    #                           2.  list_requests : (unit ID, start address, count), the
+    #                                               ranges split into reads of at most 125
+    #                                               registers for every unit ID
+    #                       With a rate, requests are sent on absolute deadlines and the
+    #                       latency is measured from the deadline, so a slow server is not
+    #                       hidden by the client waiting on it.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_targets            =   kwargs.get('str_targets', utils.STR_DEFAULT_LOAD_TARGETS)
+        self.str_ranges             =   kwargs.get('str_ranges', utils.STR_DEFAULT_LOAD_RANGES)
+        self.str_unit_ids           =   kwargs.get('str_unit_ids', utils.STR_DEFAULT_LOAD_UNIT_IDS)
+        self.int_function_code      =   kwargs.get('int_function_code', utils.DEFAULT_HOLDING_REG_FUNCTION_CODE_HEX)
+        self.int_connection_count   =   kwargs.get('int_connection_count', utils.INT_DEFAULT_LOAD_CONNECTIONS)
+        self.float_rate             =   kwargs.get('float_rate', utils.FLOAT_DEFAULT_LOAD_RATE)
+        self.float_duration         =   kwargs.get('float_duration', utils.FLOAT_DEFAULT_LOAD_DURATION)
+        self.float_timeout          =   kwargs.get('float_timeout', utils.FLOAT_DEFAULT_LOAD_TIMEOUT)
+        self.int_process_count      =   kwargs.get('int_process_count', utils.INT_DEFAULT_LOAD_PROCESSES)
+        self.str_transport          =   kwargs.get('str_transport', utils.STR_DEFAULT_MODBUS_TRANSPORT)
+        self.str_framer             =   kwargs.get('str_framer', utils.STR_DEFAULT_MODBUS_FRAMER)
+
+        #Validate the options
+        if self.int_function_code not in utils.LIST_LOAD_FUNCTION_CODES:
+            raise ValueError(f"Unsupported function code: {self.int_function_code}")
+        if self.str_transport not in utils.LIST_MODBUS_TRANSPORTS or self.str_framer not in utils.LIST_MODBUS_FRAMERS:
+            raise ValueError(f"Unsupported transport or framer: {self.str_transport}, {self.str_framer}")
+        if self.int_connection_count < 1 or self.int_process_count < 1:
+            raise ValueError(f"Connections and processes must be at least 1, got {self.int_connection_count} and {self.int_process_count}")
+
+        #Targets and requests, RTU frames have no transaction ID and are built once
+        self.list_targets           =   self.get_targets()
+        self.list_requests          =   self.get_requests()
+        self.list_rtu_frames        =   [self.get_rtu_frame(struct.pack('>BBHH', int_unit_id, self.int_function_code, int_address, int_count)) for int_unit_id, int_address, int_count in self.list_requests] if self.str_framer == 'rtu' else None
+
+    def get_targets(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_targets
+        #   Description    :    Parses 'host:port,host:port' into (host, port) tuples, a
+        #                       bare port targets localhost
+        #=====================================================================================
+
+        list_targets    =   []
+
+        for str_target in self.str_targets.split(','):
+            str_host, _, str_port   =   str_target.strip().rpartition(':')
+            list_targets.append((str_host or utils.STR_DEFAULT_FLEET_IP_ADDRESS, int(str_port)))
+
+        return list_targets
+
+    def get_requests(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_requests
+        #   Description    :    Returns one (unit ID, start address, count) per read:
+        #                           1.  Unit IDs are '1,2,5-8'
+        #                           2.  Ranges are inclusive 'start:end' separated by
+        #                               commas, each split into reads of at most 125
+        #                               registers
+        #=====================================================================================
+
+        obj_utils       =   utils.DataSimUtils()
+        list_unit_ids   =   obj_utils.parse_unit_ids(str_unit_ids=self.str_unit_ids)
+        list_requests   =   []
+
+        for int_unit_id in list_unit_ids:
+            for str_range in self.str_ranges.split(','):
+
+                int_start_address, int_end_address  =   obj_utils.parse_address_range(str_address_range=str_range.strip())
+
+                for int_address in range(int_start_address, int_end_address + 1, utils.INT_MODBUS_MAX_READ_REGISTERS):
+                    list_requests.append((int_unit_id, int_address, min(utils.INT_MODBUS_MAX_READ_REGISTERS, int_end_address + 1 - int_address)))
+
+        return list_requests
+
+    @staticmethod
+    def get_rtu_frame(bytes_frame):
+
+        #=====================================================================================
+        #   Function Name  :    get_rtu_frame
+        #   Description    :    Appends the CRC to a unit ID and PDU
+        #=====================================================================================
+
+        return bytes_frame + struct.pack('<H', get_crc16(bytes_frame))
+
+    async def connect(self, tuple_target):
+
+        #=====================================================================================
+        #   Function Name  :    connect
+        #   Description    :    Opens a TCP connection with Nagle disabled, or a connected UDP
+        #                       socket used as both reader and writer
+        #=====================================================================================
+
+        if self.str_transport == 'udp':
+            _, obj_stream       =   await asyncio.get_running_loop().create_datagram_endpoint(DataSimDatagramStream, remote_addr=tuple_target)
+            return obj_stream, obj_stream
+
+        obj_reader, obj_writer  =   await asyncio.wait_for(asyncio.open_connection(*tuple_target), self.float_timeout)
+        obj_socket              =   obj_writer.get_extra_info('socket')
+        if obj_socket is not None:
+            obj_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        return obj_reader, obj_writer
+
+    async def read_response(self, obj_reader, int_transaction_id):
+
+        #=====================================================================================
+        #   Function Name  :    read_response
+        #   Description    :    Reads one response frame, returns its size in bytes and
+        #                       whether it is an exception response. An RTU frame has no
+        #                       length or transaction ID, its size follows from the
+        #                       function code: a byte count for reads, address and
+        #                       value/count for writes.
+        #=====================================================================================
+
+        if self.str_framer == 'rtu':
+
+            bytes_header    =   await obj_reader.readexactly(2)
+            if bytes_header[1] & 0x80:
+                bytes_data  =   await obj_reader.readexactly(1 + INT_RTU_CRC_BYTES)
+            elif bytes_header[1] in LIST_RTU_WRITE_CODES:
+                bytes_data  =   await obj_reader.readexactly(4 + INT_RTU_CRC_BYTES)
+            else:
+                bytes_data  =   await obj_reader.readexactly(1)
+                bytes_data  +=  await obj_reader.readexactly(bytes_data[0] + INT_RTU_CRC_BYTES)
+
+            return len(bytes_header) + len(bytes_data), bool(bytes_header[1] & 0x80)
+
+        bytes_header    =   await obj_reader.readexactly(utils.INT_MODBUS_TCP_HEADER_BYTES)
+        int_response_id, _, int_length, _  =   struct.unpack('>HHHB', bytes_header)
+        bytes_pdu       =   await obj_reader.readexactly(int_length - 1)
+
+        if int_response_id != int_transaction_id:
+            raise ConnectionError(f"Transaction ID {int_response_id} does not match request {int_transaction_id}")
+
+        return utils.INT_MODBUS_TCP_HEADER_BYTES + len(bytes_pdu), bool(bytes_pdu[0] & 0x80)
+
+    async def run_connection(self, int_connection, float_start, dict_stats, arr_latencies):
+
+        #=====================================================================================
+        #   Function Name  :    run_connection
+        #   Description    :    Polls on one connection until the end of the run. A timeout
+        #                       or a broken connection is counted and the connection is
+        #                       reopened, the late response would desync the stream.
+        #=====================================================================================
+
+        tuple_target        =   self.list_targets[int_connection % len(self.list_targets)]
+        int_request_count   =   len(self.list_requests)
+        float_end           =   float_start + self.float_duration
+        float_period        =   1.0 / self.float_rate if self.float_rate > 0 else 0.0
+
+        #Spread the connections over the request list and over the first period
+        int_request         =   int_connection % int_request_count
+        float_deadline      =   float_start + (int_connection / self.int_connection_count) * float_period
+        int_transaction_id  =   0
+        obj_reader          =   None
+        obj_writer          =   None
+
+        while True:
+
+            #Wait for the next deadline
+            if float_period:
+                float_delay =   float_deadline - time.perf_counter()
+                if float_delay > 0:
+                    await asyncio.sleep(float_delay)
+
+            float_send      =   time.perf_counter()
+            if float_send >= float_end:
+                break
+
+            try:
+                if obj_writer is None:
+                    obj_reader, obj_writer  =   await self.connect(tuple_target)
+
+                int_unit_id, int_address, int_count     =   self.list_requests[int_request]
+                int_transaction_id  =   (int_transaction_id + 1) & 0xFFFF
+                if self.list_rtu_frames:
+                    bytes_request   =   self.list_rtu_frames[int_request]
+                else:
+                    bytes_request   =   struct.pack('>HHHBBHH', int_transaction_id, 0, 6, int_unit_id, self.int_function_code, int_address, int_count)
+
+                obj_writer.write(bytes_request)
+                dict_stats['int_requests']      +=  1
+                dict_stats['int_bytes_sent']    +=  len(bytes_request)
+
+                int_bytes, bool_exception   =   await asyncio.wait_for(self.read_response(obj_reader, int_transaction_id), self.float_timeout)
+
+                #Latency from the deadline with a rate, from the send otherwise
+                arr_latencies.append(time.perf_counter() - (float_deadline if float_period else float_send))
+                dict_stats['int_responses']         +=  1
+                dict_stats['int_bytes_received']    +=  int_bytes
+                if bool_exception:
+                    dict_stats['int_exceptions']    +=  1
+                else:
+                    dict_stats['int_registers']     +=  int_count
+
+            except asyncio.TimeoutError:
+                dict_stats['int_timeouts']  +=  1
+                obj_writer  =   self.close(obj_writer, dict_stats)
+
+            except (OSError, asyncio.IncompleteReadError, ConnectionError):
+                dict_stats['int_errors']    +=  1
+                obj_writer  =   self.close(obj_writer, dict_stats)
+                await asyncio.sleep(min(self.float_timeout, max(float_end - time.perf_counter(), 0)))
+
+            int_request     =   (int_request + 1) % int_request_count
+            float_deadline  +=  float_period
+
+        self.close(obj_writer, None)
+
+    def close(self, obj_writer, dict_stats):
+
+        #=====================================================================================
+        #   Function Name  :    close
+        #   Description    :    Closes a connection, counts a reconnect if dict_stats is
+        #                       given and returns None
+        #=====================================================================================
+
+        if obj_writer is not None:
+            obj_writer.close()
+            if dict_stats is not None:
+                dict_stats['int_reconnects']    +=  1
+
+        return None
+
+    async def run_async(self, list_connections):
+
+        #=====================================================================================
+        #   Function Name  :    run_async
+        #   Description    :    Runs the given connections concurrently for float_duration
+        #                       seconds and returns the counters and latencies
+        #=====================================================================================
+
+        dict_stats      =   dict.fromkeys(LIST_COUNTER_KEYS, 0)
+        arr_latencies   =   array.array('d')
+
+        float_start     =   time.perf_counter()
+        await asyncio.gather(*[self.run_connection(int_connection, float_start, dict_stats, arr_latencies) for int_connection in list_connections])
+        dict_stats['float_seconds']     =   time.perf_counter() - float_start
+        dict_stats['arr_latencies']     =   np.frombuffer(arr_latencies, dtype=np.float64).astype(np.float32)
+
+        return dict_stats
+
+    def run_connections(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    run_connections
+        #   Description    :    Runs the given connections in this process
+        #=====================================================================================
+
+        #Extract keyword args
+        list_connections    =   kwargs.get('list_connections', list(range(self.int_connection_count)))
+
+        return asyncio.run(self.run_async(list_connections))
+
+    def run(self):
+
+        #=====================================================================================
+        #   Function Name  :    run
+        #   Description    :    Runs the load, split round robin across int_process_count
+        #                       client processes, and returns the summary
+        #=====================================================================================
+
+        if self.int_process_count == 1:
+            list_results    =   [self.run_connections()]
+        else:
+            dict_config     =   {
+                                    'str_targets'           :   self.str_targets,
+                                    'str_ranges'            :   self.str_ranges,
+                                    'str_unit_ids'          :   self.str_unit_ids,
+                                    'int_function_code'     :   self.int_function_code,
+                                    'int_connection_count'  :   self.int_connection_count,
+                                    'float_rate'            :   self.float_rate,
+                                    'float_duration'        :   self.float_duration,
+                                    'float_timeout'         :   self.float_timeout,
+                                    'str_transport'         :   self.str_transport,
+                                    'str_framer'            :   self.str_framer
+                                }
+            list_shares     =   [list(range(int_process, self.int_connection_count, self.int_process_count)) for int_process in range(self.int_process_count)]
+            with multiprocessing.Pool(self.int_process_count) as obj_pool:
+                list_results    =   obj_pool.starmap(run_process, [(dict_config, list_share) for list_share in list_shares if list_share])
+
+        return self.get_summary(list_results)
+
+    def get_summary(self, list_results):
+
+        #=====================================================================================
+        #   Function Name  :    get_summary
+        #   Description    :    Adds up the stats of all processes and returns the rates,
+        #                       latency percentiles in ms and bytes. The wire estimate adds
+        #                       the Ethernet/IP/TCP or UDP headers of one packet per frame.
+        #=====================================================================================
+
+        dict_summary        =   {str_key: sum(dict_result[str_key] for dict_result in list_results) for str_key in LIST_COUNTER_KEYS}
+        float_seconds       =   max(dict_result['float_seconds'] for dict_result in list_results)
+        arr_latencies       =   np.concatenate([dict_result['arr_latencies'] for dict_result in list_results])
+        int_packets         =   dict_summary['int_requests'] + dict_summary['int_responses']
+        int_wire_bytes      =   dict_summary['int_bytes_sent'] + dict_summary['int_bytes_received'] + int_packets * (utils.INT_UDP_PACKET_OVERHEAD_BYTES if self.str_transport == 'udp' else utils.INT_TCP_PACKET_OVERHEAD_BYTES)
+
+        dict_summary.update({
+                                'int_connection_count'      :   self.int_connection_count,
+                                'int_process_count'         :   self.int_process_count,
+                                'float_target_rate'         :   self.float_rate * self.int_connection_count,
+                                'float_seconds'             :   float_seconds,
+                                'float_requests_per_s'      :   dict_summary['int_responses'] / float_seconds,
+                                'float_registers_per_s'     :   dict_summary['int_registers'] / float_seconds,
+                                'int_wire_bytes'            :   int_wire_bytes,
+                                'float_wire_bits_per_s'     :   int_wire_bytes * 8 / float_seconds,
+                                'float_latency_mean_ms'     :   float(arr_latencies.mean() * 1000) if arr_latencies.size else None,
+                                'float_latency_max_ms'      :   float(arr_latencies.max() * 1000) if arr_latencies.size else None
+                            })
+
+        for float_percentile in LIST_LATENCY_PERCENTILES:
+            dict_summary[f"float_latency_p{float_percentile:g}_ms"]    =   float(np.percentile(arr_latencies, float_percentile) * 1000) if arr_latencies.size else None
+
+        return dict_summary
@@ -0,0 +1,215 @@
+#=========================================================================================
+#   Name        :   traffic_replayer.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a traffic replayer module which does the following:
+#                       1.  Defines DataSimTrafficReplayer class
+#                       2.  Reads a request journal written by the traffic recorder and
+#                           opens one Modbus TCP or UDP connection per recorded client
+#                           against one or more simulator instances, with the socket
+#                           (MBAP) or RTU framing
+#                       3.  Sends the recorded requests on their recorded schedule scaled
+#                           by a speed factor, or back to back at maximum speed
+#                       4.  Reports the achieved requests/s, the latency percentiles and
+#                           how far the replay fell behind the recorded schedule
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import traffic_recorder
+from client import load_generator
+import numpy as np
+import asyncio
+import struct
+import time
+
+#Variable definition
+LIST_REPLAY_READ_FUNCTION_CODES     =   [1, 2, 3, 4]
+LIST_REPLAY_WRITE_FUNCTION_CODES    =   [5, 6, 15, 16]
+
+#Class definitions
+class DataSimTrafficReplayer(load_generator.DataSimLoadGenerator):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimTrafficReplayer
+    #   Description    :    Replays a request journal. Every recorded client gets its own
+    #                       connection, to target n % len(list_targets) for the n-th
+    #                       client, and sends its requests in order with one in flight:
+    #                           1.  float_speed > 0 : request i is sent at its recorded
+    #                                                 offset / float_speed, or as soon
+    #                                                 as its previous response arrives
+    #                           2.  float_speed = 0 : requests are sent back to back
+    #                       Reads are replayed as recorded. The journal has no register
+    #                       values, so writes are only replayed with bool_writes and
+    #                       write zeros, other function codes are skipped.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_journal_filepath   =   kwargs.get('str_journal_filepath', None)
+        self.str_targets            =   kwargs.get('str_targets', utils.STR_DEFAULT_LOAD_TARGETS)
+        self.float_speed            =   kwargs.get('float_speed', utils.FLOAT_DEFAULT_REPLAY_SPEED)
+        self.float_timeout          =   kwargs.get('float_timeout', utils.FLOAT_DEFAULT_REPLAY_TIMEOUT)
+        self.bool_writes            =   kwargs.get('bool_writes', False)
+        self.str_transport          =   kwargs.get('str_transport', utils.STR_DEFAULT_MODBUS_TRANSPORT)
+        self.str_framer             =   kwargs.get('str_framer', utils.STR_DEFAULT_MODBUS_FRAMER)
+
+        #Validate the options
+        if self.float_speed < 0:
+            raise ValueError(f"Speed must be 0 (maximum) or positive, got {self.float_speed}")
+        if self.str_transport not in utils.LIST_MODBUS_TRANSPORTS or self.str_framer not in utils.LIST_MODBUS_FRAMERS:
+            raise ValueError(f"Unsupported transport or framer: {self.str_transport}, {self.str_framer}")
+
+        #Targets and the requests of every recorded client, records that are not replayed
+        #are counted
+        self.int_skipped            =   0
+        self.list_targets           =   self.get_targets()
+        self.arr_records            =   traffic_recorder.DataSimTrafficRecorder.read_journal(self.str_journal_filepath)
+        self.list_clients           =   self.get_clients()
+
+        #Load generator options of the summary, one process, no target rate
+        self.int_connection_count   =   len(self.list_clients)
+        self.int_process_count      =   1
+        self.float_rate             =   0.0
+        self.list_rtu_frames        =   None
+
+        #Seconds each request was sent after its scheduled time
+        self.list_lags              =   []
+
+    def get_pdu(self, int_function_code, int_address, int_count):
+
+        #=====================================================================================
+        #   Function Name  :    get_pdu
+        #   Description    :    Returns the request PDU of one record, None if it is not
+        #                       replayed
+        #=====================================================================================
+
+        if int_function_code in LIST_REPLAY_READ_FUNCTION_CODES:
+            return struct.pack('>BHH', int_function_code, int_address, int_count)
+
+        if not self.bool_writes or int_function_code not in LIST_REPLAY_WRITE_FUNCTION_CODES:
+            return None
+
+        #Single writes of 0, multiple writes of count zero coils or registers
+        if int_function_code in [5, 6]:
+            return struct.pack('>BHH', int_function_code, int_address, 0)
+
+        int_byte_count  =   (int_count + 7) // 8 if int_function_code == 15 else 2 * int_count
+
+        return struct.pack('>BHHB', int_function_code, int_address, int_count, int_byte_count) + bytes(int_byte_count)
+
+    def get_clients(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_clients
+        #   Description    :    Returns one list of (offset in seconds, unit ID, PDU, count)
+        #                       per recorded client, offsets are from the first request of
+        #                       the journal
+        #=====================================================================================
+
+        dict_clients        =   {}
+
+        if not self.arr_records.size:
+            return []
+
+        arr_records         =   self.arr_records[np.argsort(self.arr_records['int_time_us'], kind='stable')]
+        int_first_time_us   =   int(arr_records['int_time_us'][0])
+
+        for int_time_us, int_client_id, int_unit_id, int_function_code, int_address, int_count in arr_records.tolist():
+
+            bytes_pdu       =   self.get_pdu(int_function_code, int_address, int_count)
+            if bytes_pdu is None:
+                self.int_skipped    +=  1
+                continue
+
+            dict_clients.setdefault(int_client_id, []).append(((int_time_us - int_first_time_us) / 1e6, int_unit_id, bytes_pdu, int_count))
+
+        return [dict_clients[int_client_id] for int_client_id in sorted(dict_clients)]
+
+    async def run_connection(self, int_connection, float_start, dict_stats, arr_latencies):
+
+        #=====================================================================================
+        #   Function Name  :    run_connection
+        #   Description    :    Replays the requests of one recorded client. A timeout or a
+        #                       broken connection is counted and the connection is reopened
+        #                       for the next request.
+        #=====================================================================================
+
+        tuple_target        =   self.list_targets[int_connection % len(self.list_targets)]
+        int_transaction_id  =   0
+        obj_reader          =   None
+        obj_writer          =   None
+
+        for float_offset, int_unit_id, bytes_pdu, int_count in self.list_clients[int_connection]:
+
+            #Wait for the recorded time of the request
+            if self.float_speed:
+                float_deadline  =   float_start + float_offset / self.float_speed
+                float_delay     =   float_deadline - time.perf_counter()
+                if float_delay > 0:
+                    await asyncio.sleep(float_delay)
+                self.list_lags.append(max(time.perf_counter() - float_deadline, 0.0))
+
+            try:
+                if obj_writer is None:
+                    obj_reader, obj_writer  =   await self.connect(tuple_target)
+
+                int_transaction_id  =   (int_transaction_id + 1) & 0xFFFF
+                if self.str_framer == 'rtu':
+                    bytes_request   =   self.get_rtu_frame(struct.pack('>B', int_unit_id) + bytes_pdu)
+                else:
+                    bytes_request   =   struct.pack('>HHHB', int_transaction_id, 0, len(bytes_pdu) + 1, int_unit_id) + bytes_pdu
+
+                float_send          =   time.perf_counter()
+                obj_writer.write(bytes_request)
+                dict_stats['int_requests']      +=  1
+                dict_stats['int_bytes_sent']    +=  len(bytes_request)
+
+                int_bytes, bool_exception   =   await asyncio.wait_for(self.read_response(obj_reader, int_transaction_id), self.float_timeout)
+
+                arr_latencies.append(time.perf_counter() - float_send)
+                dict_stats['int_responses']         +=  1
+                dict_stats['int_bytes_received']    +=  int_bytes
+                if bool_exception:
+                    dict_stats['int_exceptions']    +=  1
+                else:
+                    dict_stats['int_registers']     +=  int_count
+
+            except asyncio.TimeoutError:
+                dict_stats['int_timeouts']  +=  1
+                obj_writer  =   self.close(obj_writer, dict_stats)
+
+            except (OSError, asyncio.IncompleteReadError, ConnectionError):
+                dict_stats['int_errors']    +=  1
+                obj_writer  =   self.close(obj_writer, dict_stats)
+
+        self.close(obj_writer, None)
+
+    def get_summary(self, list_results):
+
+        #=====================================================================================
+        #   Function Name  :    get_summary
+        #   Description    :    Returns the load generator summary with the recorded
+        #                       duration, the skipped records and the schedule lag in ms
+        #=====================================================================================
+
+        dict_summary    =   super().get_summary(list_results)
+        arr_lags        =   np.array(self.list_lags)
+
+        dict_summary.update({
+                                'int_records'               :   int(self.arr_records.size),
+                                'int_skipped'               :   self.int_skipped,
+                                'float_speed'               :   self.float_speed,
+                                'float_recorded_seconds'    :   float(np.ptp(self.arr_records['int_time_us']) / 1e6) if self.arr_records.size else 0.0,
+                                'float_lag_mean_ms'         :   float(arr_lags.mean() * 1000) if arr_lags.size else None,
+                                'float_lag_max_ms'          :   float(arr_lags.max() * 1000) if arr_lags.size else None
+                            })
+
+        return dict_summary
@@ -0,0 +1,314 @@
+#=========================================================================================
+#   Name        :   fault_injector.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a fault injector module which does the following:
+#                       1.  Defines DataSimFaultInjector class, which reads fault rules
+#                           from a fault config CSV (one rule per row, active over a
+#                           timeline window, for a set of unit IDs and an address range)
+#                       2.  Supports response latency from a distribution, bandwidth caps
+#                           per connection, dropped responses, Modbus exception responses,
+#                           connection resets and connection stalls
+#                       3.  Defines DataSimFaultTcpServer, a pymodbus TCP server whose
+#                           connections apply the faults to every response they send.
+#                           It is only used when a fault config is given, so a server
+#                           without faults runs the plain pymodbus handler.
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from pymodbus.server import ModbusTcpServer
+from pymodbus.server.requesthandler import ServerRequestHandler
+from pymodbus.pdu import ExceptionResponse
+import pandas as pd
+import numpy as np
+import socket
+import struct
+import time
+
+#Variable definition
+LIST_FAULT_TYPES            =   ['latency', 'bandwidth', 'drop', 'exception', 'reset', 'stall']
+LIST_ACTION_FAULTS          =   ['drop', 'exception', 'reset']
+LIST_LATENCY_DISTRIBUTIONS  =   ['fixed', 'uniform', 'normal', 'exponential']
+INT_DEFAULT_EXCEPTION_CODE  =   ExceptionResponse.SLAVE_FAILURE
+
+#Class definitions
+class DataSimFaultInjector:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimFaultInjector
+    #   Description    :    Fault rules of one server. Fault config CSV columns:
+    #                           1.  start, end  : timeline window in seconds from the server
+    #                                             start, empty for always
+    #                           2.  unit_ids    : e.g. 1,3-5, empty for all
+    #                           3.  addresses   : inclusive start:end, empty for all, a
+    #                                             request matches if its range overlaps
+    #                           4.  fault       : latency, bandwidth, drop, exception,
+    #                                             reset or stall
+    #                           5.  probability : chance per response, empty for always
+    #                           6.  value       : latency distribution in ms (fixed:20,
+    #                                             uniform:10:50, normal:50:10,
+    #                                             exponential:20), bandwidth in bytes/s,
+    #                                             exception code or stall seconds
+    #                       The first matching reset, drop or exception applies, latencies
+    #                       add up and the lowest bandwidth cap applies.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_fault_config_filepath  =   kwargs.get('str_fault_config_filepath', None)
+        self.int_seed                   =   kwargs.get('int_seed', utils.INT_DEFAULT_SIGNAL_SEED)
+        self.obj_logger                 =   kwargs.get('obj_logger', None)
+
+        #Initialize attributes
+        self.obj_rng                    =   np.random.default_rng(self.int_seed)
+        self.float_start                =   time.monotonic()
+        self.dict_fault_counts          =   dict.fromkeys(LIST_FAULT_TYPES, 0)
+        self.list_rules                 =   self.get_rules()
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Fault Injector      :  {len(self.list_rules)} rules from {os.path.basename(self.str_fault_config_filepath)}")
+
+    def get_rules(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_rules
+        #   Description    :    Reads and validates the fault rules of the fault config CSV
+        #=====================================================================================
+
+        obj_utils   =   utils.DataSimUtils()
+        df_rules    =   pd.read_csv(self.str_fault_config_filepath, dtype=str, keep_default_na=False)
+        list_rules  =   []
+
+        for dict_row in df_rules.to_dict(orient='records'):
+
+            str_fault   =   dict_row.get('fault', '').strip()
+            str_value   =   dict_row.get('value', '').strip()
+
+            if str_fault not in LIST_FAULT_TYPES:
+                raise ValueError(f"Unknown fault: {str_fault}")
+
+            dict_rule   =   {
+                                'float_start'       :   float(dict_row.get('start') or 0),
+                                'float_end'         :   float(dict_row.get('end') or np.inf),
+                                'set_unit_ids'      :   set(obj_utils.parse_unit_ids(str_unit_ids=dict_row['unit_ids'])) if dict_row.get('unit_ids', '').strip() else None,
+                                'tuple_addresses'   :   obj_utils.parse_address_range(str_address_range=dict_row.get('addresses', '').strip()),
+                                'str_fault'         :   str_fault,
+                                'float_probability' :   float(dict_row.get('probability') or 1.0)
+                            }
+
+            #Value of the fault
+            if str_fault == 'latency':
+                list_parameters     =   str_value.split(':')
+                if list_parameters[0] not in LIST_LATENCY_DISTRIBUTIONS or len(list_parameters) < 2:
+                    raise ValueError(f"Invalid latency distribution: {str_value}")
+                dict_rule['str_distribution']   =   list_parameters[0]
+                dict_rule['list_parameters']    =   [float(str_parameter) / 1000 for str_parameter in list_parameters[1:]]
+            elif str_fault == 'bandwidth':
+                dict_rule['float_value']        =   float(str_value)
+            elif str_fault == 'exception':
+                dict_rule['int_exception_code'] =   int(str_value or INT_DEFAULT_EXCEPTION_CODE)
+            elif str_fault == 'stall':
+                dict_rule['float_value']        =   float(str_value)
+
+            list_rules.append(dict_rule)
+
+        return list_rules
+
+    def sample_latency(self, dict_rule):
+
+        #=====================================================================================
+        #   Function Name  :    sample_latency
+        #   Description    :    Returns one latency in seconds from the rule distribution
+        #=====================================================================================
+
+        list_parameters     =   dict_rule['list_parameters']
+
+        if dict_rule['str_distribution'] == 'fixed':
+            return list_parameters[0]
+        if dict_rule['str_distribution'] == 'uniform':
+            return self.obj_rng.uniform(list_parameters[0], list_parameters[-1])
+        if dict_rule['str_distribution'] == 'normal':
+            return max(0.0, self.obj_rng.normal(list_parameters[0], list_parameters[-1] if len(list_parameters) > 1 else 0.0))
+
+        return self.obj_rng.exponential(list_parameters[0])
+
+    def get_faults(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    get_faults
+        #   Description    :    Returns the faults of one response as (action, latency in
+        #                       seconds, bandwidth cap in bytes/s, exception code, stall
+        #                       seconds), action is None, 'reset', 'drop' or 'exception'
+        #=====================================================================================
+
+        #Extract keyword args
+        int_unit_id         =   kwargs.get('int_unit_id', None)
+        int_address         =   kwargs.get('int_address', None)
+        int_count           =   kwargs.get('int_count', 1)
+
+        float_elapsed       =   time.monotonic() - self.float_start
+        str_action          =   None
+        float_latency       =   0.0
+        float_bandwidth     =   np.inf
+        int_exception_code  =   INT_DEFAULT_EXCEPTION_CODE
+        float_stall         =   0.0
+
+        for dict_rule in self.list_rules:
+
+            #Rule is active and matches the request
+            if not dict_rule['float_start'] <= float_elapsed < dict_rule['float_end']:
+                continue
+            if str_action is not None and dict_rule['str_fault'] in LIST_ACTION_FAULTS:
+                continue
+            if dict_rule['set_unit_ids'] is not None and int_unit_id not in dict_rule['set_unit_ids']:
+                continue
+            if dict_rule['tuple_addresses'] is not None and (int_address is None or int_address > dict_rule['tuple_addresses'][1] or int_address + max(int_count, 1) - 1 < dict_rule['tuple_addresses'][0]):
+                continue
+            if dict_rule['float_probability'] < 1.0 and self.obj_rng.random() >= dict_rule['float_probability']:
+                continue
+
+            str_fault   =   dict_rule['str_fault']
+
+            if str_fault == 'latency':
+                float_latency       +=  self.sample_latency(dict_rule)
+            elif str_fault == 'bandwidth':
+                float_bandwidth     =   min(float_bandwidth, dict_rule['float_value'])
+            elif str_fault == 'stall':
+                float_stall         =   max(float_stall, dict_rule['float_value'])
+            else:
+                str_action          =   str_fault
+                int_exception_code  =   dict_rule.get('int_exception_code', INT_DEFAULT_EXCEPTION_CODE)
+
+            self.dict_fault_counts[str_fault]   +=  1
+
+        return str_action, float_latency, float_bandwidth, int_exception_code, float_stall
+
+    def get_fault_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_fault_stats
+        #   Description    :    Returns the number of injected faults per type
+        #=====================================================================================
+
+        return dict(self.dict_fault_counts)
+
+class DataSimFaultRequestHandler(ServerRequestHandler):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimFaultRequestHandler
+    #   Description    :    pymodbus connection handler that applies the faults when a
+    #                       response is sent. Responses leave in request order at
+    #                       float_next_send or later, which carries latency, stalls and
+    #                       the bandwidth cap over to the following responses like a busy
+    #                       device would.
+    #=====================================================================================
+
+    def __init__(self, owner, trace_packet, trace_pdu, trace_connect):
+
+        super().__init__(owner, trace_packet, trace_pdu, trace_connect)
+
+        #Connection state
+        self.obj_fault_injector     =   owner.obj_fault_injector
+        self.float_next_send        =   0.0
+
+    def server_send(self, pdu, addr):
+
+        #=====================================================================================
+        #   Function Name  :    server_send
+        #   Description    :    Resets the connection, drops the response, replaces it by an
+        #                       exception or delays it, as the fault rules decide. The
+        #                       request is still the last PDU of the connection here.
+        #=====================================================================================
+
+        if not pdu:
+            return super().server_send(pdu, addr)
+
+        obj_request     =   self.last_pdu
+        str_action, float_latency, float_bandwidth, int_exception_code, float_stall =   self.obj_fault_injector.get_faults  (
+                                                                                                                                int_unit_id     =   pdu.dev_id,
+                                                                                                                                int_address     =   getattr(obj_request, 'address', None),
+                                                                                                                                int_count       =   getattr(obj_request, 'count', 1)
+                                                                                                                            )
+
+        #Reset the connection, linger 0 makes the close send a TCP RST
+        if str_action == 'reset':
+            obj_socket  =   self.transport.get_extra_info('socket') if self.transport else None
+            if obj_socket is not None:
+                obj_socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            if self.transport:
+                self.transport.abort()
+            return None
+
+        #Never answer
+        if str_action == 'drop':
+            return None
+
+        #Answer with a Modbus exception
+        if str_action == 'exception':
+            obj_response                    =   ExceptionResponse(pdu.function_code & 0x7F, exception_code=int_exception_code)
+            obj_response.transaction_id     =   pdu.transaction_id
+            obj_response.dev_id             =   pdu.dev_id
+            pdu                             =   obj_response
+
+        #Send time after the latency, the stall and the previous responses of the connection,
+        #the bandwidth cap delays the next response by this frame as the framer encodes it
+        float_now       =   time.monotonic()
+        float_send      =   max(float_now + float_latency, self.float_next_send)
+        if float_stall:
+            float_send  =   max(float_send, float_now + float_stall)
+
+        self.float_next_send    =   float_send
+        if float_bandwidth != np.inf:
+            self.float_next_send    +=  len(self.framer.encode(pdu.function_code.to_bytes(1, 'big') + pdu.encode(), pdu.dev_id, pdu.transaction_id)) / float_bandwidth
+
+        if float_send <= float_now:
+            return super().server_send(pdu, addr)
+
+        self.loop.call_later(float_send - float_now, self.send_delayed, pdu, addr)
+        return None
+
+    def send_delayed(self, pdu, addr):
+
+        #=====================================================================================
+        #   Function Name  :    send_delayed
+        #   Description    :    Sends a delayed response if the connection is still open
+        #=====================================================================================
+
+        if self.transport:
+            super().server_send(pdu, addr)
+
+class DataSimFaultTcpServer(ModbusTcpServer):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimFaultTcpServer
+    #   Description    :    pymodbus TCP server whose connections apply the fault rules
+    #=====================================================================================
+
+    def __init__(self, context, **kwargs):
+
+        self.obj_fault_injector     =   kwargs.pop('obj_fault_injector')
+        super().__init__(context, **kwargs)
+
+        #Fault timeline starts with the server
+        self.obj_fault_injector.float_start     =   time.monotonic()
+
+    def callback_new_connection(self):
+
+        #=====================================================================================
+        #   Function Name  :    callback_new_connection
+        #   Description    :    Returns the fault handler for a new client connection
+        #=====================================================================================
+
+        if self.trace_connect:
+            self.trace_connect(True)
+
+        return DataSimFaultRequestHandler(self, self.trace_packet, self.trace_pdu, self.trace_connect)
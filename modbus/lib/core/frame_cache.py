@@ -0,0 +1,143 @@
+#=========================================================================================
+#   Name        :   frame_cache.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a frame cache module which does the following:
+#                       1.  Defines DataSimFrameCache class
+#                       2.  Compiles the address vector and the encoded uint16 frame
+#                           matrix of an asset into .npy files in the cache folder
+#                       3.  Keys the files by a hash of the tag list and tag data CSVs and
+#                           the encoding options
+#                       4.  Memory maps the files read-only when they are valid and only
+#                           rebuilds them from the CSVs when the inputs change
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+import numpy as np
+import glob
+import time
+
+#Class definitions
+class DataSimFrameCache:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimFrameCache
+    #   Description    :    Compiled frame artifacts of one asset:
+    #                           1.  <asset>_addresses_<hash>.npy : int64[registers]
+    #                           2.  <asset>_frames_<hash>.npy    : uint16[timesteps x registers]
+    #                       The frames file is written last, so an artifact is valid once
+    #                       both files exist and their shapes agree.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_asset_type     =   kwargs.get('str_asset_type', utils.STR_DEFAULT_ASSET_TYPE)
+        self.str_filepath       =   kwargs.get('str_filepath', utils.STR_DEFAULT_CONFIG_FILEPATH)
+        self.str_cache_path     =   kwargs.get('str_cache_path', utils.STR_DEFAULT_CACHE_FILEPATH)
+        self.dict_options       =   kwargs.get('dict_encoding_options', {})
+        self.obj_logger         =   kwargs.get('obj_logger', None)
+
+        #initialization of classes and packages
+        self.obj_utils          =   utils.DataSimUtils()
+
+        #Artifact paths keyed by the content of the source files and the encoding options
+        self.str_digest         =   self.obj_utils.get_frame_source_digest(str_asset_type=self.str_asset_type, str_filepath=self.str_filepath, dict_encoding_options=self.dict_options)[:16]
+        self.str_addresses_path =   os.path.join(self.str_cache_path, f"{self.str_asset_type}_addresses_{self.str_digest}.npy")
+        self.str_frames_path    =   os.path.join(self.str_cache_path, f"{self.str_asset_type}_frames_{self.str_digest}.npy")
+        self.bool_built         =   False
+
+    def load(self):
+
+        #=====================================================================================
+        #   Function Name  :    load
+        #   Description    :    Memory maps a valid artifact read-only, returns None if it is
+        #                       missing or unreadable
+        #=====================================================================================
+
+        try:
+            arr_addresses   =   np.load(self.str_addresses_path, mmap_mode='r')
+            arr_frames      =   np.load(self.str_frames_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+
+        #Validate the artifact
+        if arr_addresses.dtype != np.int64 or arr_frames.dtype != np.uint16 or arr_frames.ndim != 2 or arr_frames.shape[1] != arr_addresses.size:
+            return None
+
+        return arr_addresses, arr_frames
+
+    def save(self, arr_addresses, arr_frames):
+
+        #=====================================================================================
+        #   Function Name  :    save
+        #   Description    :    This function does the following:
+        #                           1.  Writes each array to a temporary file and renames it
+        #                               into place, the frames file last
+        #                           2.  Removes the artifacts of older inputs of this asset
+        #=====================================================================================
+
+        os.makedirs(self.str_cache_path, exist_ok=True)
+
+        for str_path, arr_values, obj_dtype in [(self.str_addresses_path, arr_addresses, np.int64), (self.str_frames_path, arr_frames, np.uint16)]:
+            str_temp_path   =   f"{str_path}.{os.getpid()}.tmp"
+            with open(str_temp_path, 'wb') as obj_file:
+                np.save(obj_file, np.ascontiguousarray(arr_values, dtype=obj_dtype))
+            os.replace(str_temp_path, str_path)
+
+        #Remove stale artifacts
+        for str_path in glob.glob(os.path.join(self.str_cache_path, f"{self.str_asset_type}_addresses_*.npy")) + glob.glob(os.path.join(self.str_cache_path, f"{self.str_asset_type}_frames_*.npy")):
+            if str_path not in (self.str_addresses_path, self.str_frames_path):
+                try:
+                    os.remove(str_path)
+                except OSError:
+                    pass
+
+    def load_or_build(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    load_or_build
+        #   Description    :    This function does the following:
+        #                           1.  Memory maps the artifact when it is valid
+        #                           2.  Otherwise calls func_build_frames, which returns the
+        #                               address vector and the frame matrix, writes the
+        #                               artifact and memory maps it
+        #                           3.  Returns the read-only address vector and frames
+        #=====================================================================================
+
+        #Extract keyword args
+        func_build_frames   =   kwargs.get('func_build_frames', None)
+
+        float_start         =   time.perf_counter()
+        tuple_frames        =   self.load()
+
+        #Rebuild from the CSVs
+        if tuple_frames is None:
+
+            arr_addresses, arr_frames   =   func_build_frames()
+
+            try:
+                self.save(arr_addresses, arr_frames)
+                tuple_frames            =   self.load()
+            except OSError as obj_error:
+                #Read-only config mount, run from the built frames
+                if self.obj_logger:
+                    self.obj_logger.info(f"Frame Cache         :  Not written ({obj_error})")
+
+            if tuple_frames is None:
+                tuple_frames            =   (arr_addresses, arr_frames)
+
+            self.bool_built             =   True
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Frame Cache         :  {'Built' if self.bool_built else 'Loaded'} {os.path.basename(self.str_frames_path)} in {(time.perf_counter() - float_start)*1000:.1f} ms")
+
+        return tuple_frames
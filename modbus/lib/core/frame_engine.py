@@ -0,0 +1,487 @@
+#=========================================================================================
+#   Name        :   frame_engine.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a frame engine module which does the following:
+#                       1.  Defines DataSimFrameEngine class
+#                       2.  Stores all register data as one contiguous uint16 matrix
+#                           (timesteps x registers) with a sorted address vector
+#                       3.  Returns the next frame each tick with a single row select
+#                       4.  Reports the memory footprint of the frame store per tag
+#                       5.  Compiles the address vector into contiguous runs so each
+#                           run is written with one bulk setValues call
+#                       6.  Selects the frames of all virtual devices in one pass, each
+#                           device playing the same table with its own phase
+#                       7.  Resamples the table once at load time to the sample period,
+#                           per tag by interpolation, forward fill or nearest sample
+#                       8.  Plays back by row (one row per tick) or by timestamp (rows
+#                           advance with the publish interval over the sample period)
+#                       9.  Diffs the register map and data against a previous frame
+#                           store for hot reloads
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import register_codec
+import pandas as pd
+import numpy as np
+
+#Class definitions
+class DataSimFrameEngine:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimFrameEngine
+    #   Description    :    Compact frame store used by the publish loop:
+    #                           1.  arr_addresses : sorted register addresses (int64)
+    #                           2.  arr_frames    : uint16 matrix (timesteps x registers)
+    #                           3.  int_index     : ticks played, the next row to publish
+    #                                               is int_index * int_tick_ns // int_row_ns
+    #                           4.  list_runs     : contiguous address runs as tuples of
+    #                                               (start address, start column, end column)
+    #                           5.  arr_phases    : row offset of each virtual device
+    #                           6.  int_tick_ns / int_row_ns : rows advanced per tick as
+    #                                               an exact ratio, 1/1 for row playback
+    #=====================================================================================
+
+    def __init__(self):
+
+        #initialization of classes and packages
+        self.obj_utils          =   utils.DataSimUtils()
+
+        #Initialize attributes, populated by load_frames
+        self.list_tag_names     =   []
+        self.obj_codec          =   None
+        self.arr_addresses      =   np.empty(0, dtype=np.int64)
+        self.arr_frames         =   np.empty((0, 0), dtype=np.uint16)
+        self.int_index          =   0
+        self.list_runs          =   []
+        self.arr_phases         =   np.zeros(1, dtype=np.int64)
+        self.int_tick_ns        =   1
+        self.int_row_ns         =   1
+
+    def load_frames(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    load_frames
+        #   Description    :    This function does the following:
+        #                           1.  Matches the data columns with the tag list addresses
+        #                               and sorts them by register address
+        #                           2.  Resamples the table to str_sample_period if it has
+        #                               a timestamp index
+        #                           3.  Packs the table into register words by data type,
+        #                               word and byte order in one vectorized pass and
+        #                               stores it as a uint16 matrix
+        #                           4.  Compiles the contiguous address runs
+        #=====================================================================================
+
+        #Extract keyword args
+        df_server_data          =   kwargs.get('df_server_data', None)
+        dict_server_tag_list    =   kwargs.get('dict_server_tag_list', None)
+        str_sample_period       =   kwargs.get('str_sample_period', None)
+        dict_resample_methods   =   kwargs.get('dict_resample_methods', {})
+        dict_tag_encodings      =   kwargs.get('dict_tag_encodings', {})
+        obj_logger              =   kwargs.get('obj_logger', None)
+
+        #Match and order the data columns by register address
+        arr_addresses, list_ordered_columns =   self.get_column_order   (
+                                                                            list_columns            =   list(df_server_data.columns),
+                                                                            dict_server_tag_list    =   dict_server_tag_list,
+                                                                            obj_logger              =   obj_logger
+                                                                        )
+
+        self.list_tag_names     =   list_ordered_columns
+        df_values               =   df_server_data[list_ordered_columns]
+
+        #Resample on the timestamps
+        if str_sample_period and isinstance(df_server_data.index, pd.DatetimeIndex) and len(df_server_data.index):
+            df_values           =   self.resample_values(
+                                                            arr_timestamps  =   df_server_data.index.values.astype('datetime64[ns]').astype(np.int64),
+                                                            df_values       =   df_values,
+                                                            int_period_ns   =   self.obj_utils.get_period_ns(str_period=str_sample_period),
+                                                            list_methods    =   [dict_resample_methods.get(str_column.replace(' ', ''), utils.STR_DEFAULT_RESAMPLE_METHOD) for str_column in list_ordered_columns],
+                                                            obj_logger      =   obj_logger
+                                                        )
+
+        #Pack the values into the contiguous uint16 register matrix, reporting clipped values once
+        self.obj_codec          =   register_codec.DataSimRegisterCodec (
+                                                                            list_tag_names      =   list_ordered_columns,
+                                                                            arr_tag_addresses   =   arr_addresses,
+                                                                            dict_tag_encodings  =   dict_tag_encodings,
+                                                                            obj_logger          =   obj_logger
+                                                                        )
+
+        return self.set_frames  (
+                                    arr_addresses   =   self.obj_codec.arr_addresses,
+                                    arr_frames      =   self.obj_codec.encode(arr_values=df_values, obj_logger=obj_logger),
+                                    obj_logger      =   obj_logger
+                                )
+
+    def resample_values(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    resample_values
+        #   Description    :    This function does the following:
+        #                           1.  Builds the target grid from the first to the last
+        #                               timestamp every int_period_ns
+        #                           2.  Finds the source rows around every target time once
+        #                           3.  Fills the columns of each method in one pass:
+        #                                   a.  interpolate : linear in time, as float64
+        #                                   b.  ffill       : last sample at or before (step)
+        #                                   c.  nearest     : closest sample in time
+        #                               ffill and nearest copy samples, so integer columns
+        #                               keep their dtype and stay exact above 2^53
+        #                           4.  Returns the columns in the order of df_values
+        #=====================================================================================
+
+        #Extract keyword args
+        arr_timestamps      =   kwargs.get('arr_timestamps', None)
+        df_values           =   kwargs.get('df_values', None)
+        int_period_ns       =   kwargs.get('int_period_ns', None)
+        list_methods        =   kwargs.get('list_methods', None)
+        obj_logger          =   kwargs.get('obj_logger', None)
+
+        #Target grid and the source rows before and after every target time
+        int_row_count       =   int((arr_timestamps[-1] - arr_timestamps[0]) // int_period_ns) + 1
+        arr_targets         =   arr_timestamps[0] + np.arange(int_row_count, dtype=np.int64) * int_period_ns
+        arr_prev            =   np.searchsorted(arr_timestamps, arr_targets, side='right') - 1
+        arr_next            =   np.minimum(arr_prev + 1, arr_timestamps.size - 1)
+        arr_methods         =   np.array(list_methods, dtype=object)
+
+        #Columns by position, the tag names may repeat
+        df_positions        =   df_values.set_axis(range(df_values.shape[1]), axis=1)
+
+        #Forward fill
+        arr_columns         =   np.flatnonzero(arr_methods == 'ffill')
+        df_ffill            =   df_positions.iloc[arr_prev, arr_columns].reset_index(drop=True)
+
+        #Nearest sample, ties take the earlier one
+        arr_columns         =   np.flatnonzero(arr_methods == 'nearest')
+        arr_nearest         =   np.where(arr_timestamps[arr_next] - arr_targets < arr_targets - arr_timestamps[arr_prev], arr_next, arr_prev)
+        df_nearest          =   df_positions.iloc[arr_nearest, arr_columns].reset_index(drop=True)
+
+        #Linear interpolation
+        arr_columns         =   np.flatnonzero(arr_methods == 'interpolate')
+        arr_span            =   (arr_timestamps[arr_next] - arr_timestamps[arr_prev]).astype(np.float64)
+        arr_fraction        =   np.divide(arr_targets - arr_timestamps[arr_prev], arr_span, out=np.zeros(int_row_count), where=arr_span > 0)[:, None]
+        arr_interpolate     =   df_positions.iloc[:, arr_columns].to_numpy(dtype=np.float64)
+        df_interpolate      =   pd.DataFrame(arr_interpolate[arr_prev] + arr_fraction * (arr_interpolate[arr_next] - arr_interpolate[arr_prev]), columns=arr_columns)
+
+        df_resampled        =   pd.concat([df_ffill, df_nearest, df_interpolate], axis=1)[list(range(df_values.shape[1]))].set_axis(df_values.columns, axis=1)
+
+        #Log message
+        if obj_logger:
+            obj_logger.info(f"Resampled           :  {df_values.shape[0]} rows to {int_row_count} rows every {int_period_ns/1e9:g} s")
+
+        return df_resampled
+
+    def get_column_order(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    get_column_order
+        #   Description    :    This function does the following:
+        #                           1.  Matches the data columns with the tag list addresses
+        #                           2.  Sorts them by register address, overlapping
+        #                               addresses keep the last tag
+        #                           3.  Returns the sorted addresses and the column names in
+        #                               the same order
+        #=====================================================================================
+
+        #Extract keyword args
+        list_columns            =   kwargs.get('list_columns', None)
+        dict_server_tag_list    =   kwargs.get('dict_server_tag_list', None)
+        obj_logger              =   kwargs.get('obj_logger', None)
+
+        #Tag list keys have their spaces removed, so match the data columns the same way
+        list_columns            =   [str_column for str_column in list_columns if str_column != utils.STR_DEFAULT_TIME_COLUMN_IDENTIFIER]
+        list_matched_columns    =   [str_column for str_column in list_columns if str_column.replace(' ', '') in dict_server_tag_list]
+        list_missing_columns    =   [str_column for str_column in list_columns if str_column.replace(' ', '') not in dict_server_tag_list]
+
+        #Log data columns without an address in the tag list
+        if list_missing_columns and obj_logger:
+            obj_logger.info(f"Tags Without Address : {list_missing_columns}")
+
+        #Sort columns by register address
+        arr_addresses           =   np.array([dict_server_tag_list[str_column.replace(' ', '')] for str_column in list_matched_columns], dtype=np.int64)
+        arr_order               =   np.argsort(arr_addresses, kind='stable')
+
+        #Overlapping addresses keep the last tag in the tag list, like the old per register writes did
+        arr_sorted_addresses    =   arr_addresses[arr_order]
+        arr_keep                =   np.append(arr_sorted_addresses[1:] != arr_sorted_addresses[:-1], True)
+        if not arr_keep.all() and obj_logger:
+            obj_logger.info(f"Overlapping Address :  {np.unique(arr_sorted_addresses[~arr_keep]).tolist()}")
+        arr_order               =   arr_order[arr_keep]
+
+        return arr_addresses[arr_order], [list_matched_columns[int_column] for int_column in arr_order]
+
+    def set_frames(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    set_frames
+        #   Description    :    Sets an already encoded address vector and frame matrix,
+        #                       e.g. read-only views of a shared memory segment, and
+        #                       compiles the contiguous address runs
+        #=====================================================================================
+
+        #Extract keyword args
+        self.arr_addresses      =   kwargs.get('arr_addresses', None)
+        self.arr_frames         =   kwargs.get('arr_frames', None)
+        obj_logger              =   kwargs.get('obj_logger', None)
+        self.int_index          =   0
+
+        #Log the frame store size
+        if obj_logger:
+            obj_logger.info(f"Frame Store         :  {self.arr_frames.shape[0]} timesteps x {self.arr_frames.shape[1]} registers")
+
+        #Compile the write runs
+        self.compile_runs(obj_logger=obj_logger)
+
+        return self
+
+    def compile_runs(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    compile_runs
+        #   Description    :    This function does the following:
+        #                           1.  Splits the sorted address vector wherever the next
+        #                               address is not the previous address + 1
+        #                           2.  Stores each run as (start address, start column,
+        #                               end column) so a frame slice maps to one write
+        #                           3.  Logs the address gaps between runs
+        #=====================================================================================
+
+        #Extract keyword args
+        obj_logger          =   kwargs.get('obj_logger', None)
+
+        #Column indices where a new run starts
+        arr_breaks          =   np.flatnonzero(np.diff(self.arr_addresses) != 1) + 1
+        arr_starts          =   np.concatenate(([0], arr_breaks)) if self.arr_addresses.size else np.empty(0, dtype=np.int64)
+        arr_ends            =   np.append(arr_breaks, self.arr_addresses.size) if self.arr_addresses.size else np.empty(0, dtype=np.int64)
+
+        self.list_runs      =   [
+                                    (int(self.arr_addresses[int_start]), int(int_start), int(int_end))
+                                    for int_start, int_end in zip(arr_starts, arr_ends)
+                                ]
+
+        #Log the runs and the gaps between them
+        if obj_logger:
+            list_gaps       =   [
+                                    (int(self.arr_addresses[int_break - 1]) + 1, int(self.arr_addresses[int_break]) - 1)
+                                    for int_break in arr_breaks
+                                ]
+            obj_logger.info(f"Register Runs       :  {len(self.list_runs)} runs for {self.arr_addresses.size} registers")
+            if list_gaps:
+                obj_logger.info(f"Address Gaps        :  {list_gaps}")
+
+        return self.list_runs
+
+    def next_frame(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    next_frame
+        #   Description    :    Returns the next frame (one row of the matrix) and moves
+        #                       the index forward, wrapping around at the last timestep.
+        #                       Frames skipped by the tick scheduler are stepped over.
+        #=====================================================================================
+
+        #Extract keyword args
+        int_skipped_frames  =   kwargs.get('int_skipped_frames', 0)
+
+        #Step over skipped frames
+        self.int_index  +=  int_skipped_frames
+
+        #Select the row for this tick
+        arr_frame       =   self.arr_frames[(self.int_index * self.int_tick_ns // self.int_row_ns) % self.arr_frames.shape[0]]
+
+        #Increment index
+        self.int_index  +=  1
+
+        return arr_frame
+
+    def set_devices(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    set_devices
+        #   Description    :    Sets the number of virtual devices, device i plays the
+        #                       table int_phase_offset + i * int_phase_step rows ahead
+        #=====================================================================================
+
+        #Extract keyword args
+        int_device_count    =   kwargs.get('int_device_count', 1)
+        int_phase_step      =   kwargs.get('int_phase_step', utils.INT_DEFAULT_PHASE_STEP)
+        int_phase_offset    =   kwargs.get('int_phase_offset', 0)
+
+        self.arr_phases     =   int_phase_offset + np.arange(int_device_count, dtype=np.int64) * int_phase_step
+
+        return self.arr_phases
+
+    def set_playback(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    set_playback
+        #   Description    :    Sets how far playback moves per tick, returns rows per tick:
+        #                           1.  row       : one row per tick
+        #                           2.  timestamp : float_publish_interval over the sample
+        #                                           period, e.g. 1 s ticks on 1 min rows
+        #                                           hold each row for 60 ticks
+        #=====================================================================================
+
+        #Extract keyword args
+        str_playback_mode       =   kwargs.get('str_playback_mode', utils.STR_DEFAULT_PLAYBACK_MODE)
+        float_publish_interval  =   kwargs.get('float_publish_interval', utils.FLOAT_DEFAULT_PUBLISH_INTERVAL)
+        str_sample_period       =   kwargs.get('str_sample_period', utils.STR_DEFAULT_SAMPLE_DURATION)
+
+        #Validate the playback mode
+        if str_playback_mode not in utils.LIST_PLAYBACK_MODES:
+            raise ValueError(f"Unknown playback mode: {str_playback_mode}")
+
+        #Integer ratio so rows land on exact ticks
+        if str_playback_mode == 'timestamp':
+            self.int_tick_ns    =   int(round(float_publish_interval * 1e9))
+            self.int_row_ns     =   self.obj_utils.get_period_ns(str_period=str_sample_period)
+        else:
+            self.int_tick_ns    =   1
+            self.int_row_ns     =   1
+
+        return self.int_tick_ns / self.int_row_ns
+
+    def next_frames(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    next_frames
+        #   Description    :    Returns the next frame of every virtual device as a
+        #                       (devices x registers) matrix with one fancy index select
+        #=====================================================================================
+
+        #Extract keyword args
+        int_skipped_frames  =   kwargs.get('int_skipped_frames', 0)
+
+        #Step over skipped frames
+        self.int_index      +=  int_skipped_frames
+
+        #Select one row per device, the row follows the ticks played so far
+        int_row             =   self.int_index * self.int_tick_ns // self.int_row_ns
+        arr_device_frames   =   self.arr_frames[(int_row + self.arr_phases) % self.arr_frames.shape[0]]
+
+        #Increment index
+        self.int_index      +=  1
+
+        return arr_device_frames
+
+    def get_runs_in_range(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    get_runs_in_range
+        #   Description    :    Returns the write runs clipped to an inclusive address
+        #                       range, all runs if no range is given
+        #=====================================================================================
+
+        #Extract keyword args
+        tuple_address_range =   kwargs.get('tuple_address_range', None)
+
+        #No range given
+        if tuple_address_range is None:
+            return list(self.list_runs)
+
+        int_range_start, int_range_end  =   tuple_address_range
+        list_clipped_runs               =   []
+
+        for int_start_address, int_start_column, int_end_column in self.list_runs:
+
+            int_end_address     =   int_start_address + (int_end_column - int_start_column) - 1
+
+            #Skip runs outside the range
+            if int_end_address < int_range_start or int_start_address > int_range_end:
+                continue
+
+            int_clip_start      =   max(int_start_address, int_range_start)
+            int_clip_end        =   min(int_end_address, int_range_end)
+            list_clipped_runs.append((
+                                        int_clip_start,
+                                        int_start_column + (int_clip_start - int_start_address),
+                                        int_start_column + (int_clip_end - int_start_address) + 1
+                                    ))
+
+        return list_clipped_runs
+
+    def get_source_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_source_stats
+        #   Description    :    Returns the frame source counters, none for the in memory
+        #                       frame store
+        #=====================================================================================
+
+        return {}
+
+    def get_frame_diff(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    get_frame_diff
+        #   Description    :    Returns the registers added and removed since a previous
+        #                       frame store and the number of kept registers whose data
+        #                       changed. Data is compared only between two in memory
+        #                       frame stores, computed sources have no fixed table.
+        #=====================================================================================
+
+        #Extract keyword args
+        obj_previous_frame_engine   =   kwargs.get('obj_previous_frame_engine', None)
+
+        arr_kept, arr_previous_columns, arr_columns =   np.intersect1d(obj_previous_frame_engine.arr_addresses, self.arr_addresses, return_indices=True)
+        int_changed                 =   0
+
+        if type(self) is type(obj_previous_frame_engine) is DataSimFrameEngine:
+
+            int_rows                =   min(self.arr_frames.shape[0], obj_previous_frame_engine.arr_frames.shape[0])
+            arr_changed             =   (self.arr_frames[:int_rows, arr_columns] != obj_previous_frame_engine.arr_frames[:int_rows, arr_previous_columns]).any(axis=0)
+            int_changed             =   arr_kept.size if self.arr_frames.shape[0] != obj_previous_frame_engine.arr_frames.shape[0] else int(np.count_nonzero(arr_changed))
+
+        return  {
+                    'arr_added_addresses'   :   np.setdiff1d(self.arr_addresses, arr_kept),
+                    'arr_removed_addresses' :   np.setdiff1d(obj_previous_frame_engine.arr_addresses, arr_kept),
+                    'int_changed_count'     :   int_changed
+                }
+
+    def close(self):
+
+        #=====================================================================================
+        #   Function Name  :    close
+        #   Description    :    Releases the resources of the frame source, nothing for the
+        #                       in memory frame store
+        #=====================================================================================
+
+        return None
+
+    def get_memory_footprint(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    get_memory_footprint
+        #   Description    :    Returns the memory used by the frame store in bytes,
+        #                       in total and per tag
+        #=====================================================================================
+
+        #Extract keyword args
+        obj_logger          =   kwargs.get('obj_logger', None)
+
+        #Compute the footprint of the address vector and the frame matrix
+        int_total_bytes     =   int(self.arr_addresses.nbytes + self.arr_frames.nbytes)
+        int_tag_count       =   int(self.arr_addresses.size)
+        float_bytes_per_tag =   int_total_bytes / int_tag_count if int_tag_count else 0.0
+
+        dict_footprint      =   {
+                                    'int_tag_count'         :   int_tag_count,
+                                    'int_timestep_count'    :   int(self.arr_frames.shape[0]),
+                                    'int_total_bytes'       :   int_total_bytes,
+                                    'float_bytes_per_tag'   :   float_bytes_per_tag
+                                }
+
+        #Log the footprint
+        if obj_logger:
+            obj_logger.info(f"Frame Memory        :  {int_total_bytes} bytes ({float_bytes_per_tag:.1f} bytes/tag)")
+
+        return dict_footprint
@@ -0,0 +1,303 @@
+#=========================================================================================
+#   Name        :   metrics.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a metrics module which does the following:
+#                       1.  Defines DataSimMetrics class
+#                       2.  Keeps fixed bucket histograms of the tick duration, tick
+#                           lateness, request latency and event loop lag, one bisect and
+#                           two additions per observation
+#                       3.  Measures the event loop lag with a background sleep task
+#                       4.  Serves the counters of the server, tick scheduler and frame
+#                           source in the Prometheus text format on a local HTTP port,
+#                           values that are already counted elsewhere are only read when
+#                           scraped
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+import bisect
+import time
+
+#Variable definition
+LIST_TICK_BUCKETS           =   [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+LIST_REQUEST_BUCKETS        =   [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0]
+LIST_LOOP_LAG_BUCKETS       =   [0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0]
+INT_MAX_PENDING_REQUESTS    =   10000
+STR_METRICS_CONTENT_TYPE    =   'text/plain; version=0.0.4; charset=utf-8'
+
+#Class definitions
+class DataSimMetrics:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimMetrics
+    #   Description    :    Runtime metrics of one DataSimModbus server:
+    #                           1.  dict_histograms       : name -> help, bucket bounds,
+    #                                                       bucket counts and sum
+    #                           2.  dict_pending_requests : (unit ID, transaction ID) ->
+    #                                                       receive times, matched with the
+    #                                                       response to time the request
+    #                       The request and tick hooks run in the event loop, so the
+    #                       counters need no lock.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.obj_modbus_server          =   kwargs.get('obj_modbus_server', None)
+        self.float_loop_lag_interval    =   kwargs.get('float_loop_lag_interval', utils.FLOAT_DEFAULT_METRICS_LOOP_LAG_INTERVAL)
+        self.obj_logger                 =   kwargs.get('obj_logger', None)
+
+        #Histograms
+        self.dict_histograms            =   {
+                                                'essds_tick_duration_seconds'   :   self.create_histogram(str_help='Time spent between the start of a tick and the wait for the next one', list_bounds=LIST_TICK_BUCKETS),
+                                                'essds_tick_lateness_seconds'   :   self.create_histogram(str_help='Delay between the tick deadline and the start of the tick', list_bounds=LIST_TICK_BUCKETS),
+                                                'essds_request_latency_seconds' :   self.create_histogram(str_help='Time from a decoded request to its encoded response', list_bounds=LIST_REQUEST_BUCKETS),
+                                                'essds_event_loop_lag_seconds'  :   self.create_histogram(str_help='Delay of the event loop in waking up a sleeping task', list_bounds=LIST_LOOP_LAG_BUCKETS)
+                                            }
+
+        #Counters updated by the hooks
+        self.int_registers_published    =   0
+        self.float_last_loop_lag        =   0.0
+        self.dict_pending_requests      =   {}
+
+        #Window of the published registers rate, from one scrape to the next
+        self.float_rate_start           =   time.monotonic()
+        self.int_rate_registers         =   0
+
+    def create_histogram(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    create_histogram
+        #   Description    :    Returns an empty histogram, the last count is the +Inf
+        #                       bucket
+        #=====================================================================================
+
+        #Extract keyword args
+        str_help            =   kwargs.get('str_help', '')
+        list_bounds         =   kwargs.get('list_bounds', LIST_TICK_BUCKETS)
+
+        return  {
+                    'str_help'      :   str_help,
+                    'list_bounds'   :   list_bounds,
+                    'list_counts'   :   [0] * (len(list_bounds) + 1),
+                    'float_sum'     :   0.0
+                }
+
+    def observe(self, str_name, float_value):
+
+        #=====================================================================================
+        #   Function Name  :    observe
+        #   Description    :    Adds one value to a histogram
+        #=====================================================================================
+
+        dict_histogram  =   self.dict_histograms[str_name]
+        dict_histogram['list_counts'][bisect.bisect_left(dict_histogram['list_bounds'], float_value)]  +=  1
+        dict_histogram['float_sum']     +=  float_value
+
+    def observe_tick(self, obj_tick_scheduler, int_register_count):
+
+        #=====================================================================================
+        #   Function Name  :    observe_tick
+        #   Description    :    Tick hook, records the lateness of this tick, the duration
+        #                       of the previous one and the registers published
+        #=====================================================================================
+
+        if obj_tick_scheduler.int_tick_count > 1:
+            self.observe('essds_tick_duration_seconds', obj_tick_scheduler.float_last_tick_duration)
+        self.observe('essds_tick_lateness_seconds', obj_tick_scheduler.float_last_lateness)
+        self.int_registers_published    +=  int_register_count
+
+    def observe_request(self, bool_sending, obj_pdu):
+
+        #=====================================================================================
+        #   Function Name  :    observe_request
+        #   Description    :    PDU hook, keeps the receive time of a request and records
+        #                       the latency when the response with the same unit and
+        #                       transaction ID is sent. Requests of several connections
+        #                       can share an ID, they are answered in order.
+        #=====================================================================================
+
+        tuple_key   =   (obj_pdu.dev_id, obj_pdu.transaction_id)
+
+        if not bool_sending:
+
+            #Requests that are never answered (e.g. broadcasts) must not pile up
+            if len(self.dict_pending_requests) >= INT_MAX_PENDING_REQUESTS:
+                self.dict_pending_requests.clear()
+            self.dict_pending_requests.setdefault(tuple_key, []).append(time.perf_counter())
+
+        else:
+
+            list_received   =   self.dict_pending_requests.get(tuple_key)
+            if list_received:
+                self.observe('essds_request_latency_seconds', time.perf_counter() - list_received.pop(0))
+                if not list_received:
+                    del self.dict_pending_requests[tuple_key]
+
+    async def measure_loop_lag(self):
+
+        #=====================================================================================
+        #   Function Name  :    measure_loop_lag
+        #   Description    :    Sleeps float_loop_lag_interval seconds at a time and
+        #                       records how late the event loop woke the task up
+        #=====================================================================================
+
+        while True:
+
+            float_start                 =   time.perf_counter()
+            await utils.asyncio.sleep(self.float_loop_lag_interval)
+            self.float_last_loop_lag    =   max(0.0, time.perf_counter() - float_start - self.float_loop_lag_interval)
+            self.observe('essds_event_loop_lag_seconds', self.float_last_loop_lag)
+
+    def get_metric_lines(self, str_name, str_type, str_help, list_samples):
+
+        #=====================================================================================
+        #   Function Name  :    get_metric_lines
+        #   Description    :    Returns the HELP, TYPE and sample lines of one metric,
+        #                       list_samples holds (labels, value) tuples
+        #=====================================================================================
+
+        list_lines  =   [f"# HELP {str_name} {str_help}", f"# TYPE {str_name} {str_type}"]
+
+        for str_labels, obj_value in list_samples:
+            list_lines.append(f"{str_name}{str_labels} {obj_value}")
+
+        return list_lines
+
+    def get_histogram_lines(self, str_name):
+
+        #=====================================================================================
+        #   Function Name  :    get_histogram_lines
+        #   Description    :    Returns the cumulative bucket, sum and count lines of a
+        #                       histogram
+        #=====================================================================================
+
+        dict_histogram  =   self.dict_histograms[str_name]
+        list_lines      =   [f"# HELP {str_name} {dict_histogram['str_help']}", f"# TYPE {str_name} histogram"]
+        int_cumulative  =   0
+
+        for float_bound, int_count in zip(dict_histogram['list_bounds'] + ['+Inf'], dict_histogram['list_counts']):
+            int_cumulative  +=  int_count
+            list_lines.append(f'{str_name}_bucket{{le="{float_bound}"}} {int_cumulative}')
+
+        list_lines.append(f"{str_name}_sum {dict_histogram['float_sum']}")
+        list_lines.append(f"{str_name}_count {int_cumulative}")
+
+        return list_lines
+
+    def render(self):
+
+        #=====================================================================================
+        #   Function Name  :    render
+        #   Description    :    Returns all metrics in the Prometheus text format, the
+        #                       published registers per second cover the time since the
+        #                       previous scrape
+        #=====================================================================================
+
+        obj_modbus_server   =   self.obj_modbus_server
+        dict_stats          =   obj_modbus_server.get_stats()
+
+        #Published registers rate since the previous scrape
+        float_now                   =   time.monotonic()
+        float_registers_per_s       =   (self.int_registers_published - self.int_rate_registers) / max(float_now - self.float_rate_start, 1e-9)
+        self.float_rate_start       =   float_now
+        self.int_rate_registers     =   self.int_registers_published
+
+        list_lines  =   []
+        list_lines  +=  self.get_metric_lines('essds_ticks_total', 'counter', 'Ticks published', [('', dict_stats.get('int_tick_count', 0))])
+        list_lines  +=  self.get_metric_lines('essds_tick_overruns_total', 'counter', 'Ticks that started after their deadline had passed', [('', dict_stats.get('int_overrun_count', 0))])
+        list_lines  +=  self.get_metric_lines('essds_skipped_frames_total', 'counter', 'Frames dropped by the skip overrun policy', [('', dict_stats.get('int_skipped_frames', 0))])
+        list_lines  +=  self.get_histogram_lines('essds_tick_duration_seconds')
+        list_lines  +=  self.get_histogram_lines('essds_tick_lateness_seconds')
+        list_lines  +=  self.get_metric_lines('essds_registers_published_total', 'counter', 'Registers published over all devices', [('', self.int_registers_published)])
+        list_lines  +=  self.get_metric_lines('essds_registers_published_per_second', 'gauge', 'Registers published per second since the previous scrape', [('', float_registers_per_s)])
+        list_lines  +=  self.get_metric_lines('essds_requests_total', 'counter', 'Requests received per function code', [(f'{{function_code="{int_function_code}"}}', int_count) for int_function_code, int_count in sorted(dict_stats['dict_request_counts'].items())])
+        list_lines  +=  self.get_histogram_lines('essds_request_latency_seconds')
+        list_lines  +=  self.get_metric_lines('essds_active_connections', 'gauge', 'Open client connections', [('', obj_modbus_server.get_active_connection_count())])
+        list_lines  +=  self.get_histogram_lines('essds_event_loop_lag_seconds')
+        list_lines  +=  self.get_metric_lines('essds_event_loop_lag_last_seconds', 'gauge', 'Last measured event loop lag', [('', self.float_last_loop_lag)])
+        list_lines  +=  self.get_metric_lines('essds_devices', 'gauge', 'Virtual devices served', [('', dict_stats['int_device_count'])])
+        list_lines  +=  self.get_metric_lines('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes', [('', dict_stats['int_rss_bytes'])])
+
+        #Profiler spans, while they are enabled
+        list_spans  =   [(str_span, list_span) for str_span, list_span in obj_modbus_server.obj_profiler.dict_spans.items() if list_span[0]]
+        if list_spans:
+            list_lines  +=  self.get_metric_lines('essds_span_calls_total', 'counter', 'Calls of each profiler span', [(f'{{span="{str_span}"}}', list_span[0]) for str_span, list_span in list_spans])
+            list_lines  +=  self.get_metric_lines('essds_span_seconds_total', 'counter', 'Time spent in each profiler span', [(f'{{span="{str_span}"}}', list_span[1]) for str_span, list_span in list_spans])
+
+        #Injected faults, when a fault config is loaded
+        if 'dict_fault_counts' in dict_stats:
+            list_lines  +=  self.get_metric_lines('essds_faults_total', 'counter', 'Faults injected into responses per fault type', [(f'{{fault="{str_fault}"}}', int_count) for str_fault, int_count in dict_stats['dict_fault_counts'].items()])
+
+        #Response cache counters, when the cache is enabled
+        if 'int_cache_hits' in dict_stats:
+            list_lines  +=  self.get_metric_lines('essds_response_cache_hits_total', 'counter', 'Reads answered from the response cache', [('', dict_stats['int_cache_hits'])])
+            list_lines  +=  self.get_metric_lines('essds_response_cache_misses_total', 'counter', 'Cacheable reads answered from the datastore', [('', dict_stats['int_cache_misses'])])
+
+        #Recorded requests, when the journal is enabled
+        if 'int_journal_records' in dict_stats:
+            list_lines  +=  self.get_metric_lines('essds_journal_records_total', 'counter', 'Requests recorded to the request journal', [('', dict_stats['int_journal_records'])])
+
+        #Numeric counters of the frame source, e.g. stream prefetch stalls
+        for str_key, obj_value in obj_modbus_server.obj_frame_engine.get_source_stats().items() if obj_modbus_server.obj_frame_engine else []:
+            if isinstance(obj_value, (bool, int, float)):
+                str_name    =   'essds_source_' + str_key.split('_', 1)[1]
+                list_lines  +=  self.get_metric_lines(str_name, 'gauge', f"Frame source stat {str_key}", [('', int(obj_value) if isinstance(obj_value, bool) else obj_value)])
+
+        return '\n'.join(list_lines) + '\n'
+
+    async def handle_scrape(self, obj_reader, obj_writer):
+
+        #=====================================================================================
+        #   Function Name  :    handle_scrape
+        #   Description    :    Answers one HTTP request, GET /metrics returns the metrics,
+        #                       any other path 404, then closes the connection
+        #=====================================================================================
+
+        try:
+            bytes_request_line  =   await utils.asyncio.wait_for(obj_reader.readline(), utils.FLOAT_DEFAULT_METRICS_SCRAPE_TIMEOUT)
+
+            #Skip the request headers
+            while (await utils.asyncio.wait_for(obj_reader.readline(), utils.FLOAT_DEFAULT_METRICS_SCRAPE_TIMEOUT)).strip():
+                pass
+
+            list_request        =   bytes_request_line.decode('latin-1').split()
+
+            if len(list_request) >= 2 and list_request[0] == 'GET' and list_request[1].split('?')[0] == '/metrics':
+                str_status, bytes_body  =   '200 OK', self.render().encode()
+            else:
+                str_status, bytes_body  =   '404 Not Found', b'Not Found\n'
+
+            obj_writer.write(f"HTTP/1.1 {str_status}\r\nContent-Type: {STR_METRICS_CONTENT_TYPE}\r\nContent-Length: {len(bytes_body)}\r\nConnection: close\r\n\r\n".encode() + bytes_body)
+            await obj_writer.drain()
+
+        except (OSError, UnicodeDecodeError, utils.asyncio.TimeoutError):
+            pass
+
+        finally:
+            obj_writer.close()
+
+    async def start(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    start
+        #   Description    :    Starts the HTTP endpoint and the event loop lag task
+        #=====================================================================================
+
+        #Extract keyword args
+        str_ip_address      =   kwargs.get('str_ip_address', None)
+        int_port            =   kwargs.get('int_port', None)
+
+        await utils.asyncio.start_server(self.handle_scrape, str_ip_address, int_port)
+        self.obj_loop_lag_task  =   utils.asyncio.create_task(self.measure_loop_lag())
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Metrics             :  http://{str_ip_address}:{int_port}/metrics")
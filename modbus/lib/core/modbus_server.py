@@ -9,9 +9,34 @@
 #                               a.  Initializes server context 
 #                               b.  Intializes server identity 
 #                               c.  Intializes server store 
-#                       3.  Update server data each timestep
+#                       3.  Update server data each timestep by writing the frame into
+#                           the back buffer of a numpy datastore and swapping it in
 #                       4.  Start the async server 
 #                       5.  Create async task to update the values
+#                       6.  Run the update task on the drift-free tick scheduler
+#                       7.  Log one summary line per tick, the per register trace is
+#                           opt-in and sampled by tick and address range
+#                       8.  Serve many virtual devices (unit IDs) from one process, each
+#                           with its own store sized to the tag map
+#                       9.  Count requests per function code and report tick/request
+#                           stats to a fleet supervisor queue
+#                       10. Optionally serve runtime metrics in the Prometheus text
+#                           format on a local HTTP port
+#                       11. Time the tick compute, datastore write and request spans
+#                           and install the profiler signal toggles
+#                       12. Optionally inject network faults into the responses from a
+#                           fault config, the plain pymodbus server runs without one
+#                       13. Optionally prepare the next frame in a worker thread ahead
+#                           of its deadline, so the event loop only swaps the buffers
+#                       14. Swap in a reloaded frame source at a tick boundary, keeping
+#                           the client connections and the playback position
+#                       15. Optionally record every incoming request to an append-only
+#                           binary journal
+#                       16. Optionally answer repeated reads within a tick from one
+#                           cache of encoded responses shared by all connections, cleared
+#                           whenever the registers change
+#                       17. Serves the same datastore over Modbus TCP or UDP, with the
+#                           socket (MBAP) or RTU framer
 #=========================================================================================
 
 #Set path to current directory
@@ -21,9 +46,19 @@ sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
 
 #Import libraries
 from core import utils
-from pymodbus.datastore import ModbusSlaveContext, ModbusServerContext
+from core import tick_scheduler
+from core import numpy_datastore
+from core import metrics
+from core import profiler
+from core import fault_injector
+from core import response_cache
+from core import udp_server
+from pymodbus.datastore import ModbusServerContext
 from pymodbus.device import ModbusDeviceIdentification
-from pymodbus.server import StartAsyncTcpServer
+from pymodbus.server import ModbusTcpServer
+from pymodbus import FramerType
+from concurrent.futures import ThreadPoolExecutor
+import functools
 
 #Class definitions
 class DataSimModbus:
@@ -33,15 +68,36 @@ class DataSimModbus:
     # Description    :  This class is intializing classes,packages and defining async functions
     #==========================================================================================
     
-    def __init__(self):
+    def __init__(self,**kwargs):
+
+        #Extract keyword args
+        self.list_unit_ids               =   kwargs.get('list_unit_ids', None) or [int(utils.STR_DEFAULT_UNIT_ID)]
+        int_register_count               =   kwargs.get('int_register_count', None)
+        self.obj_profiler                =   kwargs.get('obj_profiler', None) or profiler.DataSimProfiler()
 
         #initialization of classes and packages
         self.obj_utils                   =   utils.DataSimUtils()
-        self.store                       =   ModbusSlaveContext()
-        self.context                     =   ModbusServerContext(
+
+        if len(self.list_unit_ids) == 1:
+
+            #Single device answers on every unit ID
+            self.store                   =   numpy_datastore.create_numpy_slave_context()
+            self.context                 =   ModbusServerContext(
                                                                     slaves  =   self.store, 
                                                                     single  =   True
                                                                 )
+            self.list_stores             =   [self.store]
+
+        else:
+
+            #One store per unit ID, holding registers sized to the tag map instead of
+            #the 64k default so memory scales with tags, not with devices
+            self.list_stores             =   [self.create_device_store(int_register_count=int_register_count) for _ in self.list_unit_ids]
+            self.store                   =   self.list_stores[0]
+            self.context                 =   ModbusServerContext(
+                                                                    slaves  =   dict(zip(self.list_unit_ids, self.list_stores)), 
+                                                                    single  =   False
+                                                                )
         
         #Define the server identity
         self.identity                    =  ModbusDeviceIdentification()
@@ -52,32 +108,372 @@ class DataSimModbus:
         self.identity.ModelName          =  "Modbus Server"
         self.identity.MajorMinorRevision =  "1.0"
 
+        #Tick scheduler, frame source, pymodbus server and metrics, set when the server starts
+        self.obj_tick_scheduler          =  None
+        self.obj_frame_engine            =  None
+        self.obj_server                  =  None
+        self.obj_metrics                 =  None
+        self.obj_fault_injector          =  None
+        self.obj_traffic_recorder        =  None
+        self.obj_response_cache          =  None
+        self.obj_frame_executor          =  None
+        self.int_late_prepares           =  0
+
+        #Reloaded frame source waiting for the next tick boundary
+        self.tuple_pending_reload        =  None
+
+        #Requests received per function code
+        self.dict_request_counts         =  {}
+
+    def create_device_store(self,**kwargs):
+
+        #=====================================================================================
+        # Function Name  :  create_device_store 
+        # Description    :  Returns a slave context of numpy blocks whose holding registers
+        #                   cover addresses 0 to int_register_count - 1, other blocks are
+        #                   minimal
+        #=====================================================================================
+
+        #Extract keyword args
+        int_register_count      =   kwargs.get('int_register_count', None)
+
+        #Fall back to the full 64k address space
+        if not int_register_count:
+            return numpy_datastore.create_numpy_slave_context()
+
+        return numpy_datastore.create_numpy_slave_context   (
+                                                                int_register_count  =   int_register_count,
+                                                                int_other_count     =   1
+                                                            )
+
+    def set_register_layout(self,**kwargs):
+
+        #=====================================================================================
+        # Function Name  :  set_register_layout 
+        # Description    :  Sets the register addresses of the frame columns on the
+        #                   holding register block of every device
+        #=====================================================================================
+
+        #Extract keyword args
+        arr_addresses           =   kwargs.get('arr_addresses', None)
+
+        for obj_store in self.list_stores:
+            obj_store.store['h'].set_layout(arr_addresses=arr_addresses)
+
+    def trace_request_pdu(self,bool_sending,obj_pdu):
+
+        #=====================================================================================
+        # Function Name  :  trace_request_pdu 
+        # Description    :  pymodbus trace_pdu hook, counts received requests per function
+        #                   code and returns the PDU unchanged
+        #=====================================================================================
+
+        if not bool_sending:
+            self.dict_request_counts[obj_pdu.function_code] = self.dict_request_counts.get(obj_pdu.function_code, 0) + 1
+
+        #Request latency, only when the metrics endpoint is enabled
+        if self.obj_metrics:
+            self.obj_metrics.observe_request(bool_sending, obj_pdu)
+
+        #Request spans, only while they are enabled
+        if self.obj_profiler.bool_spans:
+            self.obj_profiler.trace_pdu(bool_sending)
+
+        return obj_pdu
+
+    def trace_request_packet(self,bool_sending,bytes_packet):
+
+        #=====================================================================================
+        # Function Name  :  trace_request_packet 
+        # Description    :  pymodbus trace_packet hook, times the request decode and
+        #                   encode spans and returns the packet unchanged
+        #=====================================================================================
+
+        if self.obj_profiler.bool_spans:
+            self.obj_profiler.trace_packet(bool_sending)
+
+        return bytes_packet
+
+    def get_active_connection_count(self):
+
+        #=====================================================================================
+        # Function Name  :  get_active_connection_count 
+        # Description    :  Returns the number of open client connections
+        #=====================================================================================
+
+        return len(self.obj_server.active_connections) if self.obj_server else 0
+
+    def get_stats(self):
+
+        #=====================================================================================
+        # Function Name  :  get_stats 
+        # Description    :  Returns the tick scheduler and frame source counters, request
+        #                   counts and RSS
+        #=====================================================================================
+
+        dict_stats                          =   self.obj_tick_scheduler.get_stats() if self.obj_tick_scheduler else {}
+        dict_stats.update(self.obj_frame_engine.get_source_stats() if self.obj_frame_engine else {})
+        dict_stats['dict_request_counts']   =   dict(self.dict_request_counts)
+        dict_stats['int_request_count']     =   sum(self.dict_request_counts.values())
+        dict_stats['int_device_count']      =   len(self.list_stores)
+        dict_stats['int_rss_bytes']         =   self.obj_utils.get_rss_bytes()
+        if self.obj_fault_injector:
+            dict_stats['dict_fault_counts'] =   self.obj_fault_injector.get_fault_stats()
+        if self.obj_frame_executor:
+            dict_stats['int_late_prepares'] =   self.int_late_prepares
+        if self.obj_traffic_recorder:
+            dict_stats.update(self.obj_traffic_recorder.get_stats())
+        if self.obj_response_cache:
+            dict_stats.update(self.obj_response_cache.get_stats())
+
+        return dict_stats
+
+    async def report_stats(self,**kwargs):
+
+        #=====================================================================================
+        # Function Name  :  report_stats 
+        # Description    :  Puts the server stats on a multiprocessing queue every
+        #                   float_report_interval seconds for the fleet supervisor
+        #=====================================================================================
+
+        #Extract keyword args
+        obj_stats_queue         =   kwargs.get('obj_stats_queue', None)
+        str_worker_name         =   kwargs.get('str_worker_name', None)
+        float_report_interval   =   kwargs.get('float_report_interval', utils.FLOAT_DEFAULT_FLEET_REPORT_INTERVAL)
+
+        while True:
+
+            await utils.asyncio.sleep(float_report_interval)
+
+            dict_stats                      =   self.get_stats()
+            dict_stats['str_worker_name']   =   str_worker_name
+            dict_stats['int_pid']           =   os.getpid()
+            obj_stats_queue.put(dict_stats)
+
+    def publish_frames(self,**kwargs):
+
+        #=====================================================================================
+        # Function Name  :  publish_frames 
+        # Description    :  Publishes one frame per device, written into the back buffer
+        #                   of its holding register block in one assignment and swapped in
+        #=====================================================================================
+
+        #Extract keyword args
+        arr_device_frames       =   kwargs.get('arr_device_frames', None)
+
+        for obj_store, arr_frame in zip(self.list_stores, arr_device_frames):
+            obj_store.store['h'].publish(arr_frame=arr_frame)
+
+        #Cached responses hold the previous frame
+        if self.obj_response_cache:
+            self.obj_response_cache.invalidate()
+
+    def prepare_frames(self,**kwargs):
+
+        #=====================================================================================
+        # Function Name  :  prepare_frames 
+        # Description    :  Takes the next frame of every device from the frame engine and
+        #                   writes it into the back buffer of its holding register block,
+        #                   runs in the frame worker thread
+        #=====================================================================================
+
+        #Extract keyword args
+        int_skipped_frames      =   kwargs.get('int_skipped_frames', 0)
+
+        obj_profiler            =   self.obj_profiler
+        float_start             =   utils.time.perf_counter()
+        arr_device_frames       =   self.obj_frame_engine.next_frames(int_skipped_frames=int_skipped_frames)
+
+        if obj_profiler.bool_spans:
+            obj_profiler.add_span('tick_compute', float_start)
+            float_start         =   utils.time.perf_counter()
+
+        for obj_store, arr_frame in zip(self.list_stores, arr_device_frames):
+            obj_store.store['h'].prepare(arr_frame=arr_frame)
+
+        if obj_profiler.bool_spans:
+            obj_profiler.add_span('datastore_write', float_start)
+
+        return arr_device_frames
+
+    def swap_frames(self):
+
+        #=====================================================================================
+        # Function Name  :  swap_frames 
+        # Description    :  Swaps in the prepared frames of all devices
+        #=====================================================================================
+
+        for obj_store in self.list_stores:
+            obj_store.store['h'].swap()
+
+        #Cached responses hold the previous frame
+        if self.obj_response_cache:
+            self.obj_response_cache.invalidate()
+
+    async def prepared_value_generator(self,**kwargs):
+
+        #=====================================================================================
+        # Function Name  :  prepared_value_generator 
+        # Description    :  Same contract as utils cyclic_value_generator, but the frames
+        #                   are computed and written into the back buffers by the frame
+        #                   worker thread while the event loop sleeps until the deadline.
+        #                   At the deadline only the buffers are swapped. A tick that
+        #                   skipped frames prepares its frame again, late anyway.
+        #=====================================================================================
+
+        #Extract keyword args
+        obj_tick_scheduler      =   kwargs.get('obj_tick_scheduler', None)
+
+        obj_loop                =   utils.asyncio.get_running_loop()
+
+        while True:
+
+            #Prepare the next frame, the previous one is no longer read by the caller
+            obj_future          =   obj_loop.run_in_executor(self.obj_frame_executor, functools.partial(self.prepare_frames, int_skipped_frames=0))
+
+            #Sleep until the next absolute deadline
+            int_frames          =   await obj_tick_scheduler.wait_next_tick()
+
+            #Frame not ready at the deadline
+            if not obj_future.done():
+                self.int_late_prepares  +=  1
+            arr_device_frames   =   await obj_future
+
+            #Step over the frames dropped by the skip overrun policy
+            if int_frames > 1:
+                arr_device_frames   =   await obj_loop.run_in_executor(self.obj_frame_executor, functools.partial(self.prepare_frames, int_skipped_frames=int_frames - 2))
+
+            self.swap_frames()
+
+            yield self.obj_frame_engine.arr_addresses, arr_device_frames
+
+    async def reload_frame_engine(self,**kwargs):
+
+        #=====================================================================================
+        # Function Name  :  reload_frame_engine 
+        # Description    :  Hands a rebuilt frame source to the publish loop and waits
+        #                   until it is swapped in at the next tick boundary, returns the
+        #                   tick it was applied at
+        #=====================================================================================
+
+        #Extract keyword args
+        obj_frame_engine        =   kwargs.get('obj_frame_engine', None)
+        arr_removed_addresses   =   kwargs.get('arr_removed_addresses', None)
+
+        obj_future                  =   utils.asyncio.get_running_loop().create_future()
+        self.tuple_pending_reload   =   (obj_frame_engine, arr_removed_addresses, obj_future)
+
+        return await obj_future
+
+    def apply_reload(self):
+
+        #=====================================================================================
+        # Function Name  :  apply_reload 
+        # Description    :  Swaps in the pending frame source between two ticks:
+        #                       1.  Continues the playback at the ticks played so far
+        #                       2.  Clears the removed addresses and grows the holding
+        #                           register blocks if the map got larger
+        #                       3.  Sets the new register layout, the next tick writes the
+        #                           new frame
+        #=====================================================================================
+
+        obj_frame_engine, arr_removed_addresses, obj_future     =   self.tuple_pending_reload
+        self.tuple_pending_reload   =   None
+
+        obj_frame_engine.int_index  =   self.obj_frame_engine.int_index
+        int_register_count          =   int(obj_frame_engine.arr_addresses[-1]) + 1 if obj_frame_engine.arr_addresses.size else 0
+
+        for obj_store in self.list_stores:
+            obj_block   =   obj_store.store['h']
+            obj_block.clear_addresses(arr_addresses=arr_removed_addresses)
+            if int_register_count > obj_block.arr_buffers.shape[1]:
+                obj_block.resize(int_count=int_register_count)
+            obj_block.set_layout(arr_addresses=obj_frame_engine.arr_addresses)
+
+        if self.obj_response_cache:
+            self.obj_response_cache.invalidate()
+
+        self.obj_frame_engine       =   obj_frame_engine
+        obj_future.set_result(self.obj_tick_scheduler.int_tick_count)
+
     async def update_server_data(self,**kwargs):
         
         #=====================================================================================
         # Function Name  :  update_server_data 
         # Description    :  This function is publishing modbus register values:
         #                       1.  By updating the context in an async for loop 
+        #                       2.  Logs one summary line per tick
+        #                       3.  Logs the register values every int_log_trace_every
+        #                           ticks (0 disables), limited to tuple_log_trace_range
         #=====================================================================================
 
         #Extract keyword args
-        dict_data               =   kwargs.get('dict_data',None)
-        float_publish_interval  =   kwargs.get('float_publish_interval', None)
+        obj_tick_scheduler      =   kwargs.get('obj_tick_scheduler', None)
+        int_log_trace_every     =   kwargs.get('int_log_trace_every', utils.INT_DEFAULT_LOG_TRACE_EVERY)
+        tuple_log_trace_range   =   kwargs.get('tuple_log_trace_range', None)
         obj_logger              =   kwargs.get('obj_logger', None)
 
+        obj_profiler            =   self.obj_profiler
+
+        #Restarts with the new frame source after a reload
         while True:
+
+            #Runs covered by the register trace
+            obj_frame_engine        =   self.obj_frame_engine
+            list_trace_runs         =   obj_frame_engine.get_runs_in_range(tuple_address_range=tuple_log_trace_range)
             
+            #Frames prepared ahead in the worker thread, or computed on the event loop
+            if self.obj_frame_executor:
+                obj_frame_generator =   self.prepared_value_generator(obj_tick_scheduler=obj_tick_scheduler)
+            else:
+                obj_frame_generator =   self.obj_utils.cyclic_value_generator(obj_frame_engine=obj_frame_engine,obj_tick_scheduler=obj_tick_scheduler,obj_profiler=obj_profiler)
+
             #Async function 
-            async for result in self.obj_utils.cyclic_value_generator(dict_server_data=dict_data,float_publish_interval=float_publish_interval):
-                
-                for int_reg_address,list_reg_value in result.items():
-                    
-                    #Print/Log message
-                    obj_logger.info(f"Publishing Modbus Register : {int_reg_address}:{list_reg_value}")
-                    #print(f"Publishing Modbus Register : {int_reg_address}:{list_reg_value}")
+            async for _, arr_device_frames in obj_frame_generator:
+
+                #Swap in the frames of all devices, prepared frames are already swapped in
+                if not self.obj_frame_executor:
+                    if obj_profiler.bool_spans:
+                        float_start     =   utils.time.perf_counter()
+                        self.publish_frames(arr_device_frames=arr_device_frames)
+                        obj_profiler.add_span('datastore_write', float_start)
+                    else:
+                        self.publish_frames(arr_device_frames=arr_device_frames)
+                if self.obj_metrics:
+                    self.obj_metrics.observe_tick(obj_tick_scheduler, arr_device_frames.size)
 
-                    #Setting context for register
-                    self.context[utils.DEFAULT_HOLDING_REG_FUNCTION_CODE_HEX].setValues(utils.DEFAULT_HOLDING_REG_FUNCTION_CODE_HEX,int_reg_address,list_reg_value)
+                #Log one summary line per tick
+                int_tick_count  =   obj_tick_scheduler.int_tick_count
+                obj_logger.info("Tick %d : Published %d registers on %d devices (lateness %.1f ms)",
+                                int_tick_count, arr_device_frames.size, len(self.list_stores), obj_tick_scheduler.float_last_lateness*1000)
+
+                #Sampled register trace
+                if int_log_trace_every and int_tick_count % int_log_trace_every == 0:
+                    for int_unit_id, arr_frame in zip(self.list_unit_ids, arr_device_frames):
+                        for int_start_address,int_start_column,int_end_column in list_trace_runs:
+                            obj_logger.info("Publishing Modbus Register : %d:%s (unit %d)", int_start_address, arr_frame[int_start_column:int_end_column].tolist(), int_unit_id)
+
+                #Log the scheduler counters periodically
+                if int_tick_count % utils.INT_DEFAULT_TICK_STATS_LOG_INTERVAL == 0:
+                    obj_logger.info("Tick Stats : %s", obj_tick_scheduler.get_stats())
+
+                    if self.obj_frame_executor:
+                        obj_logger.info("Late Prepares : %d", self.int_late_prepares)
+
+                    if self.obj_response_cache:
+                        obj_logger.info("Cache Stats : %s", self.obj_response_cache.get_stats())
+
+                    dict_source_stats   =   obj_frame_engine.get_source_stats()
+                    if dict_source_stats:
+                        obj_logger.info("Source Stats : %s", dict_source_stats)
+
+                    if obj_profiler.bool_spans:
+                        obj_logger.info("Span Stats : %s", obj_profiler.get_span_stats())
+
+                #Swap in a reloaded frame source at the tick boundary
+                if self.tuple_pending_reload:
+                    self.apply_reload()
+                    break
                     
     async def start_async_server(self,**kwargs):
 
@@ -88,31 +484,104 @@ class DataSimModbus:
         #=====================================================================================
         
         #Extract keyword args
-        dict_data               =   kwargs.get('dict_data',None)
+        obj_frame_engine        =   kwargs.get('obj_frame_engine',None)
         str_server_ip_address   =   kwargs.get('str_server_ip_address',None)
         str_server_unit_id      =   kwargs.get('str_server_unit_id',None)
         str_server_port         =   kwargs.get('str_server_port',None)
         float_publish_interval  =   kwargs.get('float_publish_interval', None)
+        str_overrun_policy      =   kwargs.get('str_overrun_policy', utils.STR_DEFAULT_OVERRUN_POLICY)
+        int_log_trace_every     =   kwargs.get('int_log_trace_every', utils.INT_DEFAULT_LOG_TRACE_EVERY)
+        tuple_log_trace_range   =   kwargs.get('tuple_log_trace_range', None)
+        obj_stats_queue         =   kwargs.get('obj_stats_queue', None)
+        str_worker_name         =   kwargs.get('str_worker_name', None)
+        int_metrics_port        =   kwargs.get('int_metrics_port', None)
+        bool_profile            =   kwargs.get('bool_profile', False)
+        obj_fault_injector      =   kwargs.get('obj_fault_injector', None)
+        bool_prepare_ahead      =   kwargs.get('bool_prepare_ahead', False)
+        obj_traffic_recorder    =   kwargs.get('obj_traffic_recorder', None)
+        bool_response_cache     =   kwargs.get('bool_response_cache', False)
+        str_transport           =   kwargs.get('str_transport', utils.STR_DEFAULT_MODBUS_TRANSPORT)
+        str_framer              =   kwargs.get('str_framer', utils.STR_DEFAULT_MODBUS_FRAMER)
         obj_logger              =   kwargs.get('obj_logger', None)
         
         #Print/Log message
         print("Server Status       :   Started\n\n*Check logs for more information")
 
+        #Frame source of the publish loop and the register columns it publishes
+        self.obj_frame_engine   =   obj_frame_engine
+        self.set_register_layout(arr_addresses=obj_frame_engine.arr_addresses)
+
+        #Deadline scheduler for the publish loop
+        self.obj_tick_scheduler =   tick_scheduler.DataSimTickScheduler (
+                                                                            float_publish_interval  =   float_publish_interval,
+                                                                            str_overrun_policy      =   str_overrun_policy
+                                                                        )
+
+        #Worker thread that prepares the frames ahead of their deadline
+        if bool_prepare_ahead:
+            self.obj_frame_executor =   ThreadPoolExecutor(max_workers=1, thread_name_prefix='frame_prepare')
+
         #Creating task
         utils.asyncio.create_task(self.update_server_data   (
-                                                                dict_data               =   dict_data,
-                                                                float_publish_interval  =   float_publish_interval,
+                                                                obj_tick_scheduler      =   self.obj_tick_scheduler,
+                                                                int_log_trace_every     =   int_log_trace_every,
+                                                                tuple_log_trace_range   =   tuple_log_trace_range,
                                                                 obj_logger              =   obj_logger
                                                             )
                             )
-        
-        #Start the Modbus server
-        await StartAsyncTcpServer   (  
-                                        context     =   self.context, 
-                                        identity    =   self.identity, 
-                                        address     =   (   
-                                                            str_server_ip_address,
-                                                            str_server_port,
-                                                            str_server_unit_id
+
+        #Report stats to the fleet supervisor
+        if obj_stats_queue is not None:
+            utils.asyncio.create_task(self.report_stats (
+                                                            obj_stats_queue =   obj_stats_queue,
+                                                            str_worker_name =   str_worker_name
                                                         )
-                                    )
\ No newline at end of file
+                                )
+
+        #Profiler toggles, and the startup capture if requested
+        self.obj_profiler.install_signal_handlers()
+        if bool_profile:
+            self.obj_profiler.start_capture()
+
+        #Metrics endpoint next to the Modbus server
+        if int_metrics_port:
+            self.obj_metrics    =   metrics.DataSimMetrics(obj_modbus_server=self, obj_logger=obj_logger)
+            await self.obj_metrics.start(str_ip_address=str_server_ip_address, int_port=int_metrics_port)
+        
+        #Start the Modbus server, with the fault handler only when faults are configured and
+        #the cached handler only when the cache is enabled, faults apply to every response.
+        #Faults are TCP only, the simulator rejects them over UDP.
+        if obj_fault_injector:
+            dict_server_kwargs      =   {'obj_fault_injector': obj_fault_injector}
+            obj_server_class        =   fault_injector.DataSimFaultTcpServer
+            if bool_response_cache:
+                obj_logger.warning("Response cache is disabled while faults are injected")
+        elif bool_response_cache:
+            self.obj_response_cache =   response_cache.DataSimResponseCache()
+            dict_server_kwargs      =   {'obj_response_cache': self.obj_response_cache}
+            obj_server_class        =   response_cache.DataSimCachedUdpServer if str_transport == 'udp' else response_cache.DataSimCachedTcpServer
+        else:
+            dict_server_kwargs      =   {}
+            obj_server_class        =   udp_server.DataSimUdpServer if str_transport == 'udp' else ModbusTcpServer
+        self.obj_fault_injector =   obj_fault_injector
+        self.obj_server         =   obj_server_class(  
+                                                        context         =   self.context, 
+                                                        identity        =   self.identity, 
+                                                        framer          =   FramerType(str_framer),
+                                                        trace_pdu       =   self.trace_request_pdu,
+                                                        trace_packet    =   self.trace_request_packet,
+                                                        address         =   (   
+                                                                                str_server_ip_address,
+                                                                                str_server_port,
+                                                                                str_server_unit_id
+                                                                            ),
+                                                        **dict_server_kwargs
+                                                    )
+
+        #Record the requests of every connection to the journal
+        if obj_traffic_recorder:
+            self.obj_traffic_recorder   =   obj_traffic_recorder
+            obj_traffic_recorder.attach(obj_server=self.obj_server)
+            utils.asyncio.create_task(obj_traffic_recorder.run_flush())
+
+        await self.obj_server.serve_forever()
\ No newline at end of file
@@ -0,0 +1,229 @@
+#=========================================================================================
+#   Name        :   numpy_datastore.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a numpy datastore module which does the following:
+#                       1.  Defines DataSimNumpyDataBlock class
+#                       2.  Stores a pymodbus data block (holding registers, input
+#                           registers, coils or discrete inputs) in two contiguous numpy
+#                           buffers instead of a Python list
+#                       3.  Publishes a frame by writing it into the back buffer in one
+#                           vectorized assignment and swapping the active buffer
+#                       4.  Serves client reads by slicing the active buffer, so a read
+#                           never sees a half published frame
+#                       5.  Grows the buffers and clears addresses for hot reloads
+#                       6.  Splits publishing into prepare (back buffer write) and swap,
+#                           so the write can be done ahead of the tick off the event loop
+#                       7.  Defines create_numpy_slave_context to build a slave context
+#                           of four numpy blocks
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from pymodbus.datastore import ModbusSlaveContext
+from pymodbus.datastore.store import BaseModbusDataBlock
+import numpy as np
+
+#Variable definition
+INT_MODBUS_ADDRESS_SPACE    =   65536
+
+#Class definitions
+class DataSimNumpyDataBlock(BaseModbusDataBlock):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimNumpyDataBlock
+    #   Description    :    Double buffered data block over addresses 0 to int_count - 1:
+    #                           1.  arr_buffers : (2 x int_count) array, uint16 for
+    #                                             registers and bool for bits
+    #                           2.  int_active  : buffer served to clients
+    #                           3.  obj_columns : buffer columns a frame is written to,
+    #                                             a slice when the addresses are contiguous
+    #                       The slave context shifts request addresses by one, so the block
+    #                       starts at address 1 and buffer column n is register n.
+    #                       Client writes go to both buffers so they survive the swap.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        int_count               =   kwargs.get('int_count', INT_MODBUS_ADDRESS_SPACE)
+        obj_dtype               =   kwargs.get('obj_dtype', np.uint16)
+
+        #Fields required by the pymodbus data block
+        self.address            =   1
+        self.default_value      =   obj_dtype(0)
+
+        #Buffers
+        self.arr_buffers        =   np.zeros((2, int_count), dtype=obj_dtype)
+        self.int_active         =   0
+        self.obj_columns        =   None
+        self.int_swap_count     =   0
+
+    @property
+    def values(self):
+
+        #=====================================================================================
+        #   Function Name  :    values
+        #   Description    :    Active buffer, used by the pymodbus string and iterator
+        #=====================================================================================
+
+        return self.arr_buffers[self.int_active]
+
+    def reset(self):
+
+        #=====================================================================================
+        #   Function Name  :    reset
+        #   Description    :    Clears both buffers
+        #=====================================================================================
+
+        self.arr_buffers[:]     =   self.default_value
+
+    def validate(self, address, count=1):
+
+        #=====================================================================================
+        #   Function Name  :    validate
+        #   Description    :    Returns True if the request is within the block
+        #=====================================================================================
+
+        return self.address <= address and address + count <= self.address + self.arr_buffers.shape[1]
+
+    def getValues(self, address, count=1):
+
+        #=====================================================================================
+        #   Function Name  :    getValues
+        #   Description    :    Returns a slice of the active buffer as a list, the buffer
+        #                       is looked up once so the slice is a single frame
+        #=====================================================================================
+
+        int_start   =   address - self.address
+        arr_active  =   self.arr_buffers[self.int_active]
+
+        return arr_active[int_start:int_start + count].tolist()
+
+    def setValues(self, address, values):
+
+        #=====================================================================================
+        #   Function Name  :    setValues
+        #   Description    :    Client write, written to both buffers
+        #=====================================================================================
+
+        if not isinstance(values, (list, tuple, np.ndarray)):
+            values  =   [values]
+
+        int_start   =   address - self.address
+        self.arr_buffers[:, int_start:int_start + len(values)]  =   np.asarray(values, dtype=self.arr_buffers.dtype)
+
+    def set_layout(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    set_layout
+        #   Description    :    Sets the addresses of the frame columns, compiled to a slice
+        #                       when they are one contiguous run
+        #=====================================================================================
+
+        #Extract keyword args
+        arr_addresses       =   np.asarray(kwargs.get('arr_addresses', None), dtype=np.int64)
+
+        #Validate the addresses
+        if arr_addresses.size and (arr_addresses.min() < 0 or arr_addresses.max() >= self.arr_buffers.shape[1]):
+            raise ValueError(f"Register addresses {arr_addresses.min()}-{arr_addresses.max()} do not fit in a block of {self.arr_buffers.shape[1]} registers")
+
+        if arr_addresses.size and int(arr_addresses[-1]) - int(arr_addresses[0]) + 1 == arr_addresses.size and (np.diff(arr_addresses) == 1).all():
+            self.obj_columns    =   slice(int(arr_addresses[0]), int(arr_addresses[-1]) + 1)
+        else:
+            self.obj_columns    =   arr_addresses
+
+    def resize(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    resize
+        #   Description    :    Grows both buffers to int_count addresses, keeping the
+        #                       values. The buffers are replaced in one assignment, so a
+        #                       read sees either the old or the new ones.
+        #=====================================================================================
+
+        #Extract keyword args
+        int_count           =   kwargs.get('int_count', None)
+
+        int_kept            =   min(int_count, self.arr_buffers.shape[1])
+        arr_buffers         =   np.zeros((2, int_count), dtype=self.arr_buffers.dtype)
+        arr_buffers[:, :int_kept]   =   self.arr_buffers[:, :int_kept]
+        self.arr_buffers    =   arr_buffers
+
+    def clear_addresses(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    clear_addresses
+        #   Description    :    Resets addresses that left the register map in both buffers
+        #=====================================================================================
+
+        #Extract keyword args
+        arr_addresses       =   kwargs.get('arr_addresses', None)
+
+        self.arr_buffers[:, arr_addresses]  =   self.default_value
+
+    def prepare(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    prepare
+        #   Description    :    Writes a frame into the frame columns of the back buffer in
+        #                       one assignment. The other columns only change on client
+        #                       writes, which go to both buffers, so they need no copy.
+        #                       Readers only see the active buffer, so this can run in a
+        #                       worker thread while the event loop serves requests.
+        #=====================================================================================
+
+        #Extract keyword args
+        arr_frame           =   kwargs.get('arr_frame', None)
+
+        self.arr_buffers[1 - self.int_active, self.obj_columns]     =   arr_frame
+
+    def swap(self):
+
+        #=====================================================================================
+        #   Function Name  :    swap
+        #   Description    :    Makes the back buffer active, readers pick up the new frame
+        #                       on their next request
+        #=====================================================================================
+
+        self.int_active     =   1 - self.int_active
+        self.int_swap_count +=  1
+
+    def publish(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    publish
+        #   Description    :    Writes a frame into the back buffer and swaps it in
+        #=====================================================================================
+
+        #Extract keyword args
+        arr_frame           =   kwargs.get('arr_frame', None)
+
+        self.prepare(arr_frame=arr_frame)
+        self.swap()
+
+#Function Definitions
+def create_numpy_slave_context(**kwargs):
+
+    #=====================================================================================
+    #   Function Name  :    create_numpy_slave_context
+    #   Description    :    Returns a slave context of numpy blocks, holding registers
+    #                       cover int_register_count addresses (the 64k address space by
+    #                       default) and the other blocks int_other_count addresses
+    #=====================================================================================
+
+    #Extract keyword args
+    int_register_count  =   kwargs.get('int_register_count', None) or INT_MODBUS_ADDRESS_SPACE
+    int_other_count     =   kwargs.get('int_other_count', INT_MODBUS_ADDRESS_SPACE)
+
+    return ModbusSlaveContext   (
+                                    di  =   DataSimNumpyDataBlock(int_count=int_other_count, obj_dtype=np.bool_),
+                                    co  =   DataSimNumpyDataBlock(int_count=int_other_count, obj_dtype=np.bool_),
+                                    hr  =   DataSimNumpyDataBlock(int_count=int_register_count, obj_dtype=np.uint16),
+                                    ir  =   DataSimNumpyDataBlock(int_count=int_other_count, obj_dtype=np.uint16)
+                                )
@@ -0,0 +1,307 @@
+#=========================================================================================
+#   Name        :   profiler.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a profiler module which does the following:
+#                       1.  Defines DataSimProfiler class
+#                       2.  Captures a time bounded profile of the event loop thread,
+#                           either with cProfile or by sampling its stack, and writes it
+#                           to the log directory
+#                       3.  Keeps named timing spans (load, tick compute, datastore write,
+#                           request decode, request handle, request encode) that cost one
+#                           attribute check while disabled
+#                       4.  Starts a capture on SIGUSR1 and toggles the spans on SIGUSR2,
+#                           so a running server can be profiled without a restart
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+import cProfile
+import pstats
+import threading
+import signal
+import time
+import io
+
+#Variable definition
+LIST_SPAN_NAMES             =   ['load', 'tick_compute', 'datastore_write', 'request_decode', 'request_handle', 'request_encode']
+INT_PROFILE_SUMMARY_LINES   =   40
+
+#Class definitions
+class DataSimProfiler:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimProfiler
+    #   Description    :    Profiler of one simulator process:
+    #                           1.  dict_spans      : span name -> [calls, total seconds,
+    #                                                 max seconds]
+    #                           2.  bool_spans      : spans are recorded, checked by the
+    #                                                 hot path before reading the clock
+    #                           3.  obj_capture     : running cProfile or sampler thread
+    #                       Spans and captures are started from the event loop thread.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_profile_mode       =   kwargs.get('str_profile_mode', utils.STR_DEFAULT_PROFILE_MODE)
+        self.float_profile_seconds  =   kwargs.get('float_profile_seconds', utils.FLOAT_DEFAULT_PROFILE_SECONDS)
+        self.float_sample_interval  =   kwargs.get('float_sample_interval', utils.FLOAT_DEFAULT_PROFILE_SAMPLE_INTERVAL)
+        self.bool_spans             =   kwargs.get('bool_spans', False)
+        self.str_log_path           =   kwargs.get('str_log_path', None)
+        self.str_log_filename       =   kwargs.get('str_log_filename', utils.STR_DEFAULT_MODBUS_SERVER_LOG_FILENAME)
+        self.obj_logger             =   kwargs.get('obj_logger', None)
+
+        #Validate the profile mode
+        if self.str_profile_mode not in utils.LIST_PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {self.str_profile_mode}")
+
+        #Spans
+        self.dict_spans             =   {str_span: [0, 0.0, 0.0] for str_span in LIST_SPAN_NAMES}
+        self.float_packet_received  =   0.0
+        self.float_pdu_received     =   0.0
+        self.float_pdu_sent         =   0.0
+
+        #Capture state
+        self.obj_capture            =   None
+        self.dict_samples           =   {}
+        self.int_sample_count       =   0
+        self.bool_sampling          =   False
+
+    def add_span(self, str_span, float_start):
+
+        #=====================================================================================
+        #   Function Name  :    add_span
+        #   Description    :    Records one span that started at float_start
+        #=====================================================================================
+
+        float_duration  =   time.perf_counter() - float_start
+        list_span       =   self.dict_spans[str_span]
+        list_span[0]    +=  1
+        list_span[1]    +=  float_duration
+        if float_duration > list_span[2]:
+            list_span[2]    =   float_duration
+
+    def trace_packet(self, bool_sending):
+
+        #=====================================================================================
+        #   Function Name  :    trace_packet
+        #   Description    :    Packet hook, a received packet starts the decode span and a
+        #                       sent packet ends the encode span. pymodbus decodes and
+        #                       encodes synchronously between the packet and PDU hooks.
+        #=====================================================================================
+
+        if bool_sending:
+            if self.float_pdu_sent:
+                self.add_span('request_encode', self.float_pdu_sent)
+                self.float_pdu_sent         =   0.0
+        else:
+            self.float_packet_received      =   time.perf_counter()
+
+    def trace_pdu(self, bool_sending):
+
+        #=====================================================================================
+        #   Function Name  :    trace_pdu
+        #   Description    :    PDU hook, a decoded request ends the decode span and starts
+        #                       the handle span, a response ends the handle span and starts
+        #                       the encode span. Requests of other connections decoded
+        #                       while one is handled are left out of the handle span.
+        #=====================================================================================
+
+        float_now   =   time.perf_counter()
+
+        if bool_sending:
+            if self.float_pdu_received > 0:
+                self.add_span('request_handle', self.float_pdu_received)
+            self.float_pdu_received         =   0.0
+            self.float_pdu_sent             =   float_now
+        else:
+            if self.float_packet_received:
+                self.add_span('request_decode', self.float_packet_received)
+                self.float_packet_received  =   0.0
+            self.float_pdu_received         =   -1.0 if self.float_pdu_received else float_now
+
+    def get_span_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_span_stats
+        #   Description    :    Returns calls, total, mean and max milliseconds of every
+        #                       span that was recorded
+        #=====================================================================================
+
+        return  {
+                    str_span    :   {
+                                        'int_calls'         :   int_calls,
+                                        'float_total_ms'    :   round(float_total * 1000, 3),
+                                        'float_mean_ms'     :   round(float_total * 1000 / int_calls, 4),
+                                        'float_max_ms'      :   round(float_max * 1000, 3)
+                                    }
+                    for str_span, (int_calls, float_total, float_max) in self.dict_spans.items() if int_calls
+                }
+
+    def toggle_spans(self):
+
+        #=====================================================================================
+        #   Function Name  :    toggle_spans
+        #   Description    :    Turns the spans on or off, the totals are logged and reset
+        #                       when they are turned off
+        #=====================================================================================
+
+        self.bool_spans                 =   not self.bool_spans
+        self.float_packet_received      =   self.float_pdu_received     =   self.float_pdu_sent     =   0.0
+
+        if not self.bool_spans:
+            if self.obj_logger:
+                self.obj_logger.info(f"Span Stats : {self.get_span_stats()}")
+            self.dict_spans             =   {str_span: [0, 0.0, 0.0] for str_span in LIST_SPAN_NAMES}
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Profiler            :  Spans {'enabled' if self.bool_spans else 'disabled'}")
+
+    def sample_stacks(self, int_thread_id):
+
+        #=====================================================================================
+        #   Function Name  :    sample_stacks
+        #   Description    :    Sampler thread, reads the stack of the profiled thread every
+        #                       float_sample_interval seconds and counts each stack in the
+        #                       folded format (root;...;leaf)
+        #=====================================================================================
+
+        while self.bool_sampling:
+
+            obj_frame       =   sys._current_frames().get(int_thread_id)
+            list_stack      =   []
+
+            while obj_frame is not None:
+                obj_code    =   obj_frame.f_code
+                list_stack.append(f"{obj_code.co_name} ({os.path.basename(obj_code.co_filename)}:{obj_code.co_firstlineno})")
+                obj_frame   =   obj_frame.f_back
+
+            if list_stack:
+                str_stack                       =   ';'.join(reversed(list_stack))
+                self.dict_samples[str_stack]    =   self.dict_samples.get(str_stack, 0) + 1
+                self.int_sample_count           +=  1
+
+            time.sleep(self.float_sample_interval)
+
+    def start_capture(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    start_capture
+        #   Description    :    Starts a capture of the calling thread (the event loop) in
+        #                       str_profile_mode and schedules its end after
+        #                       float_profile_seconds, returns False if one is running
+        #=====================================================================================
+
+        #Extract keyword args
+        obj_loop            =   kwargs.get('obj_loop', None) or utils.asyncio.get_running_loop()
+
+        if self.obj_capture is not None:
+            if self.obj_logger:
+                self.obj_logger.info("Profiler            :  Capture already running")
+            return False
+
+        if self.str_profile_mode == 'cprofile':
+            self.obj_capture        =   cProfile.Profile()
+            self.obj_capture.enable()
+        else:
+            self.dict_samples       =   {}
+            self.int_sample_count   =   0
+            self.bool_sampling      =   True
+            self.obj_capture        =   threading.Thread(target=self.sample_stacks, args=(threading.get_ident(),), name='profile_sampler', daemon=True)
+            self.obj_capture.start()
+
+        self.float_capture_start    =   time.monotonic()
+        obj_loop.call_later(self.float_profile_seconds, self.stop_capture)
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Profiler            :  {self.str_profile_mode} capture started for {self.float_profile_seconds:g}s")
+
+        return True
+
+    def stop_capture(self):
+
+        #=====================================================================================
+        #   Function Name  :    stop_capture
+        #   Description    :    Ends the capture and writes it to the log directory:
+        #                           1.  cprofile : <log>_profile_<time>.prof (pstats) and a
+        #                                          .txt summary sorted by cumulative time
+        #                           2.  sample   : <log>_profile_<time>.folded (flame graph
+        #                                          input) and a .txt summary of the
+        #                                          functions on the most samples
+        #                       Returns the path of the summary
+        #=====================================================================================
+
+        if self.obj_capture is None:
+            return None
+
+        float_seconds       =   time.monotonic() - self.float_capture_start
+        str_filepath        =   os.path.join(self.str_log_path or os.getcwd(), f"{self.str_log_filename}_profile_{time.strftime('%Y%m%d_%H%M%S')}")
+        obj_summary         =   io.StringIO()
+
+        if self.str_profile_mode == 'cprofile':
+
+            self.obj_capture.disable()
+            self.obj_capture.dump_stats(str_filepath + '.prof')
+            pstats.Stats(self.obj_capture, stream=obj_summary).sort_stats('cumulative').print_stats(INT_PROFILE_SUMMARY_LINES)
+
+        else:
+
+            self.bool_sampling  =   False
+            self.obj_capture.join()
+
+            with open(str_filepath + '.folded', 'w') as obj_file:
+                for str_stack, int_count in sorted(self.dict_samples.items(), key=lambda tuple_item: -tuple_item[1]):
+                    obj_file.write(f"{str_stack} {int_count}\n")
+
+            #Samples per function, on the stack (inclusive) and at the top (self)
+            dict_inclusive      =   {}
+            dict_self           =   {}
+            for str_stack, int_count in self.dict_samples.items():
+                list_functions  =   str_stack.split(';')
+                for str_function in set(list_functions):
+                    dict_inclusive[str_function]    =   dict_inclusive.get(str_function, 0) + int_count
+                dict_self[list_functions[-1]]       =   dict_self.get(list_functions[-1], 0) + int_count
+
+            int_samples         =   max(self.int_sample_count, 1)
+            obj_summary.write(f"{self.int_sample_count} samples every {self.float_sample_interval*1000:g} ms\n\n{'Self %':>8} {'Total %':>8}  Function\n")
+            for str_function, int_count in sorted(dict_inclusive.items(), key=lambda tuple_item: -tuple_item[1])[:INT_PROFILE_SUMMARY_LINES]:
+                obj_summary.write(f"{dict_self.get(str_function, 0)*100/int_samples:>8.1f} {int_count*100/int_samples:>8.1f}  {str_function}\n")
+
+        with open(str_filepath + '.txt', 'w') as obj_file:
+            obj_file.write(f"{self.str_profile_mode} profile of {float_seconds:.1f}s\n\n" + obj_summary.getvalue())
+
+        self.obj_capture    =   None
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Profiler            :  {self.str_profile_mode} capture of {float_seconds:.1f}s written to {str_filepath}.*")
+
+        return str_filepath + '.txt'
+
+    def install_signal_handlers(self):
+
+        #=====================================================================================
+        #   Function Name  :    install_signal_handlers
+        #   Description    :    SIGUSR1 starts a capture and SIGUSR2 toggles the spans, the
+        #                       handlers run in the event loop thread
+        #=====================================================================================
+
+        obj_loop    =   utils.asyncio.get_running_loop()
+
+        try:
+            obj_loop.add_signal_handler(signal.SIGUSR1, lambda: self.start_capture(obj_loop=obj_loop))
+            obj_loop.add_signal_handler(signal.SIGUSR2, self.toggle_spans)
+        except (NotImplementedError, AttributeError, RuntimeError):
+
+            #Log message, signals are not available on this platform or thread
+            if self.obj_logger:
+                self.obj_logger.info("Profiler            :  Signal toggles not available")
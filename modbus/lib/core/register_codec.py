@@ -0,0 +1,172 @@
+#=========================================================================================
+#   Name        :   register_codec.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a register codec module which does the following:
+#                       1.  Defines DataSimRegisterCodec class
+#                       2.  Lays the tags out over 16 bit registers, one register for
+#                           Bool/Short/Word, two for DWord/Int32/UInt32/Float32 and four
+#                           for Int64, with a word and byte order per tag
+#                       3.  Packs a whole matrix of values into register words with one
+#                           cast and one byte view per data type and order
+#                       4.  Clips values outside the data type range and reports the
+#                           clipped tags
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+import numpy as np
+
+#Class definitions
+class DataSimRegisterCodec:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimRegisterCodec
+    #   Description    :    Register layout of an ordered list of tags:
+    #                           1.  arr_addresses : sorted register addresses (int64)
+    #                           2.  list_groups   : one entry per (data type, word order,
+    #                                               byte order) with the tag columns it
+    #                                               reads and the register columns it
+    #                                               writes
+    #                       Word order big puts the most significant word at the tag
+    #                       address, byte order big puts the most significant byte of each
+    #                       register first. Where tags overlap the later tag keeps the
+    #                       register.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.list_tag_names     =   kwargs.get('list_tag_names', [])
+        arr_tag_addresses       =   np.asarray(kwargs.get('arr_tag_addresses', []), dtype=np.int64)
+        dict_tag_encodings      =   kwargs.get('dict_tag_encodings', {})
+        obj_logger              =   kwargs.get('obj_logger', None)
+
+        #Encoding of every tag, tags missing from the tag list take the defaults
+        list_encodings          =   [dict_tag_encodings.get(str_tag_name.replace(' ', ''), (utils.STR_DEFAULT_DATA_TYPE, utils.STR_DEFAULT_WORD_ORDER, utils.STR_DEFAULT_BYTE_ORDER)) for str_tag_name in self.list_tag_names]
+
+        #Validate the encodings
+        for str_data_type, str_word_order, str_byte_order in set(list_encodings):
+            if str_data_type not in utils.DICT_REGISTER_DATA_TYPES:
+                raise ValueError(f"Unknown data type: {str_data_type}")
+            if str_word_order not in utils.LIST_REGISTER_ORDERS or str_byte_order not in utils.LIST_REGISTER_ORDERS:
+                raise ValueError(f"Unknown word or byte order: {str_word_order}, {str_byte_order}")
+
+        #Registers of every tag, register k of a tag is at its address + k
+        arr_word_counts         =   np.array([utils.DICT_REGISTER_DATA_TYPES[tuple_encoding[0]][1] for tuple_encoding in list_encodings], dtype=np.int64)
+        arr_word_tags           =   np.repeat(np.arange(arr_word_counts.size), arr_word_counts)
+        arr_word_offsets        =   np.arange(arr_word_tags.size) - np.repeat(np.cumsum(arr_word_counts) - arr_word_counts, arr_word_counts)
+        arr_word_addresses      =   arr_tag_addresses[arr_word_tags] + arr_word_offsets
+
+        #Sorted register addresses, an overlapped register keeps the later tag
+        self.arr_addresses, arr_last_words  =   np.unique(arr_word_addresses[::-1], return_index=True)
+        arr_owner_words         =   arr_word_tags.size - 1 - arr_last_words
+        arr_kept_words          =   np.zeros(arr_word_tags.size, dtype=bool)
+        arr_kept_words[arr_owner_words]     =   True
+
+        if not arr_kept_words.all() and obj_logger:
+            obj_logger.info(f"Overlapping Register:  {sorted(set(self.list_tag_names[int_tag] for int_tag in arr_word_tags[~arr_kept_words]))}")
+
+        #Register column of every word
+        arr_word_columns        =   np.searchsorted(self.arr_addresses, arr_word_addresses)
+
+        #Group the tags by encoding
+        self.list_groups        =   []
+        arr_encodings           =   np.array(['|'.join(tuple_encoding) for tuple_encoding in list_encodings], dtype=object)
+
+        for str_encoding in dict.fromkeys(arr_encodings):
+
+            str_data_type, str_word_order, str_byte_order   =   str_encoding.split('|')
+            str_dtype, int_words, obj_lower, obj_upper      =   utils.DICT_REGISTER_DATA_TYPES[str_data_type]
+
+            #Word index of every packed word of the group, in the register order
+            arr_tag_columns     =   np.flatnonzero(arr_encodings == str_encoding)
+            arr_words           =   (np.cumsum(arr_word_counts) - arr_word_counts)[arr_tag_columns][:, None] + np.arange(int_words)[None, :]
+            if str_word_order == 'little':
+                arr_words       =   arr_words[:, ::-1]
+            arr_words           =   arr_words.ravel()
+
+            self.list_groups.append({
+                                        'str_data_type'         :   str_data_type,
+                                        'str_dtype'             :   str_dtype,
+                                        'str_word_dtype'        :   '>u2' if str_byte_order == 'big' else '<u2',
+                                        'obj_lower'             :   obj_lower,
+                                        'obj_upper'             :   obj_upper,
+                                        'float_upper'           :   float(obj_upper) if float(obj_upper) <= obj_upper else float(np.nextafter(float(obj_upper), -np.inf)),
+                                        'arr_tag_columns'       :   arr_tag_columns,
+                                        'arr_kept_words'        :   np.flatnonzero(arr_kept_words[arr_words]),
+                                        'arr_register_columns'  :   arr_word_columns[arr_words][arr_kept_words[arr_words]]
+                                    })
+
+        #Log the layout
+        if obj_logger:
+            obj_logger.info(f"Register Layout     :  {len(self.list_tag_names)} tags over {self.arr_addresses.size} registers, {dict((str_encoding.replace('|', ' '), int(np.count_nonzero(arr_encodings == str_encoding))) for str_encoding in dict.fromkeys(arr_encodings))}")
+
+    def encode(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    encode
+        #   Description    :    This function does the following:
+        #                           1.  Rounds the integer tags and replaces missing values
+        #                               with 0
+        #                           2.  Clips every tag to its data type range
+        #                           3.  Casts each group to its big endian type, views the
+        #                               bytes as register words in the byte order and writes
+        #                               them to their register columns in the word order
+        #                           4.  Logs the clipped values per tag if obj_logger is
+        #                               given, e.g. once at load time
+        #                       arr_values is (rows x tags), a numpy array or a DataFrame
+        #                       whose integer columns stay exact, returns uint16 (rows x
+        #                       registers)
+        #=====================================================================================
+
+        #Extract keyword args
+        arr_values          =   kwargs.get('arr_values', None)
+        obj_logger          =   kwargs.get('obj_logger', None)
+
+        #A DataFrame is read per group, so a group of integer columns keeps its dtype
+        bool_frame          =   hasattr(arr_values, 'iloc')
+        if not bool_frame:
+            arr_values      =   np.asarray(arr_values)
+
+        arr_registers       =   np.zeros((arr_values.shape[0], self.arr_addresses.size), dtype=np.uint16)
+        dict_clipped        =   {}
+
+        for dict_group in self.list_groups:
+
+            arr_group       =   arr_values.iloc[:, dict_group['arr_tag_columns']].to_numpy() if bool_frame else arr_values[:, dict_group['arr_tag_columns']]
+
+            #Integer values are exact, other values are rounded for the integer types
+            if np.issubdtype(arr_group.dtype, np.integer) and dict_group['str_data_type'] != 'Float32':
+                arr_invalid     =   np.zeros(arr_group.shape, dtype=bool)
+                obj_upper       =   dict_group['obj_upper']
+            else:
+                arr_group       =   arr_group.astype(np.float64)
+                arr_invalid     =   ~np.isfinite(arr_group) if dict_group['str_data_type'] != 'Float32' else np.isnan(arr_group)
+                arr_group       =   np.where(arr_invalid, 0, arr_group)
+                obj_upper       =   dict_group['float_upper']
+                if dict_group['str_data_type'] != 'Float32':
+                    arr_group   =   np.rint(arr_group)
+
+            #Clip to the data type range
+            arr_clipped     =   arr_invalid | (arr_group < dict_group['obj_lower']) | (arr_group > obj_upper)
+            if arr_clipped.any():
+                arr_group   =   np.clip(arr_group, dict_group['obj_lower'], obj_upper)
+                for int_column in np.flatnonzero(arr_clipped.any(axis=0)):
+                    dict_clipped[self.list_tag_names[dict_group['arr_tag_columns'][int_column]]]   =   int(np.count_nonzero(arr_clipped[:, int_column]))
+
+            #Pack: big endian bytes of each value, viewed as register words
+            arr_words       =   np.ascontiguousarray(arr_group.astype(dict_group['str_dtype'])).view(dict_group['str_word_dtype'])
+            arr_registers[:, dict_group['arr_register_columns']]    =   arr_words[:, dict_group['arr_kept_words']]
+
+        #Log the clipped values
+        if dict_clipped and obj_logger:
+            obj_logger.info(f"Clipped Values      :  {dict_clipped}")
+
+        return arr_registers
@@ -0,0 +1,258 @@
+#=========================================================================================
+#   Name        :   response_cache.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a response cache module which does the following:
+#                       1.  Defines DataSimResponseCache class, which keeps the encoded
+#                           read responses of the current tick keyed by unit ID, function
+#                           code, start address and count, with hit and miss counters
+#                       2.  Defines DataSimCachedTcpServer and DataSimCachedUdpServer,
+#                           pymodbus servers whose connections answer a repeated read from
+#                           the cache without reading the datastore or encoding the
+#                           response again
+#                       3.  There is one cache per server, shared by all its connections,
+#                           so a read cached for one client answers the same read of every
+#                           other client within the tick
+#                       4.  The whole cache is cleared when a new frame is published, when
+#                           the frame source is reloaded and after a write from any client
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import udp_server
+from pymodbus.server import ModbusTcpServer, ModbusUdpServer
+from pymodbus.server.requesthandler import ServerRequestHandler
+
+#Variable definition
+LIST_CACHED_FUNCTION_CODES  =   [1, 2, 3, 4]
+
+#Class definitions
+class DataSimResponseCache:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimResponseCache
+    #   Description    :    Encoded read responses (function code byte and data) of the
+    #                       current tick, one instance per server shared by all
+    #                       connections. Exception responses are not cached. Once
+    #                       int_max_entries ranges are cached, further ranges are served
+    #                       uncached until the next tick.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.int_max_entries    =   kwargs.get('int_max_entries', utils.INT_DEFAULT_RESPONSE_CACHE_ENTRIES)
+
+        #Responses and counters
+        self.dict_responses     =   {}
+        self.int_hits           =   0
+        self.int_misses         =   0
+        self.int_invalidations  =   0
+
+    def get(self, obj_request):
+
+        #=====================================================================================
+        #   Function Name  :    get
+        #   Description    :    Returns the cached response of a read request, None on a
+        #                       miss
+        #=====================================================================================
+
+        bytes_response  =   self.dict_responses.get((obj_request.dev_id, obj_request.function_code, obj_request.address, obj_request.count))
+
+        if bytes_response is None:
+            self.int_misses     +=  1
+        else:
+            self.int_hits       +=  1
+
+        return bytes_response
+
+    def put(self, obj_request, bytes_response):
+
+        #=====================================================================================
+        #   Function Name  :    put
+        #   Description    :    Caches the encoded response of a read request
+        #=====================================================================================
+
+        if len(self.dict_responses) < self.int_max_entries:
+            self.dict_responses[(obj_request.dev_id, obj_request.function_code, obj_request.address, obj_request.count)]  =   bytes_response
+
+    def invalidate(self):
+
+        #=====================================================================================
+        #   Function Name  :    invalidate
+        #   Description    :    Drops all cached responses
+        #=====================================================================================
+
+        if self.dict_responses:
+            self.dict_responses     =   {}
+            self.int_invalidations  +=  1
+
+    def get_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_stats
+        #   Description    :    Returns the hit, miss and invalidation counters and the
+        #                       cached ranges
+        #=====================================================================================
+
+        return {
+                    'int_cache_hits'            :   self.int_hits,
+                    'int_cache_misses'          :   self.int_misses,
+                    'int_cache_invalidations'   :   self.int_invalidations,
+                    'int_cache_entries'         :   len(self.dict_responses)
+                }
+
+class DataSimCachedRequestHandler(ServerRequestHandler):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimCachedRequestHandler
+    #   Description    :    pymodbus connection handler with the response cache. A cached
+    #                       read is answered right away instead of through a datastore
+    #                       task, the PDU and packet hooks still see the request and the
+    #                       response.
+    #=====================================================================================
+
+    def __init__(self, owner, trace_packet, trace_pdu, trace_connect):
+
+        super().__init__(owner, trace_packet, trace_pdu, trace_connect)
+
+        #Server wide cache
+        self.obj_response_cache     =   owner.obj_response_cache
+
+    def handle_later(self):
+
+        #=====================================================================================
+        #   Function Name  :    handle_later
+        #   Description    :    Sends the cached response of a read request, other requests
+        #                       and misses are handled by pymodbus
+        #=====================================================================================
+
+        if not self.send_cached(self.last_pdu, self.last_addr):
+            super().handle_later()
+
+    def send_cached(self, obj_request, tuple_addr):
+
+        #=====================================================================================
+        #   Function Name  :    send_cached
+        #   Description    :    Sends the cached response of a read request, returns False
+        #                       if the request has to be handled
+        #=====================================================================================
+
+        if not obj_request or obj_request.function_code not in LIST_CACHED_FUNCTION_CODES:
+            return False
+
+        bytes_response  =   self.obj_response_cache.get(obj_request)
+        if bytes_response is None:
+            return False
+
+        self.trace_pdu(True, obj_request)
+        self.low_level_send(self.trace_packet(True, self.framer.encode(bytes_response, obj_request.dev_id, obj_request.transaction_id)), addr=tuple_addr)
+
+        return True
+
+    async def handle_request(self):
+
+        #=====================================================================================
+        #   Function Name  :    handle_request
+        #   Description    :    Handles a request with pymodbus, a write invalidates the
+        #                       server wide cache of every connection once it is applied
+        #=====================================================================================
+
+        obj_request     =   self.last_pdu
+
+        await super().handle_request()
+
+        if obj_request and obj_request.function_code not in LIST_CACHED_FUNCTION_CODES:
+            self.obj_response_cache.invalidate()
+
+    def server_send(self, pdu, addr):
+
+        #=====================================================================================
+        #   Function Name  :    server_send
+        #   Description    :    Encodes the response once, caches it if it answers a read
+        #                       and sends it. The request is still the last PDU of the
+        #                       connection here.
+        #=====================================================================================
+
+        obj_request     =   self.last_pdu
+
+        if not pdu or not obj_request or pdu.function_code not in LIST_CACHED_FUNCTION_CODES or pdu.function_code != obj_request.function_code:
+            return super().server_send(pdu, addr)
+
+        bytes_response  =   pdu.function_code.to_bytes(1, 'big') + pdu.encode()
+        self.obj_response_cache.put(obj_request, bytes_response)
+        self.trace_pdu(True, pdu)
+        self.low_level_send(self.trace_packet(True, self.framer.encode(bytes_response, pdu.dev_id, pdu.transaction_id)), addr=addr)
+
+class DataSimCachedTcpServer(ModbusTcpServer):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimCachedTcpServer
+    #   Description    :    pymodbus TCP server whose connections share the response cache
+    #=====================================================================================
+
+    def __init__(self, context, **kwargs):
+
+        self.obj_response_cache     =   kwargs.pop('obj_response_cache')
+        super().__init__(context, **kwargs)
+
+    def callback_new_connection(self):
+
+        #=====================================================================================
+        #   Function Name  :    callback_new_connection
+        #   Description    :    Returns the cached handler for a new client connection
+        #=====================================================================================
+
+        if self.trace_connect:
+            self.trace_connect(True)
+
+        return DataSimCachedRequestHandler(self, self.trace_packet, self.trace_pdu, self.trace_connect)
+
+class DataSimCachedUdpRequestHandler(udp_server.DataSimUdpRequestHandler, DataSimCachedRequestHandler):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimCachedUdpRequestHandler
+    #   Description    :    Cached handler of the UDP socket. The requests are queued by
+    #                       the UDP handler, so the cache is looked up in the request task
+    #                       with the queued request.
+    #=====================================================================================
+
+    async def handle_datagram(self, obj_request, tuple_addr):
+
+        #=====================================================================================
+        #   Function Name  :    handle_datagram
+        #   Description    :    Sends the cached response or handles the request
+        #=====================================================================================
+
+        if not self.send_cached(obj_request, tuple_addr):
+            await super().handle_datagram(obj_request, tuple_addr)
+
+class DataSimCachedUdpServer(ModbusUdpServer):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimCachedUdpServer
+    #   Description    :    pymodbus UDP server whose socket handler uses the response cache
+    #=====================================================================================
+
+    def __init__(self, context, **kwargs):
+
+        self.obj_response_cache     =   kwargs.pop('obj_response_cache')
+        super().__init__(context, **kwargs)
+
+    def callback_new_connection(self):
+
+        #=====================================================================================
+        #   Function Name  :    callback_new_connection
+        #   Description    :    Returns the cached handler of the UDP socket
+        #=====================================================================================
+
+        if self.trace_connect:
+            self.trace_connect(True)
+
+        return DataSimCachedUdpRequestHandler(self, self.trace_packet, self.trace_pdu, self.trace_connect)
@@ -0,0 +1,279 @@
+#=========================================================================================
+#   Name        :   shared_frames.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a shared frames module which does the following:
+#                       1.  Defines DataSimSharedFrames class
+#                       2.  Publishes the decoded address vector and uint16 frame matrix
+#                           of an asset once into a named shared memory segment
+#                       3.  Lets every other simulator process of the same asset attach
+#                           to it read-only and zero-copy instead of re-parsing the CSVs
+#                       4.  Reference counts the attached processes and unlinks the
+#                           segment and its lock file when the last one exits
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from multiprocessing import shared_memory, resource_tracker, util
+import numpy as np
+import tempfile
+import fcntl
+
+#Variable definition
+BYTES_SEGMENT_MAGIC         =   b'ESSDSFRM'
+INT_SEGMENT_PID_SLOTS       =   1024
+INT_SEGMENT_HEADER_WORDS    =   4 + INT_SEGMENT_PID_SLOTS
+
+#Class definitions
+class DataSimSharedFrames:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimSharedFrames
+    #   Description    :    Shared memory segment layout (int64 words, then arrays):
+    #                           1.  magic, timesteps, registers, pid slots
+    #                           2.  pid table of the attached processes (0 = free slot)
+    #                           3.  arr_addresses : int64[registers]
+    #                           4.  arr_frames    : uint16[timesteps x registers]
+    #                       The segment name holds a hash of the source CSVs and encoding
+    #                       options so changed inputs never attach to stale frames.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_asset_type     =   kwargs.get('str_asset_type', utils.STR_DEFAULT_ASSET_TYPE)
+        self.str_filepath       =   kwargs.get('str_filepath', utils.STR_DEFAULT_CONFIG_FILEPATH)
+        self.dict_options       =   kwargs.get('dict_encoding_options', {})
+        self.obj_logger         =   kwargs.get('obj_logger', None)
+
+        #Initialize attributes
+        self.obj_utils          =   utils.DataSimUtils()
+        self.obj_segment        =   None
+        self.arr_addresses      =   None
+        self.arr_frames         =   None
+        self.bool_published     =   False
+        self.bool_tracker_fallback  =   False
+
+        #Segment and lock names keyed by the content of the source files and the encoding options
+        str_digest              =   self.obj_utils.get_frame_source_digest(str_asset_type=self.str_asset_type, str_filepath=self.str_filepath, dict_encoding_options=self.dict_options)
+        self.str_segment_name   =   f"essds_{self.str_asset_type}_{str_digest[:16]}"
+        str_lock_folder         =   '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        self.str_lock_filepath  =   os.path.join(str_lock_folder, self.str_segment_name+'.lock')
+
+    def open_segment(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    open_segment
+        #   Description    :    Opens (or creates) the named segment without registering it
+        #                       with the multiprocessing resource tracker, which would unlink
+        #                       it when any attached process exits
+        #=====================================================================================
+
+        #Extract keyword args
+        bool_create     =   kwargs.get('bool_create', False)
+        int_size        =   kwargs.get('int_size', 0)
+
+        try:
+            return shared_memory.SharedMemory(name=self.str_segment_name, create=bool_create, size=int_size, track=False)
+
+        except TypeError:
+
+            #Python < 3.13 has no track argument
+            obj_segment =   shared_memory.SharedMemory(name=self.str_segment_name, create=bool_create, size=int_size)
+            resource_tracker.unregister(obj_segment._name, 'shared_memory')
+            self.bool_tracker_fallback  =   True
+
+            return obj_segment
+
+    def open_lock(self):
+
+        #=====================================================================================
+        #   Function Name  :    open_lock
+        #   Description    :    Opens and exclusively locks the segment lock file. The last
+        #                       process unlinks the lock file while holding it, so a lock
+        #                       taken on an unlinked file is dropped and taken again on the
+        #                       current one.
+        #=====================================================================================
+
+        while True:
+
+            obj_lock_file   =   open(self.str_lock_filepath, 'a+')
+            fcntl.flock(obj_lock_file, fcntl.LOCK_EX)
+
+            try:
+                if os.stat(self.str_lock_filepath).st_ino == os.fstat(obj_lock_file.fileno()).st_ino:
+                    return obj_lock_file
+            except FileNotFoundError:
+                pass
+
+            obj_lock_file.close()
+
+    def map_arrays(self):
+
+        #=====================================================================================
+        #   Function Name  :    map_arrays
+        #   Description    :    Creates the header, address and frame views over the segment
+        #=====================================================================================
+
+        arr_header          =   np.ndarray((INT_SEGMENT_HEADER_WORDS,), dtype=np.int64, buffer=self.obj_segment.buf)
+        int_timesteps       =   int(arr_header[1])
+        int_registers       =   int(arr_header[2])
+        int_offset          =   INT_SEGMENT_HEADER_WORDS * 8
+
+        self.arr_addresses  =   np.ndarray((int_registers,), dtype=np.int64, buffer=self.obj_segment.buf, offset=int_offset)
+        self.arr_frames     =   np.ndarray((int_timesteps, int_registers), dtype=np.uint16, buffer=self.obj_segment.buf, offset=int_offset + int_registers * 8)
+
+        #Attached processes only read the frames
+        self.arr_addresses.flags.writeable  =   False
+        self.arr_frames.flags.writeable     =   False
+
+        return arr_header
+
+    def register_pid(self, arr_header):
+
+        #=====================================================================================
+        #   Function Name  :    register_pid
+        #   Description    :    Frees the slots of processes that are gone and adds this
+        #                       process to the pid table, returns the live process count
+        #=====================================================================================
+
+        arr_pids    =   arr_header[4:]
+
+        for int_slot in np.flatnonzero(arr_pids):
+            if not self.is_pid_alive(int(arr_pids[int_slot])):
+                arr_pids[int_slot]  =   0
+
+        arr_free    =   np.flatnonzero(arr_pids == 0)
+        if arr_free.size == 0:
+            raise RuntimeError(f"Shared frames segment {self.str_segment_name} has no free pid slot")
+
+        arr_pids[arr_free[0]]   =   os.getpid()
+
+        return int(np.count_nonzero(arr_pids))
+
+    def is_pid_alive(self, int_pid):
+
+        #=====================================================================================
+        #   Function Name  :    is_pid_alive
+        #   Description    :    Returns True if a process with this pid exists
+        #=====================================================================================
+
+        try:
+            os.kill(int_pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+        return True
+
+    def attach_or_publish(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    attach_or_publish
+        #   Description    :    This function does the following:
+        #                           1.  Takes the segment lock so only one process builds
+        #                           2.  Attaches to the segment if it already exists
+        #                           3.  Otherwise calls func_build_frames, which returns the
+        #                               address vector and the frame matrix, and publishes
+        #                               them into a new segment
+        #                           4.  Returns the read-only shared views
+        #=====================================================================================
+
+        #Extract keyword args
+        func_build_frames   =   kwargs.get('func_build_frames', None)
+
+        with self.open_lock():
+
+            try:
+                #Attach to the published frames
+                self.obj_segment        =   self.open_segment()
+                self.bool_published     =   False
+
+            except FileNotFoundError:
+
+                #First process builds and publishes the frames
+                arr_addresses, arr_frames   =   func_build_frames()
+                int_size                    =   INT_SEGMENT_HEADER_WORDS * 8 + arr_addresses.size * 8 + arr_frames.size * 2
+
+                self.obj_segment            =   self.open_segment(bool_create=True, int_size=int_size)
+                arr_header                  =   np.ndarray((INT_SEGMENT_HEADER_WORDS,), dtype=np.int64, buffer=self.obj_segment.buf)
+                arr_header[:]               =   0
+                arr_header[1:4]             =   [arr_frames.shape[0], arr_frames.shape[1], INT_SEGMENT_PID_SLOTS]
+
+                #Copy the arrays in, then mark the segment valid
+                int_offset                  =   INT_SEGMENT_HEADER_WORDS * 8
+                np.ndarray(arr_addresses.shape, dtype=np.int64, buffer=self.obj_segment.buf, offset=int_offset)[:]                        =   arr_addresses
+                np.ndarray(arr_frames.shape, dtype=np.uint16, buffer=self.obj_segment.buf, offset=int_offset + arr_addresses.size * 8)[:]  =   arr_frames
+                arr_header[0]               =   np.frombuffer(BYTES_SEGMENT_MAGIC, dtype=np.int64)[0]
+                self.bool_published         =   True
+
+            arr_header          =   self.map_arrays()
+
+            #Validate the segment
+            if arr_header[0] != np.frombuffer(BYTES_SEGMENT_MAGIC, dtype=np.int64)[0]:
+                raise RuntimeError(f"Shared frames segment {self.str_segment_name} is not valid")
+
+            int_process_count   =   self.register_pid(arr_header)
+
+        #Release the segment on exit, multiprocessing finalizers also run in fleet workers
+        #which leave through os._exit and skip atexit
+        util.Finalize(self, self.release, exitpriority=10)
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Shared Frames       :  {'Published' if self.bool_published else 'Attached'} {self.str_segment_name} ({self.obj_segment.size} bytes, {int_process_count} processes)")
+
+        return self.arr_addresses, self.arr_frames
+
+    def release(self):
+
+        #=====================================================================================
+        #   Function Name  :    release
+        #   Description    :    Removes this process from the pid table and unlinks the
+        #                       segment and the lock file when no live process is attached
+        #                       anymore
+        #=====================================================================================
+
+        #Nothing attached
+        if self.obj_segment is None:
+            return
+
+        with self.open_lock():
+
+            arr_pids                    =   np.ndarray((INT_SEGMENT_HEADER_WORDS,), dtype=np.int64, buffer=self.obj_segment.buf)[4:]
+            arr_pids[arr_pids == os.getpid()]   =   0
+
+            for int_slot in np.flatnonzero(arr_pids):
+                if not self.is_pid_alive(int(arr_pids[int_slot])):
+                    arr_pids[int_slot]  =   0
+
+            bool_last_process           =   not arr_pids.any()
+
+            #Drop the views before closing the mapping
+            del arr_pids
+            self.arr_addresses          =   None
+            self.arr_frames             =   None
+
+            try:
+                self.obj_segment.close()
+            except BufferError:
+                #A view is still referenced elsewhere, the mapping goes away with the process
+                pass
+
+            if bool_last_process:
+
+                #unlink unregisters from the resource tracker, register first on Python < 3.13
+                if self.bool_tracker_fallback:
+                    resource_tracker.register(self.obj_segment._name, 'shared_memory')
+
+                self.obj_segment.unlink()
+                os.unlink(self.str_lock_filepath)
+
+        self.obj_segment    =   None
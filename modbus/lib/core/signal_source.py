@@ -0,0 +1,279 @@
+#=========================================================================================
+#   Name        :   signal_source.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a signal source module which does the following:
+#                       1.  Defines DataSimSignalSource class
+#                       2.  Computes the register values of every tag each tick from
+#                           waveform parameters in the tag list instead of playing a
+#                           precomputed table, memory only grows with the tag count
+#                       3.  Supports constant, sine, ramp, sawtooth, step and random walk
+#                           waveforms with bounded noise and random fault events
+#                       4.  Draws all randomness from one seeded generator so a run is
+#                           reproducible
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import frame_engine
+from core import register_codec
+import pandas as pd
+import numpy as np
+
+#Variable definition
+#Waveform and amplitude of each data type when the tag list leaves them empty
+DICT_DEFAULT_SIGNALS        =   {
+                                    'Short'     :   ('sine', 30),
+                                    'Bool'      :   ('step', 1),
+                                    'Word'      :   ('sawtooth', 60),
+                                    'DWord'     :   ('sawtooth', 60),
+                                    'Int32'     :   ('sine', 30),
+                                    'UInt32'    :   ('sawtooth', 60),
+                                    'Float32'   :   ('sine', 30),
+                                    'Int64'     :   ('sine', 30)
+                                }
+FLOAT_DEFAULT_SIGNAL_PERIOD =   60.0
+
+#Class definitions
+class DataSimSignalSource(frame_engine.DataSimFrameEngine):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimSignalSource
+    #   Description    :    Frame engine whose frames are computed each tick. Optional tag
+    #                       list columns, empty cells take the data type defaults:
+    #                           1.  waveform       : constant, sine, ramp, sawtooth, step
+    #                                                or random_walk
+    #                           2.  amplitude      : peak value before scaling and offset
+    #                           3.  bias           : value the waveform is added to
+    #                           4.  period         : waveform period in seconds
+    #                           5.  noise          : bound of the uniform noise added
+    #                           6.  event rate     : fault events per hour
+    #                           7.  event value    : value held during a fault event
+    #                           8.  event duration : fault event length in seconds
+    #                       The value is ((bias + waveform + noise) * scaling) + offset,
+    #                       like the test data generator, packed into the registers of
+    #                       its data type by the register codec.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_tag_list_filepath  =   kwargs.get('str_tag_list_filepath', None)
+        dict_server_tag_list        =   kwargs.get('dict_server_tag_list', None)
+        self.int_seed               =   kwargs.get('int_seed', utils.INT_DEFAULT_SIGNAL_SEED)
+        self.obj_logger             =   kwargs.get('obj_logger', None)
+
+        super().__init__()
+
+        #Read the tag list, the last row of a repeated name wins like in the tag list dict
+        df_tag_list                 =   pd.read_csv(self.str_tag_list_filepath)
+        dict_rows                   =   {str_name: int_row for int_row, str_name in enumerate(df_tag_list['name'])}
+
+        arr_addresses, list_tag_names   =   self.get_column_order   (
+                                                                        list_columns            =   list(dict_rows),
+                                                                        dict_server_tag_list    =   dict_server_tag_list,
+                                                                        obj_logger              =   self.obj_logger
+                                                                    )
+        df_tag_list                 =   df_tag_list.iloc[[dict_rows[str_name] for str_name in list_tag_names]].reset_index(drop=True)
+        self.list_tag_names         =   list_tag_names
+
+        #Validate the data types
+        arr_data_types              =   df_tag_list['data type'].to_numpy(dtype=object)
+        for str_data_type in pd.unique(arr_data_types):
+            if str_data_type not in DICT_DEFAULT_SIGNALS:
+                raise ValueError(f"Unknown data type: {str_data_type}")
+
+        #Signal parameters per tag, in register address order
+        arr_waveforms               =   self.get_parameter(df_tag_list, 'waveform', [DICT_DEFAULT_SIGNALS[str_data_type][0] for str_data_type in arr_data_types]).astype(str)
+        self.arr_amplitude          =   self.get_parameter(df_tag_list, 'amplitude', [DICT_DEFAULT_SIGNALS[str_data_type][1] for str_data_type in arr_data_types]).astype(np.float64)
+        self.arr_bias               =   self.get_parameter(df_tag_list, 'bias', 0).astype(np.float64)
+        self.arr_period             =   self.get_parameter(df_tag_list, 'period', FLOAT_DEFAULT_SIGNAL_PERIOD).astype(np.float64)
+        self.arr_noise              =   self.get_parameter(df_tag_list, 'noise', 0).astype(np.float64)
+        self.arr_event_rate         =   self.get_parameter(df_tag_list, 'event rate', 0).astype(np.float64)
+        self.arr_event_value        =   self.get_parameter(df_tag_list, 'event value', 0).astype(np.float64)
+        self.arr_event_duration     =   self.get_parameter(df_tag_list, 'event duration', 0).astype(np.float64)
+        self.arr_scaling            =   df_tag_list['scaling'].to_numpy(dtype=np.float64)
+        self.arr_offset             =   df_tag_list['offset'].to_numpy(dtype=np.float64)
+
+        #Validate the parameters
+        for str_waveform in np.unique(arr_waveforms):
+            if str_waveform not in utils.LIST_SIGNAL_WAVEFORMS:
+                raise ValueError(f"Unknown waveform: {str_waveform}")
+        if (self.arr_period <= 0).any():
+            raise ValueError(f"Signal period must be positive: {df_tag_list['name'][self.arr_period <= 0].tolist()}")
+
+        #Columns of each waveform and of the tags with noise or fault events
+        self.dict_waveform_columns  =   {str_waveform: np.flatnonzero(arr_waveforms == str_waveform) for str_waveform in utils.LIST_SIGNAL_WAVEFORMS}
+        self.arr_noise_columns      =   np.flatnonzero(self.arr_noise > 0)
+        self.arr_event_columns      =   np.flatnonzero(self.arr_event_rate > 0)
+
+        #Seeded generator, the same seed and ticks give the same values
+        self.obj_random             =   np.random.default_rng(self.int_seed)
+        self.float_tick_seconds     =   utils.FLOAT_DEFAULT_PUBLISH_INTERVAL
+        self.arr_event_ticks        =   None
+        self.int_event_count        =   0
+
+        #Register layout of the tags
+        self.obj_codec              =   register_codec.DataSimRegisterCodec (
+                                                                                list_tag_names      =   list_tag_names,
+                                                                                arr_tag_addresses   =   arr_addresses,
+                                                                                dict_tag_encodings  =   self.obj_utils.get_tag_encodings(df_tag_list=df_tag_list),
+                                                                                obj_logger          =   self.obj_logger
+                                                                            )
+
+        #One frame per device, filled each tick
+        self.set_frames (
+                            arr_addresses   =   self.obj_codec.arr_addresses,
+                            arr_frames      =   np.zeros((1, self.obj_codec.arr_addresses.size), dtype=np.uint16),
+                            obj_logger      =   self.obj_logger
+                        )
+        self.set_devices()
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Signal Source       :  {arr_addresses.size} tags, seed {self.int_seed}, {dict((str_waveform, int(arr_columns.size)) for str_waveform, arr_columns in self.dict_waveform_columns.items() if arr_columns.size)}")
+
+    def get_parameter(self, df_tag_list, str_column, obj_default):
+
+        #=====================================================================================
+        #   Function Name  :    get_parameter
+        #   Description    :    Returns a tag list column as an array, missing columns and
+        #                       empty cells take the default (a scalar or one per tag)
+        #=====================================================================================
+
+        arr_default     =   np.broadcast_to(np.asarray(obj_default, dtype=object), (len(df_tag_list),))
+
+        if str_column not in df_tag_list.columns:
+            return np.array(arr_default)
+
+        arr_values      =   df_tag_list[str_column].to_numpy(dtype=object)
+        arr_missing     =   pd.isna(arr_values)
+
+        return np.where(arr_missing, arr_default, arr_values)
+
+    def set_devices(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    set_devices
+        #   Description    :    Sets the device phases and allocates one frame and the
+        #                       random walk and fault event state per device
+        #=====================================================================================
+
+        arr_phases              =   super().set_devices(**kwargs)
+        tuple_shape             =   (arr_phases.size, len(self.list_tag_names))
+
+        self.arr_frames         =   np.zeros((arr_phases.size, self.arr_addresses.size), dtype=np.uint16)
+        self.arr_values         =   np.zeros(tuple_shape, dtype=np.float64)
+        self.arr_walk           =   np.zeros(tuple_shape, dtype=np.float64)
+        self.arr_event_ticks    =   np.zeros((arr_phases.size, self.arr_event_columns.size), dtype=np.int64)
+
+        return arr_phases
+
+    def set_playback(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    set_playback
+        #   Description    :    Signals are evaluated at the tick time, every playback mode
+        #                       computes one frame per tick of float_publish_interval
+        #=====================================================================================
+
+        #Extract keyword args
+        self.float_tick_seconds     =   kwargs.get('float_publish_interval', utils.FLOAT_DEFAULT_PUBLISH_INTERVAL)
+
+        return 1.0
+
+    def next_frames(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    next_frames
+        #   Description    :    This function does the following:
+        #                           1.  Computes the waveform of every tag of every device
+        #                               at the tick time, one array op per waveform
+        #                           2.  Steps the random walks, adds the noise and starts,
+        #                               holds or ends the fault events
+        #                           3.  Applies scaling and offset and packs the values into
+        #                               the register words of every device
+        #                       Skipped ticks are stepped over, the random walks and fault
+        #                       events advance by the ticks elapsed.
+        #=====================================================================================
+
+        #Extract keyword args
+        int_skipped_frames  =   kwargs.get('int_skipped_frames', 0)
+
+        #Step over skipped frames
+        self.int_index      +=  int_skipped_frames
+        int_ticks           =   int_skipped_frames + 1
+
+        #Position in the waveform cycle of every tag of every device
+        arr_time            =   ((self.int_index + self.arr_phases) * self.float_tick_seconds)[:, None]
+        arr_cycles          =   arr_time / self.arr_period
+        arr_fraction        =   arr_cycles - np.floor(arr_cycles)
+
+        for str_waveform, arr_columns in self.dict_waveform_columns.items():
+
+            if not arr_columns.size:
+                continue
+
+            arr_amplitude   =   self.arr_amplitude[arr_columns]
+
+            if str_waveform == 'constant':
+                self.arr_values[:, arr_columns] =   arr_amplitude
+            elif str_waveform == 'sine':
+                self.arr_values[:, arr_columns] =   arr_amplitude * np.sin(2 * np.pi * arr_fraction[:, arr_columns])
+            elif str_waveform == 'ramp':
+                self.arr_values[:, arr_columns] =   arr_amplitude * (1 - np.abs(2 * arr_fraction[:, arr_columns] - 1))
+            elif str_waveform == 'sawtooth':
+                self.arr_values[:, arr_columns] =   arr_amplitude * arr_fraction[:, arr_columns]
+            elif str_waveform == 'step':
+                self.arr_values[:, arr_columns] =   arr_amplitude * (arr_fraction[:, arr_columns] >= 0.5)
+            else:
+                #Random walk bounded by the amplitude, crosses it in about one period
+                arr_step    =   self.obj_random.uniform(-1, 1, (self.arr_phases.size, arr_columns.size)) * arr_amplitude * np.sqrt(int_ticks * self.float_tick_seconds / self.arr_period[arr_columns])
+                self.arr_walk[:, arr_columns]   =   np.clip(self.arr_walk[:, arr_columns] + arr_step, -arr_amplitude, arr_amplitude)
+                self.arr_values[:, arr_columns] =   self.arr_walk[:, arr_columns]
+
+        #Bias and bounded noise
+        np.add(self.arr_values, self.arr_bias, out=self.arr_values)
+        if self.arr_noise_columns.size:
+            self.arr_values[:, self.arr_noise_columns]  +=  self.obj_random.uniform(-1, 1, (self.arr_phases.size, self.arr_noise_columns.size)) * self.arr_noise[self.arr_noise_columns]
+
+        #Fault events, a tag without an active event starts one with its rate per tick
+        if self.arr_event_columns.size:
+            arr_probability         =   self.arr_event_rate[self.arr_event_columns] * int_ticks * self.float_tick_seconds / 3600
+            arr_duration_ticks      =   np.maximum(1, np.ceil(self.arr_event_duration[self.arr_event_columns] / self.float_tick_seconds)).astype(np.int64)
+
+            self.arr_event_ticks    =   np.maximum(self.arr_event_ticks - int_ticks, 0)
+            arr_start               =   (self.arr_event_ticks == 0) & (self.obj_random.random(self.arr_event_ticks.shape) < arr_probability)
+            self.arr_event_ticks    =   np.where(arr_start, arr_duration_ticks, self.arr_event_ticks)
+            self.int_event_count    +=  int(np.count_nonzero(arr_start))
+
+            arr_active              =   self.arr_event_ticks > 0
+            self.arr_values[:, self.arr_event_columns]  =   np.where(arr_active, self.arr_event_value[self.arr_event_columns], self.arr_values[:, self.arr_event_columns])
+
+        #Register values
+        np.multiply(self.arr_values, self.arr_scaling, out=self.arr_values)
+        np.add(self.arr_values, self.arr_offset, out=self.arr_values)
+        self.arr_frames[:]  =   self.obj_codec.encode(arr_values=self.arr_values)
+
+        #Increment index
+        self.int_index      +=  1
+
+        return self.arr_frames
+
+    def get_source_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_source_stats
+        #   Description    :    Returns the fault events started and currently active
+        #=====================================================================================
+
+        return  {
+                    'int_signal_events'         :   self.int_event_count,
+                    'int_signal_active_events'  :   int(np.count_nonzero(self.arr_event_ticks)) if self.arr_event_ticks is not None else 0
+                }
@@ -0,0 +1,238 @@
+#=========================================================================================
+#   Name        :   stream_source.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a stream source module which does the following:
+#                       1.  Defines DataSimStreamSource class
+#                       2.  Plays a recorded tag data CSV of any length with constant
+#                           memory: a background thread reads the file in chunks and
+#                           encodes them into a ring buffer of upcoming uint16 frames
+#                       3.  Loops back to the first row or holds the last frame at the
+#                           end of the file
+#                       4.  Counts prefetch stalls (ticks where the next frame was not
+#                           buffered yet and the previous frame was published again)
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from core import frame_engine
+from core import register_codec
+import pandas as pd
+import numpy as np
+import threading
+
+#Class definitions
+class DataSimStreamSource(frame_engine.DataSimFrameEngine):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimStreamSource
+    #   Description    :    Frame engine whose frames come from a ring buffer instead of
+    #                       the full table. Rows int_read_row to int_write_row - 1 of the
+    #                       stream are buffered, row r lives in slot r % int_buffer_rows.
+    #                       The prefetch thread only writes free slots and the publish
+    #                       loop only reads filled ones, the condition guards the counters.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_data_filepath      =   kwargs.get('str_data_filepath', None)
+        dict_server_tag_list        =   kwargs.get('dict_server_tag_list', None)
+        dict_tag_encodings          =   kwargs.get('dict_tag_encodings', {})
+        self.int_buffer_rows        =   kwargs.get('int_buffer_rows', utils.INT_DEFAULT_STREAM_BUFFER_ROWS)
+        self.int_chunk_rows         =   kwargs.get('int_chunk_rows', utils.INT_DEFAULT_STREAM_CHUNK_ROWS)
+        self.bool_loop              =   kwargs.get('bool_loop', True)
+        self.obj_logger             =   kwargs.get('obj_logger', None)
+
+        super().__init__()
+
+        #Validate the buffer size
+        if self.int_buffer_rows < 2 * self.int_chunk_rows:
+            raise ValueError(f"Stream buffer ({self.int_buffer_rows} rows) must hold at least two chunks of {self.int_chunk_rows} rows")
+
+        #Match the header with the tag list, the data rows are read by the prefetch thread
+        list_columns                =   list(pd.read_csv(self.str_data_filepath, nrows=0).columns)
+        arr_addresses, self.list_tag_names  =   self.get_column_order   (
+                                                                            list_columns            =   list_columns,
+                                                                            dict_server_tag_list    =   dict_server_tag_list,
+                                                                            obj_logger              =   self.obj_logger
+                                                                        )
+
+        #Register layout of the tags
+        self.obj_codec              =   register_codec.DataSimRegisterCodec (
+                                                                                list_tag_names      =   self.list_tag_names,
+                                                                                arr_tag_addresses   =   arr_addresses,
+                                                                                dict_tag_encodings  =   dict_tag_encodings,
+                                                                                obj_logger          =   self.obj_logger
+                                                                            )
+
+        #Ring buffer of encoded frames, exposed as arr_frames for the footprint
+        self.set_frames (
+                            arr_addresses   =   self.obj_codec.arr_addresses,
+                            arr_frames      =   np.zeros((self.int_buffer_rows, self.obj_codec.arr_addresses.size), dtype=np.uint16),
+                            obj_logger      =   self.obj_logger
+                        )
+        self.arr_last_frames        =   None
+
+        #Stream positions and counters
+        self.obj_condition          =   threading.Condition()
+        self.int_read_row           =   0
+        self.int_write_row          =   0
+        self.bool_eof               =   False
+        self.bool_closed            =   False
+        self.int_prefetch_stalls    =   0
+        self.int_rows_read          =   0
+        self.int_loop_count         =   0
+
+        #Start prefetching
+        self.obj_prefetch_thread    =   threading.Thread(target=self.prefetch, name='stream_prefetch', daemon=True)
+        self.obj_prefetch_thread.start()
+
+    def prefetch(self):
+
+        #=====================================================================================
+        #   Function Name  :    prefetch
+        #   Description    :    Prefetch thread, this function does the following:
+        #                           1.  Reads the data file in chunks of int_chunk_rows,
+        #                               only the matched tag columns
+        #                           2.  Packs each chunk into register words in one
+        #                               vectorized pass, clipped values of the first chunk
+        #                               are logged
+        #                           3.  Waits for free slots and copies the chunk into the
+        #                               ring buffer
+        #                           4.  Reopens the file at the end when looping
+        #=====================================================================================
+
+        try:
+            while True:
+
+                int_file_rows   =   0
+
+                for df_chunk in pd.read_csv(self.str_data_filepath, usecols=self.list_tag_names, chunksize=self.int_chunk_rows):
+
+                    arr_chunk       =   self.obj_codec.encode(arr_values=df_chunk[self.list_tag_names], obj_logger=self.obj_logger if self.int_rows_read == 0 else None)
+                    int_file_rows   +=  arr_chunk.shape[0]
+
+                    #Wait for room in the ring buffer
+                    with self.obj_condition:
+                        self.obj_condition.wait_for(lambda: self.bool_closed or self.int_write_row + arr_chunk.shape[0] - self.int_read_row <= self.int_buffer_rows)
+                        int_write_row   =   self.int_write_row
+
+                    #Source replaced by a reload
+                    if self.bool_closed:
+                        return
+
+                    #Copy outside the lock, these slots are not read until published
+                    arr_slots                   =   (int_write_row + np.arange(arr_chunk.shape[0])) % self.int_buffer_rows
+                    self.arr_frames[arr_slots]  =   arr_chunk
+
+                    with self.obj_condition:
+                        self.int_write_row  +=  arr_chunk.shape[0]
+                        self.int_rows_read  +=  arr_chunk.shape[0]
+                        self.obj_condition.notify_all()
+
+                #Stop at the end of the file, or of an empty file
+                if not self.bool_loop or int_file_rows == 0:
+                    break
+
+                self.int_loop_count     +=  1
+
+        except Exception as obj_error:
+            if self.obj_logger:
+                self.obj_logger.info(f"Stream Source       :  Prefetch stopped ({obj_error})")
+
+        with self.obj_condition:
+            self.bool_eof   =   True
+            self.obj_condition.notify_all()
+
+        #Log message
+        if self.obj_logger:
+            self.obj_logger.info(f"Stream Source       :  End of {os.path.basename(self.str_data_filepath)} after {self.int_rows_read} rows")
+
+    def set_devices(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    set_devices
+        #   Description    :    Sets the device phases, which must fit in the rows buffered
+        #                       ahead of the read position
+        #=====================================================================================
+
+        arr_phases          =   super().set_devices(**kwargs)
+        int_max_phase       =   int(arr_phases.max()) if arr_phases.size else 0
+
+        if arr_phases.min() < 0 or int_max_phase > self.int_buffer_rows - self.int_chunk_rows - 1:
+            raise ValueError(f"Device phases up to {int_max_phase} rows do not fit in the stream buffer of {self.int_buffer_rows} rows")
+
+        return arr_phases
+
+    def next_frames(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    next_frames
+        #   Description    :    Returns the next frame of every virtual device from the ring
+        #                       buffer and frees the row. If the rows are not prefetched yet
+        #                       the last frames are returned again and a stall is counted,
+        #                       the publish loop never waits on file I/O.
+        #=====================================================================================
+
+        #Extract keyword args
+        int_skipped_frames  =   kwargs.get('int_skipped_frames', 0)
+
+        int_max_phase       =   int(self.arr_phases.max())
+
+        with self.obj_condition:
+
+            #Step over skipped frames as far as they are buffered
+            self.int_read_row   =   min(self.int_read_row + int_skipped_frames, max(self.int_write_row - int_max_phase - 1, self.int_read_row))
+
+            #Next row of every device is buffered
+            if self.int_read_row + int_max_phase < self.int_write_row:
+
+                self.arr_last_frames    =   self.arr_frames[(self.int_read_row + self.arr_phases) % self.int_buffer_rows]
+                self.int_read_row       +=  1
+                self.int_index          =   self.int_read_row
+                self.obj_condition.notify_all()
+
+            #Prefetch behind, or end of the file when not looping
+            elif not self.bool_eof or self.arr_last_frames is None:
+                self.int_prefetch_stalls    +=  1
+
+        #Nothing buffered yet
+        if self.arr_last_frames is None:
+            return np.zeros((self.arr_phases.size, self.arr_addresses.size), dtype=np.uint16)
+
+        return self.arr_last_frames
+
+    def close(self):
+
+        #=====================================================================================
+        #   Function Name  :    close
+        #   Description    :    Stops the prefetch thread at its next chunk
+        #=====================================================================================
+
+        with self.obj_condition:
+            self.bool_closed    =   True
+            self.obj_condition.notify_all()
+
+    def get_source_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_source_stats
+        #   Description    :    Returns the prefetch stall count, the rows read, the file
+        #                       loops and the rows currently buffered
+        #=====================================================================================
+
+        with self.obj_condition:
+            return  {
+                        'int_prefetch_stalls'   :   self.int_prefetch_stalls,
+                        'int_stream_rows_read'  :   self.int_rows_read,
+                        'int_stream_loops'      :   self.int_loop_count,
+                        'int_buffered_rows'     :   self.int_write_row - self.int_read_row,
+                        'bool_stream_eof'       :   self.bool_eof
+                    }
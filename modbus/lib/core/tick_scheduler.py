@@ -0,0 +1,137 @@
+#=========================================================================================
+#   Name        :   tick_scheduler.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a tick scheduler module which does the following:
+#                       1.  Defines DataSimTickScheduler class
+#                       2.  Runs the publish loop on absolute monotonic deadlines so the
+#                           period does not drift by the time spent publishing
+#                       3.  Applies an overrun policy when a tick finishes late:
+#                               a.  skip     : drop the missed frames and realign
+#                               b.  catchup  : publish the missed frames back to back
+#                               c.  stretch  : restart the period from the late tick
+#                       4.  Keeps counters for tick duration, lateness and skipped frames
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+import time
+
+#Class definitions
+class DataSimTickScheduler:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimTickScheduler
+    #   Description    :    Deadline scheduler for the publish loop, counters are read
+    #                       at runtime with get_stats
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.float_publish_interval     =   kwargs.get('float_publish_interval', utils.FLOAT_DEFAULT_PUBLISH_INTERVAL)
+        self.str_overrun_policy         =   kwargs.get('str_overrun_policy', utils.STR_DEFAULT_OVERRUN_POLICY)
+
+        #Validate the overrun policy
+        if self.str_overrun_policy not in utils.LIST_OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy: {self.str_overrun_policy}")
+
+        #Initialize deadline state
+        self.float_deadline             =   None
+        self.float_tick_start           =   None
+
+        #Initialize counters
+        self.int_tick_count             =   0
+        self.int_overrun_count          =   0
+        self.int_skipped_frames         =   0
+        self.float_last_tick_duration   =   0.0
+        self.float_max_tick_duration    =   0.0
+        self.float_sum_tick_duration    =   0.0
+        self.float_last_lateness        =   0.0
+        self.float_max_lateness         =   0.0
+        self.float_sum_lateness         =   0.0
+
+    async def wait_next_tick(self):
+
+        #=====================================================================================
+        #   Function Name  :    wait_next_tick
+        #   Description    :    This is an async function that does the following:
+        #                           1.  Records the duration of the tick that just ended
+        #                           2.  Moves the deadline forward by one interval and
+        #                               applies the overrun policy if it already passed
+        #                           3.  Sleeps until the deadline and records the lateness
+        #                           4.  Returns the number of frames to advance (1 plus
+        #                               the frames skipped by the skip policy)
+        #=====================================================================================
+
+        float_now           =   time.monotonic()
+        int_missed_frames   =   0
+
+        #Record the duration of the previous tick
+        if self.float_tick_start is not None:
+            self.float_last_tick_duration   =   float_now - self.float_tick_start
+            self.float_max_tick_duration    =   max(self.float_max_tick_duration, self.float_last_tick_duration)
+            self.float_sum_tick_duration    +=  self.float_last_tick_duration
+
+        #First tick starts now, the rest follow on absolute deadlines
+        if self.float_deadline is None:
+            self.float_deadline     =   float_now
+        else:
+            self.float_deadline     +=  self.float_publish_interval
+
+            #Apply the overrun policy if the deadline has already passed
+            if float_now > self.float_deadline:
+
+                self.int_overrun_count  +=  1
+
+                if self.str_overrun_policy == 'skip':
+                    int_missed_frames           =   int((float_now - self.float_deadline) // self.float_publish_interval)
+                    self.float_deadline         +=  int_missed_frames * self.float_publish_interval
+                    self.int_skipped_frames     +=  int_missed_frames
+
+                elif self.str_overrun_policy == 'stretch':
+                    self.float_deadline         =   float_now
+
+        #Sleep until the deadline, catchup returns immediately while behind
+        float_delay         =   self.float_deadline - time.monotonic()
+        if float_delay > 0:
+            await utils.asyncio.sleep(float_delay)
+        else:
+            await utils.asyncio.sleep(0)
+
+        #Record the lateness of this tick
+        self.float_tick_start       =   time.monotonic()
+        self.float_last_lateness    =   max(0.0, self.float_tick_start - self.float_deadline)
+        self.float_max_lateness     =   max(self.float_max_lateness, self.float_last_lateness)
+        self.float_sum_lateness     +=  self.float_last_lateness
+        self.int_tick_count         +=  1
+
+        return 1 + int_missed_frames
+
+    def get_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_stats
+        #   Description    :    Returns the scheduler counters, durations in seconds
+        #=====================================================================================
+
+        int_completed_ticks     =   max(self.int_tick_count - 1, 1)
+
+        return  {
+                    'str_overrun_policy'            :   self.str_overrun_policy,
+                    'int_tick_count'                :   self.int_tick_count,
+                    'int_overrun_count'             :   self.int_overrun_count,
+                    'int_skipped_frames'            :   self.int_skipped_frames,
+                    'float_last_tick_duration'      :   self.float_last_tick_duration,
+                    'float_max_tick_duration'       :   self.float_max_tick_duration,
+                    'float_mean_tick_duration'      :   self.float_sum_tick_duration / int_completed_ticks,
+                    'float_last_lateness'           :   self.float_last_lateness,
+                    'float_max_lateness'            :   self.float_max_lateness,
+                    'float_mean_lateness'           :   self.float_sum_lateness / max(self.int_tick_count, 1)
+                }
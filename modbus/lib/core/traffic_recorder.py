@@ -0,0 +1,276 @@
+#=========================================================================================
+#   Name        :   traffic_recorder.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a traffic recorder module which does the following:
+#                       1.  Defines DataSimTrafficRecorder class, which appends every
+#                           incoming request (timestamp, client, unit ID, function code,
+#                           address range) to a binary journal as fixed size records
+#                       2.  Buffers the records in memory and writes them in large
+#                           blocks, when the buffer is full, on a flush interval and
+#                           when the process exits
+#                       3.  Hooks into the pymodbus connections through their trace_pdu
+#                           hook, a server without a journal runs unchanged. UDP clients
+#                           share one handler and are told apart by their address
+#                       4.  Reads a journal back as a numpy record array for the
+#                           traffic replayer
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from multiprocessing import util
+from pymodbus.transport import CommType
+import numpy as np
+import functools
+import struct
+import time
+
+#Variable definition
+BYTES_JOURNAL_MAGIC     =   b'ESSDSJ01'
+STRUCT_JOURNAL_RECORD   =   struct.Struct('<QIBBHH')
+DTYPE_JOURNAL_RECORD    =   np.dtype([
+                                        ('int_time_us',         '<u8'),
+                                        ('int_client_id',       '<u4'),
+                                        ('int_unit_id',         'u1'),
+                                        ('int_function_code',   'u1'),
+                                        ('int_address',         '<u2'),
+                                        ('int_count',           '<u2')
+                                    ])
+
+#Class definitions
+class DataSimTrafficRecorder:
+
+    #=====================================================================================
+    #   Class Name     :    DataSimTrafficRecorder
+    #   Description    :    Append-only request journal of one server. The file starts with
+    #                       an 8 byte magic followed by 18 byte little endian records:
+    #                           1.  int_time_us         : wall clock time of the request
+    #                                                     in microseconds since the epoch
+    #                           2.  int_client_id       : client number, from 1 in the
+    #                                                     order the TCP connections opened
+    #                                                     or the UDP client addresses sent
+    #                                                     their first request
+    #                           3.  int_unit_id         : unit ID of the request
+    #                           4.  int_function_code   : Modbus function code
+    #                           5.  int_address         : start address, 0 if none
+    #                           6.  int_count           : registers/coils, 1 for single
+    #                                                     writes, 0 if none
+    #                       An existing journal is appended to, timestamps are absolute
+    #                       so several runs stay in order.
+    #=====================================================================================
+
+    def __init__(self, **kwargs):
+
+        #Extract keyword args
+        self.str_journal_filepath   =   kwargs.get('str_journal_filepath', None)
+        self.int_buffer_bytes       =   kwargs.get('int_buffer_bytes', utils.INT_DEFAULT_JOURNAL_BUFFER_BYTES)
+        self.float_flush_interval   =   kwargs.get('float_flush_interval', utils.FLOAT_DEFAULT_JOURNAL_FLUSH_INTERVAL)
+        self.obj_logger             =   kwargs.get('obj_logger', None)
+
+        #Journal file, unbuffered since the records are buffered here
+        bool_new_journal            =   not os.path.isfile(self.str_journal_filepath) or os.path.getsize(self.str_journal_filepath) == 0
+        if not bool_new_journal:
+            self.read_header(self.str_journal_filepath)
+        self.obj_file               =   open(self.str_journal_filepath, 'ab', buffering=0)
+        if bool_new_journal:
+            self.obj_file.write(BYTES_JOURNAL_MAGIC)
+
+        #Record buffer and counters
+        self.bytearray_buffer       =   bytearray()
+        self.int_client_count       =   0
+        self.int_record_count       =   0
+        self.dict_clients           =   {}
+        self.dict_udp_client_ids    =   {}
+        self.tuple_udp_addr         =   None
+
+        #Write the buffered records on every exit, including the fleet workers, which
+        #leave through os._exit and skip atexit
+        util.Finalize(self, self.close, exitpriority=10)
+
+    @staticmethod
+    def read_header(str_journal_filepath):
+
+        #=====================================================================================
+        #   Function Name  :    read_header
+        #   Description    :    Raises a ValueError if the file is not a request journal
+        #=====================================================================================
+
+        with open(str_journal_filepath, 'rb') as obj_file:
+            if obj_file.read(len(BYTES_JOURNAL_MAGIC)) != BYTES_JOURNAL_MAGIC:
+                raise ValueError(f"Not a request journal: {str_journal_filepath}")
+
+    @staticmethod
+    def read_journal(str_journal_filepath):
+
+        #=====================================================================================
+        #   Function Name  :    read_journal
+        #   Description    :    Returns the records of a journal as a numpy record array,
+        #                       a partly written last record is ignored
+        #=====================================================================================
+
+        DataSimTrafficRecorder.read_header(str_journal_filepath)
+
+        int_record_count    =   (os.path.getsize(str_journal_filepath) - len(BYTES_JOURNAL_MAGIC)) // DTYPE_JOURNAL_RECORD.itemsize
+
+        return np.fromfile(str_journal_filepath, dtype=DTYPE_JOURNAL_RECORD, count=int_record_count, offset=len(BYTES_JOURNAL_MAGIC))
+
+    def attach(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    attach
+        #   Description    :    Wraps the connection factory of a pymodbus server so every
+        #                       new connection records its requests
+        #=====================================================================================
+
+        #Extract keyword args
+        obj_server      =   kwargs.get('obj_server', None)
+
+        obj_server.callback_new_connection  =   functools.partial(self.callback_new_connection, obj_server.callback_new_connection)
+
+    def callback_new_connection(self, func_new_connection):
+
+        #=====================================================================================
+        #   Function Name  :    callback_new_connection
+        #   Description    :    Creates the connection handler and chains the recording in
+        #                       front of its trace_pdu hook, under a new client ID. The
+        #                       handler of a UDP socket gets client ID 0 and also records
+        #                       the address of every datagram.
+        #=====================================================================================
+
+        obj_handler                     =   func_new_connection()
+
+        if obj_handler.comm_params.comm_type == CommType.UDP:
+            int_client_id               =   0
+            obj_handler.callback_data   =   functools.partial(self.callback_data, obj_handler.callback_data)
+        else:
+            self.int_client_count       +=  1
+            int_client_id               =   self.int_client_count
+
+        obj_handler.trace_pdu           =   functools.partial(self.trace_pdu, int_client_id, obj_handler, obj_handler.trace_pdu)
+
+        return obj_handler
+
+    def callback_data(self, func_callback_data, data, addr=None):
+
+        #=====================================================================================
+        #   Function Name  :    callback_data
+        #   Description    :    UDP socket callback_data hook, keeps the address of the
+        #                       datagram for trace_pdu, which pymodbus calls while decoding
+        #=====================================================================================
+
+        self.tuple_udp_addr     =   addr
+
+        return func_callback_data(data, addr)
+
+    def trace_pdu(self, int_client_id, obj_handler, func_trace_pdu, bool_sending, obj_pdu):
+
+        #=====================================================================================
+        #   Function Name  :    trace_pdu
+        #   Description    :    Connection trace_pdu hook, runs the server hook and records
+        #                       received requests
+        #=====================================================================================
+
+        obj_pdu     =   func_trace_pdu(bool_sending, obj_pdu)
+
+        if not bool_sending:
+
+            #TCP clients have a client ID per connection, UDP clients per address
+            if int_client_id:
+                bool_new_client     =   int_client_id not in self.dict_clients
+                tuple_client_addr   =   obj_handler.transport.get_extra_info('peername') if bool_new_client and obj_handler.transport else None
+            else:
+                tuple_client_addr   =   self.tuple_udp_addr
+                int_client_id       =   self.dict_udp_client_ids.get(tuple_client_addr, 0)
+                bool_new_client     =   not int_client_id
+                if bool_new_client:
+                    self.int_client_count                           +=  1
+                    int_client_id                                   =   self.int_client_count
+                    self.dict_udp_client_ids[tuple_client_addr]     =   int_client_id
+
+            #Client address, logged once per client
+            if bool_new_client:
+                self.dict_clients[int_client_id]    =   tuple_client_addr
+                if self.obj_logger:
+                    self.obj_logger.info("Journal : client %d is %s", int_client_id, tuple_client_addr)
+
+            self.record (
+                            int_client_id       =   int_client_id,
+                            int_unit_id         =   obj_pdu.dev_id,
+                            int_function_code   =   obj_pdu.function_code,
+                            int_address         =   obj_pdu.address,
+                            int_count           =   obj_pdu.count or len(obj_pdu.registers) or len(obj_pdu.bits)
+                        )
+
+        return obj_pdu
+
+    def record(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    record
+        #   Description    :    Appends one request to the buffer, writes the buffer when
+        #                       it is full
+        #=====================================================================================
+
+        #Extract keyword args
+        int_client_id       =   kwargs.get('int_client_id', 0)
+        int_unit_id         =   kwargs.get('int_unit_id', 0)
+        int_function_code   =   kwargs.get('int_function_code', 0)
+        int_address         =   kwargs.get('int_address', 0)
+        int_count           =   kwargs.get('int_count', 0)
+
+        self.bytearray_buffer   +=  STRUCT_JOURNAL_RECORD.pack(time.time_ns() // 1000, int_client_id, int_unit_id & 0xFF, int_function_code & 0xFF, int_address & 0xFFFF, int_count & 0xFFFF)
+        self.int_record_count   +=  1
+
+        if len(self.bytearray_buffer) >= self.int_buffer_bytes:
+            self.flush()
+
+    def flush(self):
+
+        #=====================================================================================
+        #   Function Name  :    flush
+        #   Description    :    Writes the buffered records to the journal
+        #=====================================================================================
+
+        if self.bytearray_buffer and not self.obj_file.closed:
+            self.obj_file.write(self.bytearray_buffer)
+            self.bytearray_buffer.clear()
+
+    async def run_flush(self):
+
+        #=====================================================================================
+        #   Function Name  :    run_flush
+        #   Description    :    Writes the buffered records every float_flush_interval
+        #                       seconds, so a quiet server still lands its requests
+        #=====================================================================================
+
+        while True:
+            await utils.asyncio.sleep(self.float_flush_interval)
+            self.flush()
+
+    def get_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_stats
+        #   Description    :    Returns the recorded requests and clients
+        #=====================================================================================
+
+        return {
+                    'int_journal_records'   :   self.int_record_count,
+                    'int_journal_clients'   :   self.int_client_count
+                }
+
+    def close(self):
+
+        #=====================================================================================
+        #   Function Name  :    close
+        #   Description    :    Writes the buffered records and closes the journal
+        #=====================================================================================
+
+        self.flush()
+        self.obj_file.close()
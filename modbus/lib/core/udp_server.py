@@ -0,0 +1,101 @@
+#=========================================================================================
+#   Name        :   udp_server.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a UDP server module which does the following:
+#                       1.  Defines DataSimUdpServer, a pymodbus UDP server with either
+#                           framer on the same datastore as the TCP server
+#                       2.  Defines DataSimUdpRequestHandler, which hands every request
+#                           to its own request task together with the client address it
+#                           arrived from
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from pymodbus.server import ModbusUdpServer
+from pymodbus.server.requesthandler import ServerRequestHandler
+import collections
+
+#Class definitions
+class DataSimUdpRequestHandler(ServerRequestHandler):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimUdpRequestHandler
+    #   Description    :    pymodbus handler of the UDP socket. One handler serves every
+    #                       client, and pymodbus reads the last request and address when
+    #                       the request task runs, so a datagram received in between would
+    #                       be answered in place of the previous one. Every decoded request
+    #                       is queued with its address instead, pymodbus calls handle_later
+    #                       once per decoded request and in order.
+    #=====================================================================================
+
+    def __init__(self, owner, trace_packet, trace_pdu, trace_connect):
+
+        super().__init__(owner, trace_packet, trace_pdu, trace_connect)
+
+        #Decoded requests and client addresses waiting for handle_later
+        self.deque_requests     =   collections.deque()
+
+    def callback_data(self, data, addr=None):
+
+        #=====================================================================================
+        #   Function Name  :    callback_data
+        #   Description    :    Decodes a datagram with pymodbus and queues the request
+        #=====================================================================================
+
+        int_used_len    =   super().callback_data(data, addr)
+
+        if self.last_pdu:
+            self.deque_requests.append((self.last_pdu, self.last_addr))
+
+        return int_used_len
+
+    def handle_later(self):
+
+        #=====================================================================================
+        #   Function Name  :    handle_later
+        #   Description    :    Starts the request task of the oldest queued request
+        #=====================================================================================
+
+        obj_request, tuple_addr     =   self.deque_requests.popleft()
+
+        utils.asyncio.ensure_future(self.handle_datagram(obj_request, tuple_addr))
+
+    async def handle_datagram(self, obj_request, tuple_addr):
+
+        #=====================================================================================
+        #   Function Name  :    handle_datagram
+        #   Description    :    Restores the request and client address and handles the
+        #                       request with pymodbus. The datastore answers without
+        #                       yielding, so they stay in place until the response is sent.
+        #=====================================================================================
+
+        self.last_pdu   =   obj_request
+        self.last_addr  =   tuple_addr
+
+        await self.handle_request()
+
+class DataSimUdpServer(ModbusUdpServer):
+
+    #=====================================================================================
+    #   Class Name     :    DataSimUdpServer
+    #   Description    :    pymodbus UDP server with the per datagram request handler
+    #=====================================================================================
+
+    def callback_new_connection(self):
+
+        #=====================================================================================
+        #   Function Name  :    callback_new_connection
+        #   Description    :    Returns the handler of the UDP socket
+        #=====================================================================================
+
+        if self.trace_connect:
+            self.trace_connect(True)
+
+        return DataSimUdpRequestHandler(self, self.trace_packet, self.trace_pdu, self.trace_connect)
@@ -17,9 +17,17 @@ sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
 #Import libraries
 import socket
 import logging
+import logging.handlers
+import queue
+import atexit
+import hashlib
+import json
+import re
 import pandas as pd
+import numpy as np
 import asyncio
 import argparse
+import time
 
 #Variable definition
 STR_DEFAULT_CSV_DATA_PATH               =       '/csv/'
@@ -39,8 +47,99 @@ STR_DEFAULT_SERVER_TAG_LIST_FILENAME    =       'default_tag_list'
 STR_DEFAULT_CONFIG_FILEPATH             =       os.path.join(os.sep,"ess_datasim","modbus","config","csv")
 STR_DEFAULT_PLOT_DATA_FILENAME          =       os.path.join(os.sep,"ess_datasim","modbus","doc")
 DEFAULT_SIMULATOR_DATA_DURATION         =       '5T'
+STR_DEFAULT_SAMPLE_DURATION             =       '1min'
+STR_DEFAULT_RESAMPLE_METHOD             =       'interpolate'
+LIST_RESAMPLE_METHODS                   =       ['interpolate', 'ffill', 'nearest']
+DICT_DEFAULT_RESAMPLE_METHODS           =       {'Bool': 'ffill'}
+STR_DEFAULT_PLAYBACK_MODE               =       'row'
+LIST_PLAYBACK_MODES                     =       ['row', 'timestamp']
 FLOAT_DEFAULT_PUBLISH_INTERVAL          =       1.0
 DEFAULT_HOLDING_REG_FUNCTION_CODE_HEX   =       0x03
+STR_DEFAULT_OVERRUN_POLICY              =       'skip'
+LIST_OVERRUN_POLICIES                   =       ['skip', 'catchup', 'stretch']
+INT_DEFAULT_TICK_STATS_LOG_INTERVAL     =       60
+STR_DEFAULT_LOG_MODE                    =       'queue'
+LIST_LOG_MODES                          =       ['queue', 'sync']
+INT_DEFAULT_LOG_MAX_BYTES               =       10*1024*1024
+INT_DEFAULT_LOG_BACKUP_COUNT            =       5
+INT_DEFAULT_LOG_TRACE_EVERY             =       0
+STR_DEFAULT_UNIT_ID                     =       '1'
+INT_DEFAULT_DEVICE_COUNT                =       1
+INT_DEFAULT_PHASE_STEP                  =       1
+FLOAT_DEFAULT_FLEET_REPORT_INTERVAL     =       5.0
+FLOAT_DEFAULT_FLEET_ROLLUP_INTERVAL     =       10.0
+FLOAT_DEFAULT_FLEET_SUPERVISE_INTERVAL  =       0.5
+FLOAT_DEFAULT_FLEET_RESTART_DELAY       =       1.0
+FLOAT_DEFAULT_FLEET_MAX_RESTART_DELAY   =       30.0
+FLOAT_DEFAULT_FLEET_STABLE_UPTIME       =       60.0
+STR_DEFAULT_FLEET_BIND_MODE             =       'port'
+LIST_FLEET_BIND_MODES                   =       ['port', 'ip']
+STR_DEFAULT_FLEET_IP_ADDRESS            =       '127.0.0.1'
+INT_DEFAULT_FLEET_BASE_PORT             =       5020
+STR_DEFAULT_FLEET_CONFIG_FILENAME       =       'fleet_config'
+STR_DEFAULT_CACHE_FILEPATH              =       os.path.join(os.sep,"ess_datasim","modbus","config","cache")
+INT_FRAME_ENCODING_VERSION              =       3
+INT_DEFAULT_STREAM_BUFFER_ROWS          =       1024
+INT_DEFAULT_STREAM_CHUNK_ROWS           =       256
+INT_DEFAULT_SIGNAL_SEED                 =       0
+LIST_SIGNAL_WAVEFORMS                   =       ['constant', 'sine', 'ramp', 'sawtooth', 'step', 'random_walk']
+#Register data types: (big endian numpy type, registers, minimum, maximum)
+DICT_REGISTER_DATA_TYPES                =       {
+                                                    'Bool'      :   ('>u2', 1, 0, 1),
+                                                    'Short'     :   ('>i2', 1, -2**15, 2**15-1),
+                                                    'Word'      :   ('>u2', 1, 0, 2**16-1),
+                                                    'DWord'     :   ('>u4', 2, 0, 2**32-1),
+                                                    'Int32'     :   ('>i4', 2, -2**31, 2**31-1),
+                                                    'UInt32'    :   ('>u4', 2, 0, 2**32-1),
+                                                    'Float32'   :   ('>f4', 2, -float(np.finfo(np.float32).max), float(np.finfo(np.float32).max)),
+                                                    'Int64'     :   ('>i8', 4, -2**63, 2**63-1)
+                                                }
+STR_DEFAULT_DATA_TYPE                   =       'Word'
+STR_DEFAULT_WORD_ORDER                  =       'big'
+STR_DEFAULT_BYTE_ORDER                  =       'big'
+LIST_REGISTER_ORDERS                    =       ['big', 'little']
+STR_DEFAULT_LOAD_TARGETS                =       '127.0.0.1:502'
+STR_DEFAULT_LOAD_RANGES                 =       '0:12'
+STR_DEFAULT_LOAD_UNIT_IDS               =       '1'
+INT_DEFAULT_LOAD_CONNECTIONS            =       10
+FLOAT_DEFAULT_LOAD_RATE                 =       10.0
+FLOAT_DEFAULT_LOAD_DURATION             =       30.0
+FLOAT_DEFAULT_LOAD_TIMEOUT              =       1.0
+INT_DEFAULT_LOAD_PROCESSES              =       1
+LIST_LOAD_FUNCTION_CODES                =       [3, 4]
+INT_MODBUS_MAX_READ_REGISTERS           =       125
+INT_MODBUS_TCP_HEADER_BYTES             =       7
+INT_TCP_PACKET_OVERHEAD_BYTES           =       66
+FLOAT_DEFAULT_METRICS_LOOP_LAG_INTERVAL =       0.5
+FLOAT_DEFAULT_METRICS_SCRAPE_TIMEOUT    =       5.0
+STR_DEFAULT_PROFILE_MODE                =       'cprofile'
+LIST_PROFILE_MODES                      =       ['cprofile', 'sample']
+FLOAT_DEFAULT_PROFILE_SECONDS           =       60.0
+FLOAT_DEFAULT_PROFILE_SAMPLE_INTERVAL   =       0.005
+FLOAT_DEFAULT_WATCH_INTERVAL            =       1.0
+INT_DEFAULT_JOURNAL_BUFFER_BYTES        =       256*1024
+FLOAT_DEFAULT_JOURNAL_FLUSH_INTERVAL    =       1.0
+FLOAT_DEFAULT_REPLAY_SPEED              =       1.0
+FLOAT_DEFAULT_REPLAY_TIMEOUT            =       1.0
+INT_MODBUS_MAX_UNIT_ID                  =       247
+INT_DEFAULT_MODBUS_PORT                 =       502
+STR_DEFAULT_PLAN_CONFIG_FILENAME        =       'capacity_plan_config'
+STR_DEFAULT_CALIBRATION_FILENAME        =       'capacity_calibration'
+STR_DEFAULT_PLAN_SERVER_PREFIX          =       'serv'
+STR_DEFAULT_PLAN_BIND_MODE              =       'ip'
+FLOAT_DEFAULT_PLAN_HEADROOM             =       0.7
+FLOAT_DEFAULT_CONTAINER_CPUS            =       1.0
+STR_DEFAULT_CONTAINER_MEMORY            =       '512M'
+INT_DEFAULT_CALIBRATION_DEVICES         =       200
+FLOAT_DEFAULT_CALIBRATION_POLL_RATE     =       1.0
+FLOAT_DEFAULT_CALIBRATION_DURATION      =       10.0
+INT_DEFAULT_CALIBRATION_PORT            =       5596
+INT_DEFAULT_RESPONSE_CACHE_ENTRIES      =       65536
+STR_DEFAULT_MODBUS_TRANSPORT            =       'tcp'
+LIST_MODBUS_TRANSPORTS                  =       ['tcp', 'udp']
+STR_DEFAULT_MODBUS_FRAMER               =       'socket'
+LIST_MODBUS_FRAMERS                     =       ['socket', 'rtu']
+INT_UDP_PACKET_OVERHEAD_BYTES           =       42
 
 #Class definitions
 class DataSimUtils:
@@ -121,18 +220,35 @@ class DataSimUtils:
         #   Description    :    This function does the following:
         #                           1.  Sets up the logger object
         #                           2.  Sets the logger level as info
-        #                           3.  Returns the logger object
+        #                           3.  Writes to a rotating log file, the previous run is
+        #                               rolled over to <name>.txt.1 at startup
+        #                           4.  In 'queue' mode the file I/O runs on a background
+        #                               QueueListener thread so the event loop never blocks
+        #                           5.  Returns the logger object
         #=====================================================================================
 
         #Extract keyword args
         str_log_filename      =   kwargs.get('str_log_filename', None)
-        
-        # Create and configure logger
-        logging.basicConfig(    
-                                filename    =   "/ess_datasim/modbus/log/"+str_log_filename+STR_DEFAULT_LOG_FILE_EXT,
-                                format      =   '%(message)s',
-                                filemode    =   'w'
-                            )
+        str_log_mode          =   kwargs.get('str_log_mode', STR_DEFAULT_LOG_MODE)
+        int_max_bytes         =   kwargs.get('int_max_bytes', INT_DEFAULT_LOG_MAX_BYTES)
+        int_backup_count      =   kwargs.get('int_backup_count', INT_DEFAULT_LOG_BACKUP_COUNT)
+
+        #Validate the log mode
+        if str_log_mode not in LIST_LOG_MODES:
+            raise ValueError(f"Unknown log mode: {str_log_mode}")
+
+        #Create the rotating file handler
+        str_log_filepath    =   "/ess_datasim/modbus/log/"+str_log_filename+STR_DEFAULT_LOG_FILE_EXT
+        obj_file_handler    =   logging.handlers.RotatingFileHandler(
+                                                                        str_log_filepath,
+                                                                        maxBytes    =   int_max_bytes,
+                                                                        backupCount =   int_backup_count
+                                                                    )
+        obj_file_handler.setFormatter(logging.Formatter('%(message)s'))
+
+        #Start every run with a fresh file
+        if os.path.exists(str_log_filepath) and os.path.getsize(str_log_filepath) > 0:
+            obj_file_handler.doRollover()
 
         # Creating an object
         obj_logger  =    logging.getLogger()
@@ -140,8 +256,128 @@ class DataSimUtils:
         # Setting the threshold of logger to INFO
         obj_logger.setLevel(logging.INFO)
 
+        #Attach the file handler directly or through a background queue listener
+        if str_log_mode == 'queue':
+
+            obj_log_queue       =   queue.SimpleQueue()
+            obj_log_listener    =   logging.handlers.QueueListener(obj_log_queue, obj_file_handler, respect_handler_level=True)
+            obj_logger.addHandler(logging.handlers.QueueHandler(obj_log_queue))
+            obj_log_listener.start()
+
+            #Flush the queue on exit
+            atexit.register(obj_log_listener.stop)
+
+        else:
+            obj_logger.addHandler(obj_file_handler)
+
         return obj_logger
 
+    def get_unit_ids(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    get_unit_ids
+        #   Description    :    Returns int_device_count consecutive unit IDs starting at
+        #                       the server unit ID, Modbus unit IDs are one byte
+        #=====================================================================================
+
+        #Extract keyword args
+        str_server_unit_id  =   kwargs.get('str_server_unit_id', STR_DEFAULT_UNIT_ID)
+        int_device_count    =   kwargs.get('int_device_count', INT_DEFAULT_DEVICE_COUNT)
+
+        list_unit_ids       =   list(range(int(str_server_unit_id), int(str_server_unit_id) + int_device_count))
+
+        #Validate the unit ID range
+        if int_device_count < 1 or list_unit_ids[0] < 0 or list_unit_ids[-1] > 255:
+            raise ValueError(f"Unit IDs must be within 0-255, got {int_device_count} devices from unit ID {str_server_unit_id}")
+
+        return list_unit_ids
+
+    def get_rss_bytes(self):
+
+        #=====================================================================================
+        #   Function Name  :    get_rss_bytes
+        #   Description    :    Returns the resident set size of this process in bytes,
+        #                       0 where /proc is not available
+        #=====================================================================================
+
+        try:
+            with open('/proc/self/statm') as obj_statm:
+                return int(obj_statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def get_frame_source_digest(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    get_frame_source_digest
+        #   Description    :    Returns the sha1 of everything the encoded frames depend on:
+        #                           1.  The frame encoding version
+        #                           2.  The encoding options (e.g. the sample duration)
+        #                           3.  The asset tag list and tag data CSVs
+        #=====================================================================================
+
+        #Extract keyword args
+        str_asset_type          =   kwargs.get('str_asset_type', None)
+        str_filepath            =   kwargs.get('str_filepath', None)
+        dict_encoding_options   =   kwargs.get('dict_encoding_options', {})
+
+        obj_hash    =   hashlib.sha1()
+        obj_hash.update(json.dumps({'int_version': INT_FRAME_ENCODING_VERSION, **dict_encoding_options}, sort_keys=True, default=str).encode())
+
+        for str_filename in [str_asset_type+"_tag_list.csv", str_asset_type+"_tag_data_auto_gen.csv"]:
+            with open(os.path.join(str_filepath, str_filename), 'rb') as obj_file:
+                for bytes_chunk in iter(lambda: obj_file.read(1 << 20), b''):
+                    obj_hash.update(bytes_chunk)
+
+        return obj_hash.hexdigest()
+
+    def parse_address_range(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    parse_address_range
+        #   Description    :    Parses an inclusive register address range 'start:end'
+        #                       (or a single address) into a (start, end) tuple
+        #=====================================================================================
+
+        #Extract keyword args
+        str_address_range   =   kwargs.get('str_address_range', None)
+
+        #No range given
+        if not str_address_range:
+            return None
+
+        list_bounds         =   str_address_range.split(':')
+        int_start_address   =   int(list_bounds[0])
+        int_end_address     =   int(list_bounds[-1])
+
+        if int_end_address < int_start_address:
+            raise ValueError(f"Invalid address range: {str_address_range}")
+
+        return (int_start_address, int_end_address)
+
+    def parse_unit_ids(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :    parse_unit_ids
+        #   Description    :    Parses unit IDs and ranges separated by commas, e.g.
+        #                       '1,2,5-8', into a list of one byte unit IDs
+        #=====================================================================================
+
+        #Extract keyword args
+        str_unit_ids        =   kwargs.get('str_unit_ids', None)
+
+        list_unit_ids       =   []
+
+        for str_unit_id_range in str(str_unit_ids).split(','):
+            str_first, _, str_last  =   str_unit_id_range.strip().partition('-')
+            list_unit_ids.extend(range(int(str_first), int(str_last or str_first) + 1))
+
+        #Validate the unit IDs
+        if not list_unit_ids or min(list_unit_ids) < 0 or max(list_unit_ids) > 255:
+            raise ValueError(f"Unit IDs must be within 0-255, got {str_unit_ids}")
+
+        return list_unit_ids
+
     def get_lib_path(self, **kwargs):
 
         #=====================================================================================
@@ -235,20 +471,16 @@ class DataSimUtils:
     def convert_to_twos_complement(self,**kwargs):
 
         #=====================================================================================
-        #   Function Name  :    
-        #   Description    :    
-        #                           
-        #                  
+        #   Function Name  :    convert_to_twos_complement
+        #   Description    :    Converts a value or an array of values to 16 bit two's
+        #                       complement register words (uint16) in one vectorized pass
         #=====================================================================================
 
         #Extract keyword args
         int_value                =   kwargs.get('int_value', None)
 
-        if int_value < 0:
-
-            return int(int_value + (1 << 16))
-        
-        return int_value
+        #Truncate towards zero and keep the lower 16 bits
+        return (np.asarray(int_value).astype(np.int64) & 0xFFFF).astype(np.uint16)
     
     def get_server_tag_list(self, **kwargs):
 
@@ -291,14 +523,122 @@ class DataSimUtils:
 
         return dict_server_tags
     
+    def get_server_tag_data_types(self, **kwargs):
+
+        #=======================================================================================
+        #   Function Name  :    get_server_tag_data_types
+        #   Description    :    Reads the server tag list CSV and returns the data type of each
+        #                       tag, keyed by the tag name without spaces
+        #=======================================================================================
+
+        #Extract keyword args
+        str_asset_type      =       kwargs.get('str_asset_type',None)
+        str_filepath        =       kwargs.get('str_filepath', None)
+
+        #Read the CSV file into a DataFrame
+        df                  =      pd.read_csv(os.path.join(os.sep,str_filepath,str_asset_type+"_tag_list.csv"))
+
+        return dict(zip(df['name'].str.replace(' ', ''), df['data type']))
+
+    def get_tag_encodings(self, **kwargs):
+
+        #=======================================================================================
+        #   Function Name  :    get_tag_encodings
+        #   Description    :    Returns the (data type, word order, byte order) of each tag of
+        #                       a tag list dataframe, keyed by the tag name without spaces.
+        #                       The 'word order' and 'byte order' columns are optional.
+        #=======================================================================================
+
+        #Extract keyword args
+        df_tag_list         =       kwargs.get('df_tag_list', None)
+
+        list_word_orders    =       df_tag_list['word order'].fillna(STR_DEFAULT_WORD_ORDER) if 'word order' in df_tag_list.columns else [STR_DEFAULT_WORD_ORDER] * len(df_tag_list)
+        list_byte_orders    =       df_tag_list['byte order'].fillna(STR_DEFAULT_BYTE_ORDER) if 'byte order' in df_tag_list.columns else [STR_DEFAULT_BYTE_ORDER] * len(df_tag_list)
+
+        return  {
+                    str_name.replace(' ', ''): (str_data_type, str(str_word_order).strip().lower(), str(str_byte_order).strip().lower())
+                    for str_name, str_data_type, str_word_order, str_byte_order in zip(df_tag_list['name'], df_tag_list['data type'], list_word_orders, list_byte_orders)
+                }
+
+    def get_server_tag_encodings(self, **kwargs):
+
+        #=======================================================================================
+        #   Function Name  :    get_server_tag_encodings
+        #   Description    :    Reads the server tag list CSV and returns the register encoding
+        #                       of each tag, see get_tag_encodings
+        #=======================================================================================
+
+        #Extract keyword args
+        str_asset_type      =       kwargs.get('str_asset_type',None)
+        str_filepath        =       kwargs.get('str_filepath', None)
+
+        return self.get_tag_encodings(df_tag_list=pd.read_csv(os.path.join(os.sep,str_filepath,str_asset_type+"_tag_list.csv")))
+
+    def get_resample_methods(self, **kwargs):
+
+        #=======================================================================================
+        #   Function Name  :    get_resample_methods
+        #   Description    :    Returns the resample method of each tag from its data type:
+        #                           1.  Defaults are DICT_DEFAULT_RESAMPLE_METHODS, otherwise
+        #                               STR_DEFAULT_RESAMPLE_METHOD
+        #                           2.  str_resample_method overrides them, either one method
+        #                               for all tags ('ffill') or per data type
+        #                               ('Word=ffill,Short=interpolate')
+        #=======================================================================================
+
+        #Extract keyword args
+        dict_tag_data_types     =   kwargs.get('dict_tag_data_types', {})
+        str_resample_method     =   kwargs.get('str_resample_method', None)
+
+        str_default_method      =   STR_DEFAULT_RESAMPLE_METHOD
+        dict_type_methods       =   dict(DICT_DEFAULT_RESAMPLE_METHODS)
+
+        #Parse the overrides
+        for str_item in filter(None, (str_resample_method or '').replace(' ', '').split(',')):
+
+            if '=' in str_item:
+                str_data_type, str_method   =   str_item.split('=', 1)
+                dict_type_methods[str_data_type]    =   str_method
+            else:
+                str_method          =   str_item
+                str_default_method  =   str_method
+                dict_type_methods   =   {}
+
+            if str_method not in LIST_RESAMPLE_METHODS:
+                raise ValueError(f"Unknown resample method: {str_method}")
+
+        return {str_tag: dict_type_methods.get(str_data_type, str_default_method) for str_tag, str_data_type in dict_tag_data_types.items()}
+
+    def get_period_ns(self, **kwargs):
+
+        #=======================================================================================
+        #   Function Name  :    get_period_ns
+        #   Description    :    Converts a period string ('1s', '1min', or the legacy '1T')
+        #                       to nanoseconds
+        #=======================================================================================
+
+        #Extract keyword args
+        str_period      =   kwargs.get('str_period', None)
+
+        #Legacy pandas aliases removed in pandas 3
+        str_period      =   re.sub(r'(?<=[\d.])\s*(T|S|H|L)$', lambda obj_match: {'T': 'min', 'S': 's', 'H': 'h', 'L': 'ms'}[obj_match.group(1)], str(str_period).strip())
+        int_period_ns   =   pd.Timedelta(str_period).value
+
+        if int_period_ns <= 0:
+            raise ValueError(f"Period must be positive: {str_period}")
+
+        return int_period_ns
+
     def get_server_tag_data(self, **kwargs):
 
         #=====================================================================================
-        #   Function Name  :    get_server_data
+        #   Function Name  :    get_server_tag_data
         #   Description    :    This function does the following:
         #                           1.  Read server data csv
-        #                           2.  Remove 'Time' from the dataframe
-        #                           3.  Return a new dict with tag name and its data as a list
+        #                           2.  Set 'Timestamp' as the dataframe index, sorted with
+        #                               duplicate timestamps dropped
+        #                           3.  Return the dataframe, the frame engine resamples and
+        #                               encodes it
         #=====================================================================================
 
         #Extract keyword args
@@ -307,9 +647,6 @@ class DataSimUtils:
         str_data_sample_duration        =   kwargs.get('str_data_sample_duration', None)
         obj_logger                      =   kwargs.get('obj_logger', None)
 
-        #Initialize the dictionary
-        dict_server_data    =    {}
-
         #Create full path to CSV file
         csv_data_file_path  =   os.path.join(os.sep,str_filepath,str_asset_type+"_tag_data_auto_gen.csv")
 
@@ -319,92 +656,48 @@ class DataSimUtils:
         #Resample dataframe according to the input
         print(f"Resample Duration   :   {str_data_sample_duration}")
         
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-       
-        df.set_index('Timestamp',inplace=True)
+        df[STR_DEFAULT_TIME_COLUMN_IDENTIFIER] = pd.to_datetime(df[STR_DEFAULT_TIME_COLUMN_IDENTIFIER])
        
-        df  =   df.map(lambda x: self.convert_to_twos_complement(int_value=x) if x < 0 else x)
-        
-        #Convert DataFrame to dictionary
-        dict_server_data     =  df.to_dict(orient='list')
-
-        #Remove 'Time' key if it exists
-        if STR_DEFAULT_TIME_COLUMN_IDENTIFIER in dict_server_data:
-            del dict_server_data[STR_DEFAULT_TIME_COLUMN_IDENTIFIER]
+        df.set_index(STR_DEFAULT_TIME_COLUMN_IDENTIFIER,inplace=True)
+        df  =   df[~df.index.duplicated(keep='last')].sort_index()
 
        #Log the server data generated
         obj_logger.info(f"\n{'='*18}")
         obj_logger.info(f"  Data Generation \n{'='*18}")
         obj_logger.info("Server Data Generated")
         
-        return dict_server_data
-
-    def get_server_data_per_timestep(self,**kwargs):
-
-        #=============================================================================================
-        #   Function Name  :    get_server_data_per_timestep
-        #   Description    :    This function does the following:
-        #                           1.  Merges server_data dict and server_tag_list dict
-        #                           2.  It takes the tag name(key) and its data as a list(value)
-        #                           3.  Returns a dict like this : {'tag_name': [0,2,03,04,50]}
-        #=============================================================================================
-
-        #Extract keyword args
-        dict_server_data        =   kwargs.get('dict_server_data', None)
-        dict_server_tag_list    =   kwargs.get('dict_server_tag_list', None)
-        obj_logger              =   kwargs.get('obj_logger', None)
-        
-        #Initialize variables
-        dict_server_data_per_timestep = {}
-
-        #Loop through all data tags
-        for key in dict_server_data.keys():
-
-            #Assign the Tag name as key and tag data(list) as value            
-            dict_server_data_per_timestep[dict_server_tag_list[key]] = dict_server_data[key]
-            
-        # Node Data Added
-        obj_logger.info(f"Node Data Added     :  {bool(dict_server_data_per_timestep)}")     
-        
-        return dict_server_data_per_timestep
+        return df
 
     async def cyclic_value_generator(self,**kwargs):
 
         #=====================================================================================
         #   Function Name  :    cyclic_value_generator
         #   Description    :    This is an async function does the following:
-        #                           1.  Generates cyclic values from a dictionary
-        #                           2.  Outpus a generator that cycles through values 
+        #                           1.  Waits for the next deadline from the tick scheduler
+        #                           2.  Takes the next frame of every device from the frame
+        #                               engine, stepping over frames dropped by the skip
+        #                               overrun policy
+        #                           3.  Outputs a generator that yields the sorted address
+        #                               vector and the (devices x registers) frames
         #                               everytime we call this function
         #=====================================================================================
 
         #Extract keyword args
-        dict_server_data        =   kwargs.get('dict_server_data', None)
-        float_publish_interval  =   kwargs.get('float_publish_interval', None)
-        
-        #Initialize variables
-        index                   =   0
-        dict_server_data_cyclic =   {}
+        obj_frame_engine        =   kwargs.get('obj_frame_engine', None)
+        obj_tick_scheduler      =   kwargs.get('obj_tick_scheduler', None)
+        obj_profiler            =   kwargs.get('obj_profiler', None)
 
         while True:
-            
-            for key, value_list in dict_server_data.items():
-                
-                #Compute the index using modulo operation
-               
-                computed_index                  =   index % len(value_list)
-              
-                #Retrieve the value from value_list using the computed index
-                retrieved_value                 =   value_list[computed_index]
-         
-                #Wrap the retrieved value in a list
-                wrapped_value                   =   [int(retrieved_value)]
-               
-                #Assign this list to the result dictionary with the key
-                dict_server_data_cyclic[key]    =   wrapped_value
-            
-            yield dict_server_data_cyclic
-            
-            #Increment index
-            index += 1
-            await asyncio.sleep(float_publish_interval)
\ No newline at end of file
+
+            #Sleep until the next absolute deadline
+            int_frames  =   await obj_tick_scheduler.wait_next_tick()
+
+            #One batched row select per tick for all devices, timed when the spans are on
+            if obj_profiler and obj_profiler.bool_spans:
+                float_start         =   time.perf_counter()
+                arr_device_frames   =   obj_frame_engine.next_frames(int_skipped_frames=int_frames - 1)
+                obj_profiler.add_span('tick_compute', float_start)
+            else:
+                arr_device_frames   =   obj_frame_engine.next_frames(int_skipped_frames=int_frames - 1)
+
+            yield obj_frame_engine.arr_addresses, arr_device_frames
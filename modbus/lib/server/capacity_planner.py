@@ -0,0 +1,404 @@
+#=========================================================================================
+#   Name        :   capacity_planner.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a capacity planner module which has classes for planning
+#                   simulator deployments. The class DataSimCapacityPlanner does the
+#                   following:
+#                       1.  Calibrates the per tag CPU and memory cost of each asset by
+#                           running a local simulator with many devices under a polling
+#                           load and writes the costs to a calibration CSV
+#                       2.  Works out the devices of each asset from a plan config (target
+#                           tag count, poll rate, publish interval) and how many devices
+#                           fit in one container and how many containers fit in one host
+#                       3.  Returns one row per container service in the columns of the
+#                           docker compose config, with non-conflicting IPs or host ports,
+#                           built in bulk with numpy/pandas
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import Libraries
+from core import utils
+from client import load_generator
+import numpy as np
+import pandas as pd
+import ipaddress
+import subprocess
+import psutil
+import socket
+import time
+
+#Variable definition
+STR_SIMULATOR_FILEPATH      =   os.path.join(os.sep,"ess_datasim","modbus","simulator","start.py")
+FLOAT_STARTUP_TIMEOUT       =   120.0
+FLOAT_SETTLE_SECONDS        =   2.0
+INT_BASE_DEVICES            =   2
+INT_MEMORY_SAMPLES          =   3
+DICT_MEMORY_UNITS           =   {'b': 1, 'k': 2**10, 'm': 2**20, 'g': 2**30}
+LIST_CALIBRATION_COLUMNS    =   ['asset', 'tags_per_device', 'calibration_devices', 'base_memory_bytes', 'memory_per_tag_bytes', 'cpu_per_tag_tick_s', 'cpu_per_request_s']
+LIST_SERVICE_COLUMNS        =   ['server_name', 'service_name', 'dockerfile', 'container_name', 'ipv4_address', 'ports', 'restart', 'limits_cpus', 'limits_memory', 'reservations_cpus', 'reservations_memory', 'mem_limit', 'memswap_limit', 'command']
+
+#Class definitions
+class DataSimCapacityPlanner:
+
+    #=============================================================================================
+    #   Class Name     :    DataSimCapacityPlanner
+    #   Description    :    Plans containers and hosts for a simulator deployment:
+    #                           1.  Plan config CSV, one row per asset: asset, target_tags,
+    #                               poll_rate (reads of the full tag map per device per
+    #                               second) and pub_int
+    #                           2.  Calibration CSV, one row per asset, see calibrate
+    #                       One simulator process runs one event loop, so a container is
+    #                       planned on at most one core whatever its CPU limit. Devices of a
+    #                       container are unit IDs 1 to INT_MODBUS_MAX_UNIT_ID on one port.
+    #=============================================================================================
+
+    def __init__(self,**kwargs):
+
+        #Extract keyword args
+        self.str_plan_config_filepath   =   kwargs.get('str_plan_config_filepath', None)
+        self.str_calibration_filepath   =   kwargs.get('str_calibration_filepath', None)
+        self.float_host_cpus            =   kwargs.get('float_host_cpus', None) or os.cpu_count()
+        self.str_host_memory            =   kwargs.get('str_host_memory', None)
+        self.float_container_cpus       =   kwargs.get('float_container_cpus', utils.FLOAT_DEFAULT_CONTAINER_CPUS)
+        self.str_container_memory       =   kwargs.get('str_container_memory', utils.STR_DEFAULT_CONTAINER_MEMORY)
+        self.float_headroom             =   kwargs.get('float_headroom', utils.FLOAT_DEFAULT_PLAN_HEADROOM)
+        self.str_bind_mode              =   kwargs.get('str_bind_mode', utils.STR_DEFAULT_PLAN_BIND_MODE)
+        self.str_subnet                 =   kwargs.get('str_subnet', None)
+        self.str_gateway                =   kwargs.get('str_gateway', None)
+        self.int_base_port              =   kwargs.get('int_base_port', utils.INT_DEFAULT_FLEET_BASE_PORT)
+        self.str_server_prefix          =   kwargs.get('str_server_prefix', utils.STR_DEFAULT_PLAN_SERVER_PREFIX)
+
+        #Host and container sizes in bytes
+        self.int_host_memory            =   self.parse_memory(self.str_host_memory) if self.str_host_memory else psutil.virtual_memory().total
+        self.int_container_memory       =   self.parse_memory(self.str_container_memory)
+
+    @staticmethod
+    def parse_memory(str_memory):
+
+        #=====================================================================================
+        #   Function Name  :  parse_memory
+        #   Description    :  Returns the bytes of a docker memory size, e.g. 512M or 2g
+        #=====================================================================================
+
+        str_memory  =   str(str_memory).strip().lower().rstrip('b') or '0'
+
+        if str_memory[-1] in DICT_MEMORY_UNITS:
+            return int(float(str_memory[:-1]) * DICT_MEMORY_UNITS[str_memory[-1]])
+
+        return int(float(str_memory))
+
+    @staticmethod
+    def get_tag_profile(str_asset_type):
+
+        #=====================================================================================
+        #   Function Name  :  get_tag_profile
+        #   Description    :  Returns the tags per device of an asset and the reads of at
+        #                     most 125 registers that poll its full register span
+        #=====================================================================================
+
+        df_tag_list     =   pd.read_csv(os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, str_asset_type+"_tag_list.csv"))
+        arr_words       =   df_tag_list['data type'].map({str_data_type: tuple_data_type[1] for str_data_type, tuple_data_type in utils.DICT_REGISTER_DATA_TYPES.items()}).fillna(1)
+        int_span        =   int((df_tag_list['address'] + arr_words).max())
+
+        return len(df_tag_list), int_span, -(-int_span // utils.INT_MODBUS_MAX_READ_REGISTERS)
+
+    def start_simulator(self, str_asset_type, int_device_count, int_port):
+
+        #=====================================================================================
+        #   Function Name  :  start_simulator
+        #   Description    :  Starts a simulator process and returns it once its port
+        #                     accepts connections and it had time to settle
+        #=====================================================================================
+
+        obj_process     =   subprocess.Popen    (
+                                                    [sys.executable, STR_SIMULATOR_FILEPATH, '--asset', str_asset_type, '--devices', str(int_device_count), '--port', str(int_port)],
+                                                    stdout  =   subprocess.DEVNULL
+                                                )
+        float_deadline  =   time.monotonic() + FLOAT_STARTUP_TIMEOUT
+
+        while time.monotonic() < float_deadline:
+            try:
+                socket.create_connection(('127.0.0.1', int_port), timeout=1).close()
+                time.sleep(FLOAT_SETTLE_SECONDS)
+                return obj_process
+            except OSError:
+                time.sleep(0.5)
+
+        obj_process.kill()
+        raise RuntimeError(f"Simulator did not start on port {int_port}")
+
+    def stop_simulator(self, obj_process):
+
+        #=====================================================================================
+        #   Function Name  :  stop_simulator
+        #   Description    :  Stops a simulator process
+        #=====================================================================================
+
+        obj_process.terminate()
+        obj_process.wait()
+
+    def get_memory(self, str_asset_type, int_device_count, int_port):
+
+        #=====================================================================================
+        #   Function Name  :  get_memory
+        #   Description    :  Returns the median RSS of INT_MEMORY_SAMPLES simulator
+        #                     processes with int_device_count devices
+        #=====================================================================================
+
+        list_memory     =   []
+
+        for _ in range(INT_MEMORY_SAMPLES):
+            obj_process     =   self.start_simulator(str_asset_type, int_device_count, int_port)
+            try:
+                list_memory.append(psutil.Process(obj_process.pid).memory_info().rss)
+            finally:
+                self.stop_simulator(obj_process)
+
+        return int(np.median(list_memory))
+
+    @staticmethod
+    def get_cpu_seconds(obj_process):
+
+        #=====================================================================================
+        #   Function Name  :  get_cpu_seconds
+        #   Description    :  Returns the user plus system CPU seconds of a process
+        #=====================================================================================
+
+        obj_cpu_times   =   psutil.Process(obj_process.pid).cpu_times()
+
+        return obj_cpu_times.user + obj_cpu_times.system
+
+    def calibrate(self,**kwargs):
+
+        #=====================================================================================
+        #   Function Name  :  calibrate
+        #   Description    :  Measures the costs of each asset and writes the calibration
+        #                     CSV:
+        #                       1.  base_memory_bytes     : RSS of a simulator without
+        #                                                   devices, extrapolated from the
+        #                                                   INT_BASE_DEVICES device simulator
+        #                       2.  memory_per_tag_bytes  : RSS growth per tag from
+        #                                                   INT_BASE_DEVICES to
+        #                                                   int_device_count devices. Both
+        #                                                   are multi device simulators, so
+        #                                                   their stores have the same
+        #                                                   layout, and the RSS is the median
+        #                                                   of INT_MEMORY_SAMPLES runs
+        #                       3.  cpu_per_tag_tick_s    : CPU seconds per tag per tick
+        #                                                   without clients
+        #                       4.  cpu_per_request_s     : CPU seconds per read of at most
+        #                                                   125 registers under load
+        #=====================================================================================
+
+        #Extract keyword args
+        list_asset_types    =   kwargs.get('list_asset_types', None)
+        int_device_count    =   min(kwargs.get('int_device_count', utils.INT_DEFAULT_CALIBRATION_DEVICES), utils.INT_MODBUS_MAX_UNIT_ID)
+        float_poll_rate     =   kwargs.get('float_poll_rate', utils.FLOAT_DEFAULT_CALIBRATION_POLL_RATE)
+        float_duration      =   kwargs.get('float_duration', utils.FLOAT_DEFAULT_CALIBRATION_DURATION)
+        int_port            =   kwargs.get('int_port', utils.INT_DEFAULT_CALIBRATION_PORT)
+
+        if int_device_count <= INT_BASE_DEVICES:
+            raise ValueError(f"Calibration needs more than {INT_BASE_DEVICES} devices, got {int_device_count}")
+
+        list_rows           =   []
+
+        for str_asset_type in list_asset_types:
+
+            int_tags, int_span, int_reads   =   self.get_tag_profile(str_asset_type)
+
+            #Memory growth from the base devices to many devices
+            int_base_memory     =   self.get_memory(str_asset_type, INT_BASE_DEVICES, int_port)
+            int_memory          =   self.get_memory(str_asset_type, int_device_count, int_port)
+            float_tag_memory    =   (int_memory - int_base_memory) / ((int_device_count - INT_BASE_DEVICES) * int_tags)
+
+            if float_tag_memory <= 0:
+                raise RuntimeError(f"Calibration of {str_asset_type} failed, RSS did not grow from {INT_BASE_DEVICES} to {int_device_count} devices ({int_base_memory} to {int_memory} bytes), retry with more --calibration_devices")
+
+            #Tick CPU of many devices without clients
+            obj_process         =   self.start_simulator(str_asset_type, int_device_count, int_port)
+
+            try:
+                float_cpu_start     =   self.get_cpu_seconds(obj_process)
+                time.sleep(float_duration)
+                float_idle_cpus     =   (self.get_cpu_seconds(obj_process) - float_cpu_start) / float_duration
+
+                #CPU under a poll of every device at float_poll_rate
+                int_connections     =   min(int_device_count, utils.INT_DEFAULT_LOAD_CONNECTIONS)
+                float_cpu_start     =   self.get_cpu_seconds(obj_process)
+                dict_summary        =   load_generator.DataSimLoadGenerator (
+                                                                                str_targets             =   f"127.0.0.1:{int_port}",
+                                                                                str_ranges              =   f"0:{int_span - 1}",
+                                                                                str_unit_ids            =   f"1-{int_device_count}",
+                                                                                int_connection_count    =   int_connections,
+                                                                                float_rate              =   int_device_count * int_reads * float_poll_rate / int_connections,
+                                                                                float_duration          =   float_duration
+                                                                            ).run()
+                float_load_cpus     =   (self.get_cpu_seconds(obj_process) - float_cpu_start) / dict_summary['float_seconds']
+            finally:
+                self.stop_simulator(obj_process)
+
+            list_rows.append({
+                                'asset'                 :   str_asset_type,
+                                'tags_per_device'       :   int_tags,
+                                'calibration_devices'   :   int_device_count,
+                                'base_memory_bytes'     :   int(int_base_memory - INT_BASE_DEVICES * int_tags * float_tag_memory),
+                                'memory_per_tag_bytes'  :   float_tag_memory,
+                                'cpu_per_tag_tick_s'    :   float_idle_cpus / (int_device_count * int_tags / utils.FLOAT_DEFAULT_PUBLISH_INTERVAL),
+                                'cpu_per_request_s'     :   max(float_load_cpus - float_idle_cpus, 0.0) / max(dict_summary['float_requests_per_s'], 1e-9)
+                            })
+
+            #Print message
+            print(f"Calibrated        : {str_asset_type}, {int_device_count} devices x {int_tags} tags, idle {float_idle_cpus:.3f} cores, "
+                  f"{dict_summary['float_requests_per_s']:.0f} req/s at {float_load_cpus:.3f} cores, RSS {int_base_memory/2**20:.0f} MiB to {int_memory/2**20:.0f} MiB, {float_tag_memory:.1f} bytes per tag")
+
+        df_calibration      =   pd.DataFrame(list_rows, columns=LIST_CALIBRATION_COLUMNS)
+        df_calibration.to_csv(self.str_calibration_filepath, index=False)
+
+        return df_calibration
+
+    def get_plan(self):
+
+        #=====================================================================================
+        #   Function Name  :  get_plan
+        #   Description    :  Returns one row per asset of the plan config with its devices,
+        #                     the estimated CPU and memory per device, the devices per
+        #                     container and the containers
+        #=====================================================================================
+
+        df_plan             =   pd.read_csv(self.str_plan_config_filepath)
+        df_calibration      =   pd.read_csv(self.str_calibration_filepath)
+
+        #Every planned asset needs a calibration
+        list_missing        =   sorted(set(df_plan['asset']) - set(df_calibration['asset']))
+        if list_missing:
+            raise ValueError(f"Assets missing from the calibration {self.str_calibration_filepath}: {', '.join(list_missing)}")
+
+        #Tag map of each asset from its current tag list
+        df_profiles         =   pd.DataFrame([(str_asset_type, *self.get_tag_profile(str_asset_type)) for str_asset_type in df_plan['asset'].unique()], columns=['asset', 'int_tags', 'int_span', 'int_reads'])
+        df_plan             =   df_plan.merge(df_profiles, on='asset').merge(df_calibration.drop(columns=['tags_per_device']), on='asset')
+
+        #Per device cost: tick compute of its tags plus its poll requests
+        df_plan['int_devices']          =   -(-df_plan['target_tags'] // df_plan['int_tags'])
+        df_plan['float_device_cpus']    =   df_plan['int_tags'] / df_plan['pub_int'] * df_plan['cpu_per_tag_tick_s'] + df_plan['poll_rate'] * df_plan['int_reads'] * df_plan['cpu_per_request_s']
+        df_plan['float_device_memory']  =   df_plan['int_tags'] * df_plan['memory_per_tag_bytes']
+
+        #Devices per container within the CPU and memory budget and the unit ID range
+        float_cpu_budget    =   min(self.float_container_cpus, 1.0) * self.float_headroom
+        arr_memory_budget   =   self.int_container_memory * self.float_headroom - df_plan['base_memory_bytes']
+        if (arr_memory_budget <= 0).any():
+            raise ValueError(f"Container memory {self.str_container_memory} does not fit the base memory of a simulator")
+
+        arr_cpu_devices     =   np.floor(float_cpu_budget / df_plan['float_device_cpus'].clip(lower=1e-12))
+        arr_memory_devices  =   np.floor(arr_memory_budget / df_plan['float_device_memory'].clip(lower=1e-12))
+        df_plan['int_container_devices']    =   np.minimum(np.minimum(arr_cpu_devices, arr_memory_devices), utils.INT_MODBUS_MAX_UNIT_ID).astype(int)
+        if (df_plan['int_container_devices'] < 1).any():
+            raise ValueError(f"One device does not fit a container of {self.float_container_cpus:g} CPUs and {self.str_container_memory}: {', '.join(df_plan.loc[df_plan['int_container_devices'] < 1, 'asset'])}")
+
+        df_plan['int_containers']       =   -(-df_plan['int_devices'] // df_plan['int_container_devices'])
+
+        return df_plan
+
+    def get_containers_per_host(self):
+
+        #=====================================================================================
+        #   Function Name  :  get_containers_per_host
+        #   Description    :  Returns the containers one host fits by their limits
+        #=====================================================================================
+
+        int_containers  =   int(min(
+                                        self.float_host_cpus * self.float_headroom // self.float_container_cpus,
+                                        self.int_host_memory * self.float_headroom // self.int_container_memory
+                                    ))
+        if int_containers < 1:
+            raise ValueError(f"A container of {self.float_container_cpus:g} CPUs and {self.str_container_memory} does not fit a host of {self.float_host_cpus:g} CPUs and {self.int_host_memory/2**30:.1f} GiB")
+
+        return int_containers
+
+    def get_ip_addresses(self, int_count):
+
+        #=====================================================================================
+        #   Function Name  :  get_ip_addresses
+        #   Description    :  Returns int_count host addresses of the subnet, skipping the
+        #                     gateway, unique across all hosts of the network
+        #=====================================================================================
+
+        obj_network     =   ipaddress.ip_network(self.str_subnet)
+        arr_addresses   =   np.arange(int(obj_network.network_address) + 1, int(obj_network.broadcast_address), dtype=np.int64)
+        if self.str_gateway:
+            arr_addresses   =   arr_addresses[arr_addresses != int(ipaddress.ip_address(self.str_gateway))]
+
+        if int_count > arr_addresses.size:
+            raise ValueError(f"Subnet {self.str_subnet} has {arr_addresses.size} addresses for {int_count} containers, use a larger subnet or --bind port")
+
+        arr_addresses   =   arr_addresses[:int_count]
+
+        return pd.Series(arr_addresses >> 24).astype(str) + '.' + pd.Series(arr_addresses >> 16 & 255).astype(str) + '.' + pd.Series(arr_addresses >> 8 & 255).astype(str) + '.' + pd.Series(arr_addresses & 255).astype(str)
+
+    def get_services(self, df_plan):
+
+        #=====================================================================================
+        #   Function Name  :  get_services
+        #   Description    :  Returns one row per container, the devices of an asset split
+        #                     evenly over its containers and the containers packed onto the
+        #                     hosts in order:
+        #                       1.  ip   : every container gets its own subnet address and
+        #                                  serves on port 502
+        #                       2.  port : containers of a host map base port + n to 502
+        #=====================================================================================
+
+        arr_containers      =   df_plan['int_containers'].to_numpy()
+        int_containers      =   int(arr_containers.sum())
+
+        #Asset row and index within the asset of every container
+        arr_rows            =   np.repeat(np.arange(len(df_plan)), arr_containers)
+        arr_index           =   np.arange(int_containers) - np.repeat(np.cumsum(arr_containers) - arr_containers, arr_containers)
+        df_services         =   df_plan.iloc[arr_rows].reset_index(drop=True)
+
+        #Even split of the devices, the first containers take the remainder
+        arr_base_devices, arr_extra_devices =   np.divmod(df_services['int_devices'].to_numpy(), df_services['int_containers'].to_numpy())
+        df_services['int_devices']          =   arr_base_devices + (arr_index < arr_extra_devices)
+        df_services['int_first_device']     =   arr_index * arr_base_devices + np.minimum(arr_index, arr_extra_devices)
+
+        #Host of every container and its slot on the host
+        int_containers_per_host =   self.get_containers_per_host()
+        arr_hosts           =   np.arange(int_containers) // int_containers_per_host
+        arr_slots           =   np.arange(int_containers) % int_containers_per_host
+        sr_hosts            =   pd.Series(arr_hosts + 1).astype(str)
+        sr_counts           =   (pd.DataFrame({'host': arr_hosts, 'asset': arr_rows}).groupby(['host', 'asset']).cumcount() + 1).astype(str)
+
+        df_services['server_name']      =   self.str_server_prefix + '_' + sr_hosts.str.zfill(max(2, len(str(arr_hosts[-1] + 1))))
+        df_services['service_name']     =   df_services['asset'] + '_' + sr_hosts + '_' + sr_counts
+        df_services['container_name']   =   df_services['service_name']
+        df_services['dockerfile']       =   df_services['asset'] + '_dockerfile'
+        df_services['restart']          =   'always'
+
+        #Addresses that do not conflict within a host or across the network
+        if self.str_bind_mode == 'ip':
+            df_services['ipv4_address'] =   self.get_ip_addresses(int_containers)
+            df_services['ports']        =   None
+        else:
+            df_services['ipv4_address'] =   None
+            df_services['ports']        =   (self.int_base_port + pd.Series(arr_slots)).astype(str) + f":{utils.INT_DEFAULT_MODBUS_PORT}"
+
+        #Limits of the container size, reservations of the estimated use
+        df_services['limits_cpus']          =   f"{self.float_container_cpus:g}"
+        df_services['limits_memory']        =   self.str_container_memory
+        df_services['reservations_cpus']    =   (df_services['int_devices'] * df_services['float_device_cpus']).round(2).clip(lower=0.01).astype(str)
+        df_services['reservations_memory']  =   np.ceil((df_services['base_memory_bytes'] + df_services['int_devices'] * df_services['float_device_memory']) / 2**20).astype(int).astype(str) + 'M'
+        df_services['mem_limit']            =   self.str_container_memory
+        df_services['memswap_limit']        =   self.str_container_memory
+
+        #Simulator command of the container
+        df_services['command']  =   ('python3 modbus/simulator/start.py --asset ' + df_services['asset']
+                                        + ' --port ' + str(utils.INT_DEFAULT_MODBUS_PORT)
+                                        + ' --devices ' + df_services['int_devices'].astype(str)
+                                        + ' --pub_int ' + df_services['pub_int'].astype(str)
+                                        + ' --phase_offset ' + df_services['int_first_device'].astype(str))
+
+        return df_services[LIST_SERVICE_COLUMNS + ['asset', 'int_devices']]
@@ -0,0 +1,337 @@
+#=========================================================================================
+#   Name        :   fleet_launcher.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This is a fleet launcher module which has classes for Modbus Simulator
+#                   fleets. The class DataSimFleet does the following:
+#                       1.  Builds the worker shards from a fleet config CSV or splits the
+#                           requested devices across the CPU cores
+#                       2.  Starts one DataSimStartServer worker process per shard, pinned
+#                           to its own core and bound to its own port or loopback IP
+#                       3.  Supervises the workers and restarts them on crash with backoff
+#                       4.  Rolls up the tick and request stats reported by the workers
+#                       5.  Workers of the same asset share one copy of the decoded frames
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import Libraries
+from core import utils
+from server import modbus_simulator
+import multiprocessing
+import queue
+import signal
+import time
+import pandas as pd
+
+#Function Definitions
+def run_worker(dict_worker, obj_stats_queue):
+
+    #=====================================================================================
+    #   Function Name  :  run_worker
+    #   Description    :  Worker process entry point, pins the process to its core and
+    #                     runs one simulator server for its shard
+    #=====================================================================================
+
+    #Workers are forked after the supervisor installs its handlers. Ctrl-C reaches the
+    #whole process group, workers ignore it and exit through the supervisor's terminate,
+    #so the SIGTERM handler of the server runs the exit handlers (shared frames release)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    #Pin the worker to its core
+    if dict_worker.get('int_cpu') is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {dict_worker['int_cpu']})
+
+    #Start modbus server for this shard
+    modbus_simulator.DataSimStartServer (
+                                            str_server_ip_address       =   dict_worker['str_ip_address'],
+                                            str_server_port             =   str(dict_worker['int_port']),
+                                            str_server_unit_id          =   str(dict_worker['int_unit_id']),
+                                            str_data_sample_duration    =   dict_worker['str_sample_duration'],
+                                            str_asset_type              =   dict_worker['str_asset_type'],
+                                            float_publish_interval      =   dict_worker['float_publish_interval'],
+                                            int_device_count            =   dict_worker['int_device_count'],
+                                            int_phase_step              =   dict_worker['int_phase_step'],
+                                            int_phase_offset            =   dict_worker['int_phase_offset'],
+                                            str_log_filename            =   dict_worker['str_worker_name']+'_log_runtime',
+                                            obj_stats_queue             =   obj_stats_queue,
+                                            str_worker_name             =   dict_worker['str_worker_name'],
+                                            bool_shared_frames          =   True,
+                                            int_metrics_port            =   dict_worker.get('int_metrics_port')
+                                        )
+
+#Class definitions
+class DataSimFleet:
+
+    #=============================================================================================
+    #   Class Name     :    DataSimFleet
+    #   Description    :    This class does the followng:
+    #                           1.  Builds the list of worker shards
+    #                           2.  Starts, supervises and restarts the worker processes
+    #                           3.  Prints the rolled up fleet stats
+    #=============================================================================================
+
+    def __init__(self,**kwargs):
+
+        #Extract keyword args
+        self.str_fleet_config_filepath  =   kwargs.get('str_fleet_config_filepath', None)
+        self.str_asset_type             =   kwargs.get('str_asset_type', utils.STR_DEFAULT_ASSET_TYPE)
+        self.int_device_count           =   kwargs.get('int_device_count', utils.INT_DEFAULT_DEVICE_COUNT)
+        self.int_worker_count           =   kwargs.get('int_worker_count', None) or os.cpu_count()
+        self.str_bind_mode              =   kwargs.get('str_bind_mode', utils.STR_DEFAULT_FLEET_BIND_MODE)
+        self.str_ip_address             =   kwargs.get('str_ip_address', utils.STR_DEFAULT_FLEET_IP_ADDRESS)
+        self.int_base_port              =   kwargs.get('int_base_port', utils.INT_DEFAULT_FLEET_BASE_PORT)
+        self.int_phase_step             =   kwargs.get('int_phase_step', utils.INT_DEFAULT_PHASE_STEP)
+        self.float_publish_interval     =   kwargs.get('float_publish_interval', utils.FLOAT_DEFAULT_PUBLISH_INTERVAL)
+        self.str_sample_duration        =   kwargs.get('str_sample_duration', utils.STR_DEFAULT_SAMPLE_DURATION)
+        self.float_rollup_interval      =   kwargs.get('float_rollup_interval', utils.FLOAT_DEFAULT_FLEET_ROLLUP_INTERVAL)
+        self.int_metrics_base_port      =   kwargs.get('int_metrics_base_port', None)
+
+        #Initialize attributes
+        self.obj_stats_queue            =   multiprocessing.Queue()
+        self.dict_worker_state          =   {}
+        self.dict_worker_stats          =   {}
+        self.bool_running               =   True
+
+        #Build the worker shards
+        if self.str_fleet_config_filepath:
+            self.list_workers           =   self.get_workers_from_config()
+        else:
+            self.list_workers           =   self.get_workers_from_cores()
+
+    def get_workers_from_config(self):
+
+        #=====================================================================================
+        #   Function Name  :  get_workers_from_config
+        #   Description    :  Reads one worker shard per row of the fleet config CSV
+        #=====================================================================================
+
+        #Read the CSV file into a DataFrame
+        df_fleet        =   pd.read_csv(self.str_fleet_config_filepath)
+        int_cpu_count   =   os.cpu_count()
+
+        list_workers    =   [
+                                {
+                                    'str_worker_name'           :   str(dict_row['worker_name']),
+                                    'str_asset_type'            :   str(dict_row['asset']),
+                                    'str_ip_address'            :   str(dict_row['ip_address']),
+                                    'int_port'                  :   int(dict_row['port']),
+                                    'int_unit_id'               :   int(dict_row['unit_id']),
+                                    'int_device_count'          :   int(dict_row['devices']),
+                                    'int_phase_step'            :   int(dict_row['phase_step']),
+                                    'int_phase_offset'          :   0,
+                                    'float_publish_interval'    :   float(dict_row['pub_int']),
+                                    'str_sample_duration'       :   self.str_sample_duration,
+                                    'int_cpu'                   :   int(dict_row['cpu']) % int_cpu_count if pd.notna(dict_row['cpu']) else None,
+                                    'int_metrics_port'          :   int(dict_row['metrics_port']) if pd.notna(dict_row.get('metrics_port')) else None
+                                }
+                                for dict_row in df_fleet.to_dict(orient='records')
+                            ]
+
+        return list_workers
+
+    def get_workers_from_cores(self):
+
+        #=====================================================================================
+        #   Function Name  :  get_workers_from_cores
+        #   Description    :  Splits int_device_count devices of one asset across the
+        #                     workers, one per core, each on its own port or loopback IP
+        #=====================================================================================
+
+        list_workers            =   []
+        int_worker_count        =   min(self.int_worker_count, self.int_device_count)
+        int_base_devices, int_extra_devices =   divmod(self.int_device_count, int_worker_count)
+        int_first_device        =   0
+
+        for int_worker in range(int_worker_count):
+
+            int_worker_devices  =   int_base_devices + (1 if int_worker < int_extra_devices else 0)
+
+            #Bind to base port + worker on one IP, or to one loopback IP per worker
+            if self.str_bind_mode == 'port':
+                str_ip_address  =   self.str_ip_address
+                int_port        =   self.int_base_port + int_worker
+            else:
+                str_ip_address  =   f"127.0.0.{int_worker + 1}"
+                int_port        =   self.int_base_port
+
+            list_workers.append({
+                                    'str_worker_name'           :   f"{self.str_asset_type}_worker_{int_worker + 1}",
+                                    'str_asset_type'            :   self.str_asset_type,
+                                    'str_ip_address'            :   str_ip_address,
+                                    'int_port'                  :   int_port,
+                                    'int_unit_id'               :   1,
+                                    'int_device_count'          :   int_worker_devices,
+                                    'int_phase_step'            :   self.int_phase_step,
+                                    'int_phase_offset'          :   int_first_device * self.int_phase_step,
+                                    'float_publish_interval'    :   self.float_publish_interval,
+                                    'str_sample_duration'       :   self.str_sample_duration,
+                                    'int_cpu'                   :   int_worker % os.cpu_count(),
+                                    'int_metrics_port'          :   self.int_metrics_base_port + int_worker if self.int_metrics_base_port else None
+                                })
+
+            #Devices keep their fleet wide phase across the shards
+            int_first_device    +=  int_worker_devices
+
+        return list_workers
+
+    def start_worker(self, dict_worker):
+
+        #=====================================================================================
+        #   Function Name  :  start_worker
+        #   Description    :  Starts the process for one worker shard
+        #=====================================================================================
+
+        obj_process     =   multiprocessing.Process (
+                                                        target  =   run_worker,
+                                                        args    =   (dict_worker, self.obj_stats_queue),
+                                                        name    =   dict_worker['str_worker_name'],
+                                                        daemon  =   True
+                                                    )
+        obj_process.start()
+
+        #Track the process
+        dict_state                      =   self.dict_worker_state.setdefault(dict_worker['str_worker_name'], {'int_restarts': 0, 'float_backoff': utils.FLOAT_DEFAULT_FLEET_RESTART_DELAY})
+        dict_state['obj_process']       =   obj_process
+        dict_state['float_started']     =   time.monotonic()
+        dict_state['float_next_start']  =   None
+
+        print(f"Worker Started      :   {dict_worker['str_worker_name']} (pid {obj_process.pid}, {dict_worker['str_ip_address']}:{dict_worker['int_port']}, {dict_worker['int_device_count']} devices, cpu {dict_worker['int_cpu']})")
+
+    def check_workers(self):
+
+        #=====================================================================================
+        #   Function Name  :  check_workers
+        #   Description    :  Restarts crashed workers, the restart delay doubles on every
+        #                     crash and resets once a worker stays up for a while
+        #=====================================================================================
+
+        float_now   =   time.monotonic()
+
+        for dict_worker in self.list_workers:
+
+            dict_state  =   self.dict_worker_state[dict_worker['str_worker_name']]
+            obj_process =   dict_state['obj_process']
+
+            #Worker is running
+            if obj_process.is_alive():
+                continue
+
+            #Schedule the restart
+            if dict_state['float_next_start'] is None:
+
+                if float_now - dict_state['float_started'] > utils.FLOAT_DEFAULT_FLEET_STABLE_UPTIME:
+                    dict_state['float_backoff']     =   utils.FLOAT_DEFAULT_FLEET_RESTART_DELAY
+
+                dict_state['float_next_start']      =   float_now + dict_state['float_backoff']
+                print(f"Worker Exited       :   {dict_worker['str_worker_name']} (exit code {obj_process.exitcode}), restarting in {dict_state['float_backoff']:.1f}s")
+                dict_state['float_backoff']         =   min(dict_state['float_backoff'] * 2, utils.FLOAT_DEFAULT_FLEET_MAX_RESTART_DELAY)
+
+            #Restart when the delay has passed
+            elif float_now >= dict_state['float_next_start']:
+
+                dict_state['int_restarts']          +=  1
+                self.start_worker(dict_worker)
+
+    def drain_stats(self):
+
+        #=====================================================================================
+        #   Function Name  :  drain_stats
+        #   Description    :  Keeps the latest stats reported by every worker
+        #=====================================================================================
+
+        while True:
+            try:
+                dict_stats  =   self.obj_stats_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            self.dict_worker_stats[dict_stats['str_worker_name']]   =   dict_stats
+
+    def get_rollup(self):
+
+        #=====================================================================================
+        #   Function Name  :  get_rollup
+        #   Description    :  Returns the fleet totals of the latest worker stats
+        #=====================================================================================
+
+        list_stats  =   list(self.dict_worker_stats.values())
+
+        return  {
+                    'int_worker_count'          :   len(self.list_workers),
+                    'int_alive_count'           :   sum(dict_state['obj_process'].is_alive() for dict_state in self.dict_worker_state.values()),
+                    'int_restart_count'         :   sum(dict_state['int_restarts'] for dict_state in self.dict_worker_state.values()),
+                    'int_device_count'          :   sum(dict_stats.get('int_device_count', 0) for dict_stats in list_stats),
+                    'int_tick_count'            :   sum(dict_stats.get('int_tick_count', 0) for dict_stats in list_stats),
+                    'int_skipped_frames'        :   sum(dict_stats.get('int_skipped_frames', 0) for dict_stats in list_stats),
+                    'float_max_lateness'        :   max((dict_stats.get('float_max_lateness', 0.0) for dict_stats in list_stats), default=0.0),
+                    'float_max_tick_duration'   :   max((dict_stats.get('float_max_tick_duration', 0.0) for dict_stats in list_stats), default=0.0),
+                    'int_request_count'         :   sum(dict_stats.get('int_request_count', 0) for dict_stats in list_stats),
+                    'int_rss_bytes'             :   sum(dict_stats.get('int_rss_bytes', 0) for dict_stats in list_stats)
+                }
+
+    def stop(self, *_):
+
+        #=====================================================================================
+        #   Function Name  :  stop
+        #   Description    :  Stops the supervisor loop, used as the signal handler
+        #=====================================================================================
+
+        self.bool_running   =   False
+
+    def run(self):
+
+        #=====================================================================================
+        #   Function Name  :  run
+        #   Description    :  Starts every worker and supervises them until SIGINT/SIGTERM,
+        #                     printing the fleet rollup every float_rollup_interval seconds
+        #=====================================================================================
+
+        #Print message
+        print(f"\n{'='*30}\n{' '*4}Modbus Simulator Fleet\n{' '*10}Starting\n{'='*30}")
+
+        #Stop cleanly on SIGINT/SIGTERM
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for dict_worker in self.list_workers:
+            self.start_worker(dict_worker)
+
+        float_next_rollup       =   time.monotonic() + self.float_rollup_interval
+        int_last_request_count  =   0
+
+        try:
+            while self.bool_running:
+
+                time.sleep(utils.FLOAT_DEFAULT_FLEET_SUPERVISE_INTERVAL)
+                self.check_workers()
+                self.drain_stats()
+
+                #Print the rollup
+                if time.monotonic() >= float_next_rollup:
+
+                    dict_rollup             =   self.get_rollup()
+                    float_requests_per_s    =   (dict_rollup['int_request_count'] - int_last_request_count) / self.float_rollup_interval
+                    int_last_request_count  =   dict_rollup['int_request_count']
+                    float_next_rollup       +=  self.float_rollup_interval
+
+                    print(f"Fleet Stats         :   {dict_rollup['int_alive_count']}/{dict_rollup['int_worker_count']} workers, {dict_rollup['int_restart_count']} restarts, "
+                          f"{dict_rollup['int_device_count']} devices, {dict_rollup['int_tick_count']} ticks, {dict_rollup['int_skipped_frames']} skipped, "
+                          f"max lateness {dict_rollup['float_max_lateness']*1000:.1f} ms, {float_requests_per_s:.0f} req/s, RSS {dict_rollup['int_rss_bytes']/2**20:.0f} MiB")
+
+        finally:
+
+            #Stop all workers
+            for dict_state in self.dict_worker_state.values():
+                dict_state['obj_process'].terminate()
+            for dict_state in self.dict_worker_state.values():
+                dict_state['obj_process'].join(timeout=5)
+                if dict_state['obj_process'].is_alive():
+                    dict_state['obj_process'].kill()
+
+            print("Fleet Status        :   Stopped")
@@ -8,6 +8,23 @@
 #                       1.  Read configs
 #                       2.  Get data for modbus server
 #                       3.  Start modbus server
+#                       4.  Optionally share the decoded frames with other simulator
+#                           processes of the same asset through shared memory
+#                       5.  Memory map the compiled frames from the frame cache, only
+#                           parsing the CSVs when they changed
+#                       6.  Or stream a large recorded data file through a prefetched
+#                           ring buffer with constant memory
+#                       7.  Or compute procedural signals from the tag list each tick
+#                           without any tag data
+#                       8.  Optionally serve runtime metrics on a local HTTP port
+#                       9.  Time the frame load as the load span and optionally profile
+#                           the running server
+#                       10. Optionally watch the asset config files and reload the frame
+#                           source in the background without restarting the server
+#                       11. Optionally record the incoming requests to a request journal
+#                       12. Optionally cache the encoded read responses of each tick
+#                       13. Serves over Modbus TCP or UDP with the socket (MBAP) or RTU
+#                           framer
 #=========================================================================================
 
 #Set path to current directory
@@ -18,6 +35,16 @@ sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
 #Import Libraries
 from core import utils
 from core import modbus_server
+from core import frame_engine
+from core import shared_frames
+from core import frame_cache
+from core import stream_source
+from core import signal_source
+from core import profiler
+from core import fault_injector
+from core import traffic_recorder
+import functools
+import signal
 
 #Main function for server deployment
 class DataSimStartServer:
@@ -36,25 +63,80 @@ class DataSimStartServer:
         #Extract keyword args
         self.str_server_port            =   kwargs.get('str_server_port')
         self.str_server_unit_id         =   kwargs.get('str_server_unit_id')
-        self.str_data_sample_duration   =   kwargs.get('str_data_sample_duration')
+        self.str_data_sample_duration   =   kwargs.get('str_data_sample_duration') or utils.STR_DEFAULT_SAMPLE_DURATION
+        self.str_resample_method        =   kwargs.get('str_resample_method', None)
+        self.str_playback_mode          =   kwargs.get('str_playback_mode', utils.STR_DEFAULT_PLAYBACK_MODE)
         self.str_asset_type             =   kwargs.get('str_asset_type')
         self.float_publish_interval     =   kwargs.get('float_publish_interval')
+        self.str_overrun_policy         =   kwargs.get('str_overrun_policy', utils.STR_DEFAULT_OVERRUN_POLICY)
+        self.str_log_mode               =   kwargs.get('str_log_mode', utils.STR_DEFAULT_LOG_MODE)
+        self.int_log_max_bytes          =   kwargs.get('int_log_max_bytes', utils.INT_DEFAULT_LOG_MAX_BYTES)
+        self.int_log_backup_count       =   kwargs.get('int_log_backup_count', utils.INT_DEFAULT_LOG_BACKUP_COUNT)
+        self.int_log_trace_every        =   kwargs.get('int_log_trace_every', utils.INT_DEFAULT_LOG_TRACE_EVERY)
+        self.str_log_trace_range        =   kwargs.get('str_log_trace_range', None)
+        self.int_device_count           =   kwargs.get('int_device_count', utils.INT_DEFAULT_DEVICE_COUNT)
+        self.int_phase_step             =   kwargs.get('int_phase_step', utils.INT_DEFAULT_PHASE_STEP)
+        self.int_phase_offset           =   kwargs.get('int_phase_offset', 0)
+        self.str_server_ip_address      =   kwargs.get('str_server_ip_address', None)
+        self.str_log_filename           =   kwargs.get('str_log_filename', utils.STR_DEFAULT_MODBUS_SERVER_LOG_FILENAME)
+        self.obj_stats_queue            =   kwargs.get('obj_stats_queue', None)
+        self.str_worker_name            =   kwargs.get('str_worker_name', None)
+        self.bool_shared_frames         =   kwargs.get('bool_shared_frames', False)
+        self.bool_frame_cache           =   kwargs.get('bool_frame_cache', True)
+        self.bool_stream                =   kwargs.get('bool_stream', False)
+        self.str_stream_filepath        =   kwargs.get('str_stream_filepath', None)
+        self.int_stream_buffer_rows     =   kwargs.get('int_stream_buffer_rows', utils.INT_DEFAULT_STREAM_BUFFER_ROWS)
+        self.bool_stream_loop           =   kwargs.get('bool_stream_loop', True)
+        self.bool_signals               =   kwargs.get('bool_signals', False)
+        self.int_signal_seed            =   kwargs.get('int_signal_seed', utils.INT_DEFAULT_SIGNAL_SEED)
+        self.int_metrics_port           =   kwargs.get('int_metrics_port', None)
+        self.str_profile_mode           =   kwargs.get('str_profile_mode', None)
+        self.float_profile_seconds      =   kwargs.get('float_profile_seconds', utils.FLOAT_DEFAULT_PROFILE_SECONDS)
+        self.bool_spans                 =   kwargs.get('bool_spans', False)
+        self.str_fault_config_filepath  =   kwargs.get('str_fault_config_filepath', None)
+        self.int_fault_seed             =   kwargs.get('int_fault_seed', utils.INT_DEFAULT_SIGNAL_SEED)
+        self.bool_prepare_ahead         =   kwargs.get('bool_prepare_ahead', False)
+        self.bool_watch                 =   kwargs.get('bool_watch', False)
+        self.str_journal_filepath       =   kwargs.get('str_journal_filepath', None)
+        self.bool_response_cache        =   kwargs.get('bool_response_cache', False)
+        self.str_transport              =   kwargs.get('str_transport', utils.STR_DEFAULT_MODBUS_TRANSPORT)
+        self.str_framer                 =   kwargs.get('str_framer', utils.STR_DEFAULT_MODBUS_FRAMER)
+        self.func_generate_test_data    =   kwargs.get('func_generate_test_data', None)
+
+        #Exit cleanly on SIGTERM (docker stop) so the exit handlers run
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
 
         #Intialize classes
         self.obj_utils              =   utils.DataSimUtils()
-        self.obj_modbus_server      =   modbus_server.DataSimModbus()
     
         #Initialize attributes
-        self.obj_logger             =   self.obj_utils.set_logger(str_log_filename  =   utils.STR_DEFAULT_MODBUS_SERVER_LOG_FILENAME)
+        self.obj_logger             =   self.obj_utils.set_logger   (
+                                                                        str_log_filename    =   self.str_log_filename,
+                                                                        str_log_mode        =   self.str_log_mode,
+                                                                        int_max_bytes       =   self.int_log_max_bytes,
+                                                                        int_backup_count    =   self.int_log_backup_count
+                                                                    )
+        self.tuple_log_trace_range  =   self.obj_utils.parse_address_range(str_address_range    =   self.str_log_trace_range)
 
-        #Getting ip address
-        self.str_server_ip_address  =   self.obj_utils.get_ip_address(obj_logger    =   self.obj_logger)
+        #Getting ip address, unless the fleet launcher binds the worker to one
+        if not self.str_server_ip_address:
+            self.str_server_ip_address  =   self.obj_utils.get_ip_address(obj_logger    =   self.obj_logger)
+        else:
+            self.obj_logger.info(f"IP (Fixed)    : {self.str_server_ip_address}")
         
         #Log the port 
         self.obj_logger.info(f"Port          :  { self.str_server_port}")
+        self.obj_logger.info(f"Transport     :  {self.str_transport} ({self.str_framer} framer)")
         
+        #Unit IDs of the virtual devices, numbered up from the server unit ID
+        self.list_unit_ids          =   self.obj_utils.get_unit_ids (
+                                                                        str_server_unit_id  =   self.str_server_unit_id,
+                                                                        int_device_count    =   self.int_device_count
+                                                                    )
+
         #Log the unit id 
         self.obj_logger.info(f"Unit ID       :  {self.str_server_unit_id}")
+        self.obj_logger.info(f"Devices       :  {self.int_device_count} (unit {self.list_unit_ids[0]}-{self.list_unit_ids[-1]})")
         
         #Path operations
         self.str_lib_path           =   self.obj_utils.get_lib_path(
@@ -69,27 +151,415 @@ class DataSimStartServer:
                                                                             obj_logger      =   self.obj_logger
                                                                         )
 
+        #Profiler, captures go to the log directory
+        self.obj_profiler           =   profiler.DataSimProfiler(
+                                                                    str_profile_mode        =   self.str_profile_mode or utils.STR_DEFAULT_PROFILE_MODE,
+                                                                    float_profile_seconds   =   self.float_profile_seconds,
+                                                                    bool_spans              =   self.bool_spans,
+                                                                    str_log_path            =   self.str_log_path,
+                                                                    str_log_filename        =   self.str_log_filename,
+                                                                    obj_logger              =   self.obj_logger
+                                                                )
+        float_load_start            =   utils.time.perf_counter()
+
+        #Fault injector, a bare file name is looked up in the config directory, with or
+        #without the .csv extension
+        self.obj_fault_injector     =   None
+        if self.str_fault_config_filepath:
+            if self.str_transport != 'tcp':
+                raise ValueError(f"Fault injection is not supported over {self.str_transport}, it needs the tcp transport")
+            if not os.path.isfile(self.str_fault_config_filepath):
+                self.str_fault_config_filepath  =   os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, self.str_fault_config_filepath)
+                if not self.str_fault_config_filepath.endswith('.csv'):
+                    self.str_fault_config_filepath  +=  '.csv'
+            self.obj_fault_injector =   fault_injector.DataSimFaultInjector (
+                                                                                str_fault_config_filepath   =   self.str_fault_config_filepath,
+                                                                                int_seed                    =   self.int_fault_seed,
+                                                                                obj_logger                  =   self.obj_logger
+                                                                            )
+
+        #Request journal, a bare file name goes to the log directory
+        self.obj_traffic_recorder   =   None
+        if self.str_journal_filepath:
+            if not os.path.dirname(self.str_journal_filepath):
+                self.str_journal_filepath   =   os.path.join(self.str_log_path, self.str_journal_filepath)
+            self.obj_traffic_recorder   =   traffic_recorder.DataSimTrafficRecorder (
+                                                                                        str_journal_filepath    =   self.str_journal_filepath,
+                                                                                        obj_logger              =   self.obj_logger
+                                                                                    )
+
+        #Options the encoded frames depend on, part of the cache and shared memory keys
+        self.dict_encoding_options  =   {
+                                            'int_sample_period_ns'  :   self.obj_utils.get_period_ns(str_period=self.str_data_sample_duration),
+                                            'str_resample_method'   :   self.str_resample_method
+                                        }
+        self.obj_shared_frames      =   None
+
+        #Frame source with its devices and playback
+        dict_sources                =   {}
+        self.obj_frame_engine       =   self.build_frame_engine(dict_sources=dict_sources)
+        self.set_sources(dict_sources)
+
+        #Load span, from reading the inputs to the playback
+        if self.obj_profiler.bool_spans:
+            self.obj_profiler.add_span('load', float_load_start)
+            self.obj_logger.info(f"Span Stats : {self.obj_profiler.get_span_stats()}")
+
+        #Server with one store per virtual device
+        self.obj_modbus_server      =   modbus_server.DataSimModbus (
+                                                                        list_unit_ids       =   self.list_unit_ids,
+                                                                        int_register_count  =   int(self.obj_frame_engine.arr_addresses[-1]) + 1 if self.obj_frame_engine.arr_addresses.size else None,
+                                                                        obj_profiler        =   self.obj_profiler
+                                                                    )
+
+        #Run the async modbus server function
+        #Starting point of the async coroutine
+        #Manages event loop and context of async functions
+        utils.asyncio.run(self.async_helper()) 
+
+    def build_frame_engine(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :  build_frame_engine
+        #   Description    :  Returns a new frame source of the asset with its devices and
+        #                     playback set, computed signals, a streamed file or the frames
+        #                     decoded from the CSVs (through the cache and shared memory).
+        #                     The watch mode calls it again to reload the source from a
+        #                     worker thread, so the inputs it was built from (shared frames,
+        #                     tag data, tag list) go to dict_sources and are only set on
+        #                     the simulator with set_sources once the source is swapped in.
+        #=====================================================================================
+
+        #Extract keyword args
+        dict_sources                =   kwargs.get('dict_sources', {})
+
+        func_build_frames           =   functools.partial(self.load_frames_from_cache if self.bool_frame_cache else self.load_frames_from_csv, dict_sources=dict_sources)
+
+        #Frame operations, computed from the tag list each tick
+        if self.bool_signals:
+            obj_frame_engine    =   self.load_signal_source(dict_sources=dict_sources)
+
+        #Streamed from a large recorded file with constant memory
+        elif self.bool_stream:
+            obj_frame_engine    =   self.load_stream_source(dict_sources=dict_sources)
+
+        else:
+
+            #From shared memory when another process already published them
+            if self.bool_shared_frames:
+                obj_shared_frames   =   shared_frames.DataSimSharedFrames  (
+                                                                                str_asset_type          =   self.str_asset_type,
+                                                                                str_filepath            =   utils.STR_DEFAULT_CONFIG_FILEPATH,
+                                                                                dict_encoding_options   =   self.dict_encoding_options,
+                                                                                obj_logger              =   self.obj_logger
+                                                                            )
+
+                #Unchanged inputs keep the attached segment, attaching again would take
+                #another pid slot and mapping of this process
+                if self.obj_shared_frames is not None and self.obj_shared_frames.str_segment_name == obj_shared_frames.str_segment_name:
+                    obj_shared_frames           =   self.obj_shared_frames
+                    arr_addresses, arr_frames   =   obj_shared_frames.arr_addresses, obj_shared_frames.arr_frames
+                else:
+                    dict_sources['obj_shared_frames']   =   obj_shared_frames
+                    arr_addresses, arr_frames   =   obj_shared_frames.attach_or_publish(func_build_frames  =   func_build_frames)
+
+                dict_sources['obj_shared_frames']   =   obj_shared_frames
+            else:
+                arr_addresses, arr_frames   =   func_build_frames()
+
+            obj_frame_engine    =   frame_engine.DataSimFrameEngine().set_frames(
+                                                                                    arr_addresses           =   arr_addresses,
+                                                                                    arr_frames              =   arr_frames,
+                                                                                    obj_logger              =   self.obj_logger
+                                                                                )
+
+        obj_frame_engine.set_devices(
+                                        int_device_count        =   self.int_device_count,
+                                        int_phase_step          =   self.int_phase_step,
+                                        int_phase_offset        =   self.int_phase_offset
+                                    )
+        obj_frame_engine.get_memory_footprint(obj_logger   =   self.obj_logger)
+
+        #Rows advanced per tick, streamed files play one recorded row per tick
+        if isinstance(obj_frame_engine, stream_source.DataSimStreamSource) and self.str_playback_mode != 'row':
+            raise ValueError(f"Playback mode {self.str_playback_mode} is not supported when streaming")
+
+        float_rows_per_tick         =   obj_frame_engine.set_playback   (
+                                                                            str_playback_mode       =   self.str_playback_mode,
+                                                                            float_publish_interval  =   self.float_publish_interval,
+                                                                            str_sample_period       =   self.str_data_sample_duration
+                                                                        )
+        self.obj_logger.info(f"Playback            :  {self.str_playback_mode}, {float_rows_per_tick:g} rows per tick")
+
+        return obj_frame_engine
+
+    def set_sources(self, dict_sources):
+
+        #=====================================================================================
+        #   Function Name  :  set_sources
+        #   Description    :  Sets the inputs a frame source was built from on the
+        #                     simulator, called on the event loop once it is in use
+        #=====================================================================================
+
+        for str_name, obj_source in dict_sources.items():
+            setattr(self, str_name, obj_source)
+
+    def release_sources(self, dict_sources):
+
+        #=====================================================================================
+        #   Function Name  :  release_sources
+        #   Description    :  Releases a shared frames segment attached for a frame source
+        #                     that is not used, the live segment stays attached
+        #=====================================================================================
+
+        obj_shared_frames   =   dict_sources.get('obj_shared_frames')
+
+        if obj_shared_frames is not None and obj_shared_frames is not self.obj_shared_frames:
+            obj_shared_frames.release()
+
+    def load_frames_from_csv(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :  load_frames_from_csv
+        #   Description    :  Reads the tag data and tag list CSVs, loads them into the
+        #                     frame engine and returns the address vector and frames
+        #=====================================================================================
+
+        #Extract keyword args
+        dict_sources                =   kwargs.get('dict_sources', {})
+
         #CSV operations 
-        self.dict_server_data       =   self.obj_utils.get_server_tag_data  (
+        df_server_data              =   self.obj_utils.get_server_tag_data  (
                                                                                 str_filepath                =   utils.STR_DEFAULT_CONFIG_FILEPATH,
                                                                                 str_asset_type              =   self.str_asset_type,
                                                                                 str_data_sample_duration    =   self.str_data_sample_duration,
                                                                                 obj_logger                  =   self.obj_logger                             
                                                                             )
-        self.dict_server_tag_list   =   self.obj_utils.get_server_tag_list(
+        dict_server_tag_list        =   self.obj_utils.get_server_tag_list(
                                                                                 str_filepath    =   utils.STR_DEFAULT_CONFIG_FILEPATH,
                                                                                 str_asset_type  =   self.str_asset_type,
                                                                                 obj_logger      =   self.obj_logger          
                                                                         )
-        self.dict_add_csv           =   self.obj_utils.get_server_data_per_timestep(
-                                                                                        dict_server_data        =   self.dict_server_data,
-                                                                                        dict_server_tag_list    =   self.dict_server_tag_list,
-                                                                                        obj_logger              =   self.obj_logger   
+
+        dict_resample_methods       =   self.obj_utils.get_resample_methods (
+                                                                                dict_tag_data_types =   self.obj_utils.get_server_tag_data_types(
+                                                                                                                                                str_filepath    =   utils.STR_DEFAULT_CONFIG_FILEPATH,
+                                                                                                                                                str_asset_type  =   self.str_asset_type
+                                                                                                                                            ),
+                                                                                str_resample_method =   self.str_resample_method
+                                                                            )
+
+        #Frame operations, resampled once to the sample duration
+        obj_frame_engine            =   frame_engine.DataSimFrameEngine()
+        obj_frame_engine.load_frames    (
+                                            df_server_data          =   df_server_data,
+                                            dict_server_tag_list    =   dict_server_tag_list,
+                                            str_sample_period       =   self.str_data_sample_duration,
+                                            dict_resample_methods   =   dict_resample_methods,
+                                            dict_tag_encodings      =   self.obj_utils.get_server_tag_encodings (
+                                                                                                                    str_filepath    =   utils.STR_DEFAULT_CONFIG_FILEPATH,
+                                                                                                                    str_asset_type  =   self.str_asset_type
+                                                                                                                ),
+                                            obj_logger              =   self.obj_logger
+                                        )
+
+        dict_sources.update({'df_server_data': df_server_data, 'dict_server_tag_list': dict_server_tag_list, 'dict_resample_methods': dict_resample_methods})
+
+        return obj_frame_engine.arr_addresses, obj_frame_engine.arr_frames
+
+    def load_frames_from_cache(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :  load_frames_from_cache
+        #   Description    :  Memory maps the compiled frames of the asset, rebuilding them
+        #                     from the CSVs only when the inputs changed
+        #=====================================================================================
+
+        #Extract keyword args
+        dict_sources            =   kwargs.get('dict_sources', {})
+
+        obj_frame_cache         =   frame_cache.DataSimFrameCache   (
+                                                                        str_asset_type          =   self.str_asset_type,
+                                                                        str_filepath            =   utils.STR_DEFAULT_CONFIG_FILEPATH,
+                                                                        dict_encoding_options   =   self.dict_encoding_options,
+                                                                        obj_logger              =   self.obj_logger
+                                                                    )
+
+        dict_sources['obj_frame_cache']     =   obj_frame_cache
+
+        return obj_frame_cache.load_or_build(func_build_frames  =   functools.partial(self.load_frames_from_csv, dict_sources=dict_sources))
+
+    def load_stream_source(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :  load_stream_source
+        #   Description    :  Returns a stream source that prefetches the data file (the
+        #                     asset tag data CSV by default) into a ring buffer
+        #=====================================================================================
+
+        #Extract keyword args
+        dict_sources                =   kwargs.get('dict_sources', {})
+
+        dict_server_tag_list        =   self.obj_utils.get_server_tag_list(
+                                                                                str_filepath    =   utils.STR_DEFAULT_CONFIG_FILEPATH,
+                                                                                str_asset_type  =   self.str_asset_type,
+                                                                                obj_logger      =   self.obj_logger          
+                                                                        )
+        dict_sources['dict_server_tag_list']    =   dict_server_tag_list
+
+        return stream_source.DataSimStreamSource(
+                                                    str_data_filepath       =   self.str_stream_filepath or os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, self.str_asset_type+"_tag_data_auto_gen.csv"),
+                                                    dict_server_tag_list    =   dict_server_tag_list,
+                                                    dict_tag_encodings      =   self.obj_utils.get_server_tag_encodings (
+                                                                                                                            str_filepath    =   utils.STR_DEFAULT_CONFIG_FILEPATH,
+                                                                                                                            str_asset_type  =   self.str_asset_type
+                                                                                                                        ),
+                                                    int_buffer_rows         =   self.int_stream_buffer_rows,
+                                                    bool_loop               =   self.bool_stream_loop,
+                                                    obj_logger              =   self.obj_logger
+                                                )
+
+    def load_signal_source(self, **kwargs):
+
+        #=====================================================================================
+        #   Function Name  :  load_signal_source
+        #   Description    :  Returns a signal source that computes the frames from the
+        #                     waveform columns of the asset tag list
+        #=====================================================================================
+
+        #Extract keyword args
+        dict_sources                =   kwargs.get('dict_sources', {})
+
+        dict_server_tag_list        =   self.obj_utils.get_server_tag_list(
+                                                                                str_filepath    =   utils.STR_DEFAULT_CONFIG_FILEPATH,
+                                                                                str_asset_type  =   self.str_asset_type,
+                                                                                obj_logger      =   self.obj_logger          
+                                                                        )
+        dict_sources['dict_server_tag_list']    =   dict_server_tag_list
+
+        return signal_source.DataSimSignalSource(
+                                                    str_tag_list_filepath   =   os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, self.str_asset_type+"_tag_list.csv"),
+                                                    dict_server_tag_list    =   dict_server_tag_list,
+                                                    int_seed                =   self.int_signal_seed,
+                                                    obj_logger              =   self.obj_logger
+                                                )
+
+    def get_config_snapshot(self):
+
+        #=====================================================================================
+        #   Function Name  :  get_config_snapshot
+        #   Description    :  Returns the modification time and size of the config files
+        #                     the frame source is built from, None for a missing file
+        #=====================================================================================
+
+        list_filepaths  =   [os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, self.str_asset_type+"_tag_list.csv")]
+
+        if self.bool_stream:
+            list_filepaths.append(self.str_stream_filepath or os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, self.str_asset_type+"_tag_data_auto_gen.csv"))
+        elif not self.bool_signals:
+            list_filepaths.append(os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, self.str_asset_type+"_tag_data_auto_gen.csv"))
+
+        dict_snapshot   =   {}
+        for str_filepath in list_filepaths:
+            try:
+                obj_stat                    =   os.stat(str_filepath)
+                dict_snapshot[str_filepath] =   (obj_stat.st_mtime_ns, obj_stat.st_size)
+            except FileNotFoundError:
+                dict_snapshot[str_filepath] =   None
+
+        return dict_snapshot
+
+    def rebuild_frame_engine(self):
+
+        #=====================================================================================
+        #   Function Name  :  rebuild_frame_engine
+        #   Description    :  Runs in a worker thread, regenerates the test data if the tag
+        #                     list changed, builds the new frame source and returns it with
+        #                     its diff against the live one and the inputs it was built
+        #                     from. A segment attached by a failed build is released.
+        #=====================================================================================
+
+        if self.func_generate_test_data and not self.bool_signals and not self.bool_stream:
+            self.func_generate_test_data()
+
+        dict_sources        =   {}
+
+        try:
+            obj_frame_engine    =   self.build_frame_engine(dict_sources=dict_sources)
+            dict_diff           =   obj_frame_engine.get_frame_diff(obj_previous_frame_engine=self.obj_frame_engine)
+        except Exception:
+            self.release_sources(dict_sources)
+            raise
+
+        return obj_frame_engine, dict_diff, dict_sources
+
+    async def watch_config_files(self):
+
+        #=====================================================================================
+        #   Function Name  :  watch_config_files
+        #   Description    :  Polls the config files every FLOAT_DEFAULT_WATCH_INTERVAL
+        #                     seconds. A change is reloaded once the files stayed the same
+        #                     for one poll, so a file still being written is not read:
+        #                       1.  Rebuilds the frame source in a worker thread
+        #                       2.  Swaps it in at the next tick boundary, the client
+        #                           connections stay open
+        #                       3.  Releases the previous source and logs the reload time
+        #                           and the diff size
+        #                     A failed reload is logged and the previous source keeps
+        #                     playing until the files change again.
+        #=====================================================================================
+
+        obj_loop            =   utils.asyncio.get_running_loop()
+        dict_snapshot       =   self.get_config_snapshot()
+        dict_pending        =   None
+
+        while True:
+
+            await utils.asyncio.sleep(utils.FLOAT_DEFAULT_WATCH_INTERVAL)
+
+            #Wait for a change that stayed for one poll
+            dict_current    =   self.get_config_snapshot()
+            if dict_current == dict_snapshot or dict_current != dict_pending:
+                dict_pending    =   None if dict_current == dict_snapshot else dict_current
+                continue
+
+            list_changed    =   [os.path.basename(str_filepath) for str_filepath in dict_current if dict_current[str_filepath] != dict_snapshot[str_filepath]]
+            dict_pending    =   None
+            float_start     =   utils.time.perf_counter()
+            obj_previous_frame_engine   =   self.obj_frame_engine
+            obj_previous_shared_frames  =   self.obj_shared_frames
+
+            #Log message
+            self.obj_logger.info(f"Reload              :  {', '.join(list_changed)} changed, rebuilding")
+
+            try:
+                obj_frame_engine, dict_diff, dict_sources   =   await obj_loop.run_in_executor(None, self.rebuild_frame_engine)
+            except Exception as obj_error:
+                self.obj_logger.error(f"Reload              :  Failed, keeping the previous frames ({obj_error})")
+                dict_snapshot   =   self.get_config_snapshot()
+                continue
+
+            #Regenerated test data is part of this reload
+            dict_snapshot   =   self.get_config_snapshot()
+            float_rebuild   =   utils.time.perf_counter() - float_start
+
+            #Swap in at the next tick boundary
+            int_tick_count  =   await self.obj_modbus_server.reload_frame_engine(
+                                                                                    obj_frame_engine        =   obj_frame_engine,
+                                                                                    arr_removed_addresses   =   dict_diff['arr_removed_addresses']
                                                                                 )
-        #Run the async modbus server function
-        #Starting point of the async coroutine
-        #Manages event loop and context of async functions
-        utils.asyncio.run(self.async_helper(),debug=True) 
+            self.obj_frame_engine   =   obj_frame_engine
+            self.set_sources(dict_sources)
+
+            #Release the previous source, a segment of unchanged inputs stays attached
+            obj_previous_frame_engine.close()
+            if obj_previous_shared_frames is not None and obj_previous_shared_frames is not self.obj_shared_frames:
+                obj_previous_frame_engine.arr_frames    =   None
+                obj_previous_shared_frames.release()
+
+            #Log message
+            self.obj_logger.info(f"Reload              :  Applied at tick {int_tick_count}, rebuilt in {float_rebuild*1000:.1f} ms, swapped in after {(utils.time.perf_counter() - float_start)*1000:.1f} ms, "
+                                 f"{dict_diff['arr_added_addresses'].size} registers added, {dict_diff['arr_removed_addresses'].size} removed, {dict_diff['int_changed_count']} with changed data")
 
     async def async_helper(self):
         
@@ -100,12 +570,29 @@ class DataSimStartServer:
         #                       2.  Starts the async modbus server
         #=====================================================================================
 
+        #Reload the frame source when the config files change
+        if self.bool_watch:
+            self.obj_watch_task     =   utils.asyncio.create_task(self.watch_config_files())
+
         #Calling async server
         await self.obj_modbus_server.start_async_server   (  
-                                                            dict_data               =   self.dict_add_csv,          
+                                                            obj_frame_engine        =   self.obj_frame_engine,
                                                             str_server_ip_address   =   self.str_server_ip_address,
                                                             str_server_port         =   self.str_server_port, 
                                                             str_server_unit_id      =   self.str_server_unit_id,
                                                             float_publish_interval  =   self.float_publish_interval,
+                                                            str_overrun_policy      =   self.str_overrun_policy,
+                                                            int_log_trace_every     =   self.int_log_trace_every,
+                                                            tuple_log_trace_range   =   self.tuple_log_trace_range,
+                                                            obj_stats_queue         =   self.obj_stats_queue,
+                                                            str_worker_name         =   self.str_worker_name,
+                                                            int_metrics_port        =   self.int_metrics_port,
+                                                            bool_profile            =   self.str_profile_mode is not None,
+                                                            obj_fault_injector      =   self.obj_fault_injector,
+                                                            bool_prepare_ahead      =   self.bool_prepare_ahead,
+                                                            obj_traffic_recorder    =   self.obj_traffic_recorder,
+                                                            bool_response_cache     =   self.bool_response_cache,
+                                                            str_transport           =   self.str_transport,
+                                                            str_framer              =   self.str_framer,
                                                             obj_logger              =   self.obj_logger
                                                         )
\ No newline at end of file
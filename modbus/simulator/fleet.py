@@ -0,0 +1,125 @@
+#=========================================================================================
+#   Name        :   fleet.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Gets inputs using argument parser:
+#                       a.  fleet config CSV, or
+#                       b.  asset, total devices, workers and bind mode
+#                   2.  Generates the test data of the fleet assets once for every worker
+#                   3.  Starts one simulator worker per core and supervises the fleet
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from server import fleet_launcher
+import generate_test_data
+
+#Function Definitions
+def parse_args():
+
+    #=====================================================================================
+    #   Function Name  :  parse_args
+    #   Description    :  Parses the fleet command line arguments
+    #=====================================================================================
+
+    #Initialize argument parser
+    parser = utils.argparse.ArgumentParser(description='Arguments for Starting a Data Simulator Fleet')
+
+    #Define command line arguments
+    parser.add_argument(
+                            '--config',
+                            type    =   str,
+                            help    =   'Enter the fleet config CSV name in modbus/config/csv (one worker per row), overrides the asset options',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--asset',
+                            type    =   str,
+                            help    =   'Enter the asset type that you want to simulate modbus data for',
+                            default =   utils.STR_DEFAULT_ASSET_TYPE
+                        )
+    parser.add_argument(
+                            '--devices',
+                            type    =   int,
+                            help    =   'Enter the total number of virtual devices to split across the workers',
+                            default =   utils.INT_DEFAULT_DEVICE_COUNT
+                        )
+    parser.add_argument(
+                            '--workers',
+                            type    =   int,
+                            help    =   'Enter the number of worker processes, defaults to one per core',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--bind',
+                            type    =   str,
+                            help    =   'Enter how workers are bound: port (one port per worker) or ip (one loopback IP per worker)',
+                            choices =   utils.LIST_FLEET_BIND_MODES,
+                            default =   utils.STR_DEFAULT_FLEET_BIND_MODE
+                        )
+    parser.add_argument(
+                            '--ip',
+                            type    =   str,
+                            help    =   'Enter the IP address the workers bind to in port mode',
+                            default =   utils.STR_DEFAULT_FLEET_IP_ADDRESS
+                        )
+    parser.add_argument(
+                            '--base_port',
+                            type    =   int,
+                            help    =   'Enter the port of the first worker',
+                            default =   utils.INT_DEFAULT_FLEET_BASE_PORT
+                        )
+    parser.add_argument(
+                            '--phase_step',
+                            type    =   int,
+                            help    =   'Enter the number of data rows each virtual device plays ahead of the previous one',
+                            default =   utils.INT_DEFAULT_PHASE_STEP
+                        )
+    parser.add_argument(
+                            '--metrics_base_port',
+                            type    =   int,
+                            help    =   'Enter the metrics HTTP port of the first worker, the others count up from it (disabled by default)',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--pub_int',
+                            type    =   float,
+                            help    =   'Enter the publish interval of data',
+                            default =   utils.FLOAT_DEFAULT_PUBLISH_INTERVAL
+                        )
+
+    return parser.parse_args()
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Parse command line arguments
+    args                        =   parse_args()
+    str_fleet_config_filepath   =   os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, args.config+'.csv') if args.config else None
+
+    #Fleet of workers from the config or split across the cores
+    obj_fleet                   =   fleet_launcher.DataSimFleet (
+                                                                    str_fleet_config_filepath   =   str_fleet_config_filepath,
+                                                                    str_asset_type              =   args.asset,
+                                                                    int_device_count            =   args.devices,
+                                                                    int_worker_count            =   args.workers,
+                                                                    str_bind_mode               =   args.bind,
+                                                                    str_ip_address              =   args.ip,
+                                                                    int_base_port               =   args.base_port,
+                                                                    int_phase_step              =   args.phase_step,
+                                                                    float_publish_interval      =   args.pub_int,
+                                                                    int_metrics_base_port       =   args.metrics_base_port
+                                                                )
+
+    #Generate the test data of the fleet assets once for all workers
+    generate_test_data.generate(list_asset_types=sorted({dict_worker['str_asset_type'] for dict_worker in obj_fleet.list_workers}))
+
+    #Start and supervise the fleet
+    obj_fleet.run()
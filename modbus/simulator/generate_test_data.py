@@ -8,9 +8,18 @@
 #                   2.  Creates a new tag_data file in the same folder which stores the data
 #                   3.  The tag_data file has timestamped data for all tags
 #                   4.  The data is different according to the data type assigned
-#                   5.  Data types are( Short,BOOL,Word,DWord)
+#                   5.  Data types are( Short,BOOL,Word,DWord,Int32,UInt32,Float32,Int64)
 #                   6.  This script also scales the values and assigns an offset
 #                   7.  The tag_data file is then used by start.py to run the simulator
+#                   8.  Generation is incremental: an asset is only regenerated when its
+#                       tag list, the generation parameters or the generator version
+#                       changed, recorded in a stamp file next to the output
+#                   9.  Outputs are written atomically (temp file + rename) under a file
+#                       lock so parallel starts on a shared mount don't clobber each other
+#                   10. Values are computed a whole chunk of rows at a time with array ops
+#                       per data type, scaling and offset, and streamed to the CSV chunk
+#                       by chunk, so memory stays bounded for large tag lists and long
+#                       durations
 #============================================================================================
 
 #Set path to current directory
@@ -21,85 +30,229 @@ sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
 #Import libraries
 from core import utils
 import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+import hashlib
+import fcntl
+import json
 
 #Variable definition
-INT_TEST_DATA_DURATION  =   60
+STR_TEST_DATA_DURATION  =   '60min'
+STR_TEST_DATA_PERIOD    =   '1min'
+INT_CHUNK_CELLS         =   2_000_000
+STR_GENERATOR_VERSION   =   '3'
 LIST_TAG_LIST_FILENAMES =   [
                                 'default_tag_list',
                                 'bms_tag_list',
                                 'cnv_tag_list',
                                 'inv_tag_list'
                             ]
+#Base models for each data type, as a function of the row (step) index
+DICT_BASE_MODELS        =   {
+                                'Short'     :   lambda arr_steps: (arr_steps % 60) - 30,
+                                'Bool'      :   lambda arr_steps: arr_steps % 2,
+                                'Word'      :   lambda arr_steps: arr_steps % 60,
+                                #32 and 64 bit types span more than one register
+                                'DWord'     :   lambda arr_steps: (arr_steps % 60) * 100000,
+                                'UInt32'    :   lambda arr_steps: (arr_steps % 60) * 100000,
+                                'Int32'     :   lambda arr_steps: ((arr_steps % 60) - 30) * 100000,
+                                'Int64'     :   lambda arr_steps: ((arr_steps % 60) - 30) * 10**10,
+                                'Float32'   :   lambda arr_steps: np.round(np.sin(2 * np.pi * (arr_steps % 60) / 60) * 100, 3)
+                            }
+
 #Function Definitions
-def generate():
+def get_generation_stamp(str_tag_list_filepath, dict_generation_params):
+
+    #=====================================================================================
+    #   Function Name  :  get_generation_stamp
+    #   Description    :  Returns what the generated data depends on: the tag list hash,
+    #                     the generation parameters and the generator version
+    #=====================================================================================
+
+    with open(str_tag_list_filepath, 'rb') as obj_file:
+        str_tag_list_hash   =   hashlib.sha1(obj_file.read()).hexdigest()
+
+    return  {
+                'str_tag_list_hash'         :   str_tag_list_hash,
+                **dict_generation_params,
+                'str_generator_version'     :   STR_GENERATOR_VERSION
+            }
+
+def get_row_count(str_duration, str_sample_period):
+
+    #=====================================================================================
+    #   Function Name  :  get_row_count
+    #   Description    :  Returns the number of samples of str_sample_period that fit in
+    #                     str_duration, e.g. '1D' at '1s' is 86400 rows
+    #=====================================================================================
+
+    obj_period  =   pd.Timedelta(str_sample_period)
+    if obj_period <= pd.Timedelta(0):
+        raise ValueError(f"\nSample period must be positive: {str_sample_period}")
+
+    return int(pd.Timedelta(str_duration) // obj_period)
+
+def write_atomic(str_output_path, func_write):
+
+    #=====================================================================================
+    #   Function Name  :  write_atomic
+    #   Description    :  Calls func_write with a temporary path in the output folder and
+    #                     renames it over the output, readers never see a partial file
+    #=====================================================================================
+
+    str_temp_path   =   f"{str_output_path}.{os.getpid()}.tmp"
+
+    try:
+        func_write(str_temp_path)
+        os.replace(str_temp_path, str_output_path)
+    finally:
+        if os.path.exists(str_temp_path):
+            os.remove(str_temp_path)
+
+def write_stamp(str_stamp_path, dict_stamp):
+
+    #=====================================================================================
+    #   Function Name  :  write_stamp
+    #   Description    :  Writes the generation stamp as JSON
+    #=====================================================================================
+
+    with open(str_stamp_path, 'w') as obj_stamp_file:
+        json.dump(dict_stamp, obj_stamp_file, indent=4)
+
+def generate_tag_data(str_tag_list_filepath, str_output_path, **kwargs):
+
+    #=====================================================================================
+    #   Function Name  :  generate_tag_data
+    #   Description    :  This function does the following:
+    #                       1.  Groups the tag columns by data type
+    #                       2.  For each chunk of rows, fills every group with its base
+    #                           model in one broadcast and applies scaling and offset to
+    #                           the whole chunk
+    #                       3.  Streams the chunks to a temporary CSV and renames it over
+    #                           the output, returns the number of rows written
+    #=====================================================================================
+
+    #Extract keyword args
+    str_duration        =   kwargs.get('str_duration', STR_TEST_DATA_DURATION)
+    str_sample_period   =   kwargs.get('str_sample_period', STR_TEST_DATA_PERIOD)
+    int_chunk_cells     =   kwargs.get('int_chunk_cells', INT_CHUNK_CELLS)
+
+    #Read the tag list 
+    df_tag_list         =   pd.read_csv(str_tag_list_filepath)
+    list_tag_names      =   df_tag_list['name'].tolist()
+    arr_data_types      =   df_tag_list['data type'].to_numpy(dtype=object)
+    arr_scaling         =   df_tag_list['scaling'].to_numpy()
+    arr_offset          =   df_tag_list['offset'].to_numpy()
+
+    #Validate the data types
+    for str_data_type in pd.unique(arr_data_types):
+        if str_data_type not in DICT_BASE_MODELS:
+            raise ValueError(f"\nUnknown data type: {str_data_type}")
+
+    #Columns of each data type, values stay integers unless scaling, offset or a Float32 tag are not
+    dict_type_columns   =   {str_data_type: np.flatnonzero(arr_data_types == str_data_type) for str_data_type in DICT_BASE_MODELS}
+    obj_value_dtype     =   np.result_type(arr_scaling, arr_offset, np.float64 if (arr_data_types == 'Float32').any() else np.int64)
+
+    #Row count and chunk size
+    int_row_count       =   get_row_count(str_duration, str_sample_period)
+    int_chunk_rows      =   max(1, int_chunk_cells // max(len(list_tag_names), 1))
+    obj_sample_period   =   pd.Timedelta(str_sample_period)
+    obj_start_time      =   pd.Timestamp.now()
+
+    def write_chunks(str_temp_path):
+
+        with open(str_temp_path, 'w', newline='') as obj_file:
+
+            #Header
+            pd.DataFrame(columns=[utils.STR_DEFAULT_TIME_COLUMN_IDENTIFIER]+list_tag_names).to_csv(obj_file, index=False)
+
+            for int_start in range(0, int_row_count, int_chunk_rows):
+
+                arr_steps   =   np.arange(int_start, min(int_start + int_chunk_rows, int_row_count))
+
+                #Base model per data type, broadcast over its columns
+                arr_values  =   np.empty((arr_steps.size, len(list_tag_names)), dtype=obj_value_dtype)
+                for str_data_type, arr_columns in dict_type_columns.items():
+                    if arr_columns.size:
+                        arr_values[:, arr_columns]  =   DICT_BASE_MODELS[str_data_type](arr_steps)[:, None]
+
+                #Apply scaling and offset
+                np.multiply(arr_values, arr_scaling, out=arr_values)
+                np.add(arr_values, arr_offset, out=arr_values)
+
+                #Append the chunk, formatting numbers with str like to_csv does but without
+                #the per column overhead that dominates for wide tag lists
+                list_timestamps =   pd.date_range(start=obj_start_time + int_start * obj_sample_period, periods=arr_steps.size, freq=obj_sample_period).astype(str).tolist()
+                obj_file.write(''.join(f"{str_timestamp},{','.join(map(str, list_row))}\n" for str_timestamp, list_row in zip(list_timestamps, arr_values.tolist())))
+
+    #Save the chunks to a CSV file
+    os.makedirs(os.path.dirname(str_output_path), exist_ok=True)
+    write_atomic(str_output_path, write_chunks)
+
+    return int_row_count
+
+def generate(**kwargs):
         
     #=====================================================================================
     #   Function Name  :  generate
-    #   Description    :  Generates test data using base models for different data types
+    #   Description    :  This function does the following:
+    #                       1.  Generates test data using base models for different data
+    #                           types, for the requested assets only (all by default)
+    #                       2.  Skips an asset whose stamp still matches its tag list,
+    #                           generation parameters and generator version
+    #                       3.  Holds a per output file lock while checking and writing
     #=====================================================================================
 
+    #Extract keyword args
+    list_asset_types    =   kwargs.get('list_asset_types', None)
+    bool_force          =   kwargs.get('bool_force', False)
+    str_duration        =   kwargs.get('str_duration', STR_TEST_DATA_DURATION)
+    str_sample_period   =   kwargs.get('str_sample_period', STR_TEST_DATA_PERIOD)
+
+    #Parameters the generated data depends on
+    dict_generation_params  =   {'str_duration': str_duration, 'str_sample_period': str_sample_period}
+
+    #Tag lists of the requested assets
+    list_tag_list_filenames =   LIST_TAG_LIST_FILENAMES if list_asset_types is None else [str_asset_type+'_tag_list' for str_asset_type in list_asset_types]
+
     #Print message
     print(f"\n{'='*24}\n{' '*3}Generate Test Data\n{'='*24}")
-    print(f"\nTag Lists:",*LIST_TAG_LIST_FILENAMES,sep='\n')
+    print(f"\nTag Lists:",*list_tag_list_filenames,sep='\n')
 
     #Create a dict of the file paths with filenames
-    dict_tag_list_filepaths =   {filename: os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, filename+'.csv') for filename in LIST_TAG_LIST_FILENAMES}
+    dict_tag_list_filepaths =   {filename: os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, filename+'.csv') for filename in list_tag_list_filenames}
 
     #Loop through all the tag lists 
     for str_tag_list_filepath in dict_tag_list_filepaths.values():
     
         try:
-            #Read the tag list 
-            df_tag_list     =   pd.read_csv(str_tag_list_filepath)
-
-            #Initialize the DataFrame with a Timestamp column
-            obj_start_time      =   datetime.now()
-            list_timestamps     =   [obj_start_time + timedelta(minutes=i) for i in range(INT_TEST_DATA_DURATION)]
-            dict_tag_data       =   {'Timestamp': list_timestamps}
-
-            #Generate data for each register, '_' ignore timestamp column
-            for _, row in df_tag_list.iterrows():
-
-                #Define column names for the tag lists csv
-                register_name   =   row['name']
-                str_data_type   =   row['data type']
-                scaling         =   row['scaling']
-                offset          =   row['offset']
-                
-                #Base models for each data type
-                if str_data_type == 'Short':
-                    values  =   [(i % 60) - 30 for i in range(INT_TEST_DATA_DURATION)]
-                elif str_data_type == 'Bool':
-                    values =    [i % 2 for i in range(INT_TEST_DATA_DURATION)]
-                elif str_data_type == 'Word':
-                    values =    [i % 60 for i in range(INT_TEST_DATA_DURATION)]
-                elif str_data_type == 'DWord':
-                    values =    [i % 60 for i in range(INT_TEST_DATA_DURATION)]
-                else:
-                    raise ValueError(f"\nUnknown data type: {str_data_type}")
-
-                #Apply scaling and offset
-                values = [v * scaling + offset for v in values]
-
-                #Add the values to the DataFrame
-                dict_tag_data[register_name] = values
-            
-            #Create the DataFrame
-            df = pd.DataFrame(dict_tag_data)
-
             #Generate the output filename by replacing "list" with "data"
             output_filename = os.path.basename(str_tag_list_filepath).replace("list", "data_auto_gen")
 
             #Update output path
             str_output_path = os.path.join(utils.STR_DEFAULT_CONFIG_FILEPATH, output_filename)
+            str_stamp_path  = str_output_path.replace('.csv', '.stamp.json')
+
+            dict_stamp      = get_generation_stamp(str_tag_list_filepath, dict_generation_params)
+
+            #One process generates an asset at a time, the others wait and then skip
+            with open(str_output_path+'.lock', 'a+') as obj_lock_file:
+
+                fcntl.flock(obj_lock_file, fcntl.LOCK_EX)
 
-            #Save the DataFrame to a CSV file
-            os.makedirs(os.path.dirname(str_output_path), exist_ok=True)
-            df.to_csv(str_output_path, index=False)
+                #Skip outputs that are up to date
+                if not bool_force and os.path.exists(str_output_path) and os.path.exists(str_stamp_path):
+                    with open(str_stamp_path) as obj_stamp_file:
+                        if json.load(obj_stamp_file) == dict_stamp:
+                            print(f"\nTest Data Up To Date: {output_filename}")
+                            continue
+
+                generate_tag_data(str_tag_list_filepath, str_output_path, str_duration=str_duration, str_sample_period=str_sample_period)
+
+                #Stamp last, an interrupted run regenerates next time
+                write_atomic(str_stamp_path, lambda str_temp_path: write_stamp(str_temp_path, dict_stamp))
 
             #Print message
-            print(f"\nTest Data Generated: {os.path.basename(str_output_path)}")
+            print(f"\nTest Data Generated: {output_filename}")
         
         #Raise file exception
         except FileNotFoundError:
@@ -112,5 +265,33 @@ def generate():
 #Main entry point when script is run directly
 if __name__ == '__main__':
 
+    #Initialize argument parser
+    parser = utils.argparse.ArgumentParser(description='Arguments for Generating Test Data')
+    parser.add_argument(
+                            '--asset',
+                            type    =   str,
+                            nargs   =   '*',
+                            help    =   'Enter the asset types to generate test data for (default: all)',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--duration',
+                            type    =   str,
+                            help    =   'Enter the duration of the generated data, e.g. 60min, 1D',
+                            default =   STR_TEST_DATA_DURATION
+                        )
+    parser.add_argument(
+                            '--sample_period',
+                            type    =   str,
+                            help    =   'Enter the time between generated rows, e.g. 1min, 1s',
+                            default =   STR_TEST_DATA_PERIOD
+                        )
+    parser.add_argument(
+                            '--force',
+                            action  =   'store_true',
+                            help    =   'Regenerate the test data even if it is up to date'
+                        )
+    args = parser.parse_args()
+
     #Function Call
-    generate()
+    generate(list_asset_types=args.asset, bool_force=args.force, str_duration=args.duration, str_sample_period=args.sample_period)
@@ -0,0 +1,214 @@
+#=========================================================================================
+#   Name        :   load_test.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Gets inputs using argument parser:
+#                       a.  targets, register ranges, unit IDs and function code
+#                       b.  connections, rate per connection, duration, timeout and
+#                           client processes
+#                       c.  transport (tcp, udp) and framer (socket, rtu)
+#                       d.  optional JSON report and pass/fail thresholds
+#                   2.  Runs the Modbus TCP/UDP load generator against the simulators
+#                   3.  Prints the report and exits with 1 if a threshold is missed
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from client import load_generator
+import json
+
+#Function Definitions
+def parse_args():
+
+    #=====================================================================================
+    #   Function Name  :  parse_args
+    #   Description    :  Parses the load test command line arguments
+    #=====================================================================================
+
+    #Initialize argument parser
+    parser = utils.argparse.ArgumentParser(description='Arguments for Running a Modbus TCP/UDP Load Test against Data Simulators')
+
+    #Define command line arguments
+    parser.add_argument(
+                            '--targets',
+                            type    =   str,
+                            help    =   'Enter the simulators to poll as host:port separated by commas, connections are spread round robin',
+                            default =   utils.STR_DEFAULT_LOAD_TARGETS
+                        )
+    parser.add_argument(
+                            '--ranges',
+                            type    =   str,
+                            help    =   'Enter the register address ranges to poll as start:end separated by commas, split into reads of at most 125 registers',
+                            default =   utils.STR_DEFAULT_LOAD_RANGES
+                        )
+    parser.add_argument(
+                            '--unit_ids',
+                            type    =   str,
+                            help    =   'Enter the unit IDs to poll, e.g. 1 or 1-100 or 1,5,7-9',
+                            default =   utils.STR_DEFAULT_LOAD_UNIT_IDS
+                        )
+    parser.add_argument(
+                            '--function_code',
+                            type    =   int,
+                            help    =   'Enter the read function code: 3 (holding registers) or 4 (input registers)',
+                            choices =   utils.LIST_LOAD_FUNCTION_CODES,
+                            default =   utils.DEFAULT_HOLDING_REG_FUNCTION_CODE_HEX
+                        )
+    parser.add_argument(
+                            '--connections',
+                            type    =   int,
+                            help    =   'Enter the number of concurrent client connections',
+                            default =   utils.INT_DEFAULT_LOAD_CONNECTIONS
+                        )
+    parser.add_argument(
+                            '--rate',
+                            type    =   float,
+                            help    =   'Enter the target requests/s of each connection, 0 polls as fast as the server answers',
+                            default =   utils.FLOAT_DEFAULT_LOAD_RATE
+                        )
+    parser.add_argument(
+                            '--duration',
+                            type    =   float,
+                            help    =   'Enter the length of the load test in seconds',
+                            default =   utils.FLOAT_DEFAULT_LOAD_DURATION
+                        )
+    parser.add_argument(
+                            '--timeout',
+                            type    =   float,
+                            help    =   'Enter the response timeout in seconds',
+                            default =   utils.FLOAT_DEFAULT_LOAD_TIMEOUT
+                        )
+    parser.add_argument(
+                            '--processes',
+                            type    =   int,
+                            help    =   'Enter the number of client processes the connections are split across',
+                            default =   utils.INT_DEFAULT_LOAD_PROCESSES
+                        )
+    parser.add_argument(
+                            '--transport',
+                            type    =   str,
+                            choices =   utils.LIST_MODBUS_TRANSPORTS,
+                            help    =   'Enter the transport of the simulators, every UDP connection is its own socket',
+                            default =   utils.STR_DEFAULT_MODBUS_TRANSPORT
+                        )
+    parser.add_argument(
+                            '--framer',
+                            type    =   str,
+                            choices =   utils.LIST_MODBUS_FRAMERS,
+                            help    =   'Enter the framing of the simulators, socket (MBAP) or rtu',
+                            default =   utils.STR_DEFAULT_MODBUS_FRAMER
+                        )
+    parser.add_argument(
+                            '--json',
+                            type    =   str,
+                            help    =   'Enter a file path to write the report to as JSON',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--min_rps',
+                            type    =   float,
+                            help    =   'Fail if the achieved requests/s is below this value',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--max_p99_ms',
+                            type    =   float,
+                            help    =   'Fail if the p99 latency in ms is above this value',
+                            default =   None
+                        )
+    parser.add_argument(
+                            '--max_timeouts',
+                            type    =   int,
+                            help    =   'Fail if the number of timeouts is above this value',
+                            default =   None
+                        )
+
+    return parser.parse_args()
+
+def print_report(dict_summary, args):
+
+    #=====================================================================================
+    #   Function Name  :  print_report
+    #   Description    :  Prints the load test report, the byte counts are labelled with
+    #                     the framer and transport of the run
+    #=====================================================================================
+
+    str_protocol    =   f"Modbus {'RTU over ' if args.framer == 'rtu' else ''}{args.transport.upper()}"
+
+    print(f"\n{'='*30}\n{' '*4}Modbus Load Test Report\n{'='*30}")
+    print(f"Connections         :   {dict_summary['int_connection_count']} over {dict_summary['int_process_count']} processes, {dict_summary['float_seconds']:.1f}s")
+    print(f"Requests            :   {dict_summary['int_requests']} sent, {dict_summary['int_responses']} answered, {dict_summary['int_exceptions']} exceptions")
+    print(f"Failures            :   {dict_summary['int_timeouts']} timeouts, {dict_summary['int_errors']} connection errors, {dict_summary['int_reconnects']} reconnects")
+    print(f"Throughput          :   {dict_summary['float_requests_per_s']:.0f} req/s (target {dict_summary['float_target_rate'] or 'unthrottled'}), {dict_summary['float_registers_per_s']:.0f} registers/s")
+
+    if dict_summary['float_latency_mean_ms'] is not None:
+        print(f"Latency (ms)        :   mean {dict_summary['float_latency_mean_ms']:.2f}, "
+              + ", ".join(f"p{float_percentile:g} {dict_summary[f'float_latency_p{float_percentile:g}_ms']:.2f}" for float_percentile in load_generator.LIST_LATENCY_PERCENTILES)
+              + f", max {dict_summary['float_latency_max_ms']:.2f}")
+
+    print(f"Bytes               :   {dict_summary['int_bytes_sent']} sent, {dict_summary['int_bytes_received']} received ({str_protocol}), "
+          f"{dict_summary['int_wire_bytes']} on the wire incl. {args.transport.upper()}/IP headers, {dict_summary['float_wire_bits_per_s']/1e6:.3f} Mbit/s")
+
+def check_thresholds(dict_summary, args):
+
+    #=====================================================================================
+    #   Function Name  :  check_thresholds
+    #   Description    :  Returns the list of missed thresholds
+    #=====================================================================================
+
+    list_failures   =   []
+
+    if args.min_rps is not None and dict_summary['float_requests_per_s'] < args.min_rps:
+        list_failures.append(f"{dict_summary['float_requests_per_s']:.0f} req/s is below {args.min_rps:g}")
+    if args.max_p99_ms is not None and (dict_summary['float_latency_p99_ms'] is None or dict_summary['float_latency_p99_ms'] > args.max_p99_ms):
+        list_failures.append(f"p99 latency {dict_summary['float_latency_p99_ms']} ms is above {args.max_p99_ms:g}")
+    if args.max_timeouts is not None and dict_summary['int_timeouts'] > args.max_timeouts:
+        list_failures.append(f"{dict_summary['int_timeouts']} timeouts is above {args.max_timeouts}")
+
+    return list_failures
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Parse command line arguments
+    args                =   parse_args()
+
+    #Run the load
+    obj_load_generator  =   load_generator.DataSimLoadGenerator (
+                                                                    str_targets             =   args.targets,
+                                                                    str_ranges              =   args.ranges,
+                                                                    str_unit_ids            =   args.unit_ids,
+                                                                    int_function_code       =   args.function_code,
+                                                                    int_connection_count    =   args.connections,
+                                                                    float_rate              =   args.rate,
+                                                                    float_duration          =   args.duration,
+                                                                    float_timeout           =   args.timeout,
+                                                                    int_process_count       =   args.processes,
+                                                                    str_transport           =   args.transport,
+                                                                    str_framer              =   args.framer
+                                                                )
+
+    #Print message
+    print(f"Load Test           :   {args.connections} {args.transport} connections ({args.framer} framer) to {args.targets}, {len(obj_load_generator.list_requests)} reads per cycle, {args.duration:g}s")
+
+    dict_summary        =   obj_load_generator.run()
+    print_report(dict_summary, args)
+
+    #Write the JSON report
+    if args.json:
+        with open(args.json, 'w') as obj_file:
+            json.dump(dict_summary, obj_file, indent=4)
+
+    #Gate on the thresholds
+    list_failures       =   check_thresholds(dict_summary, args)
+    for str_failure in list_failures:
+        print(f"Threshold Missed    :   {str_failure}")
+
+    sys.exit(1 if list_failures else 0)
@@ -0,0 +1,137 @@
+#=========================================================================================
+#   Name        :   replay.py
+#   Date        :   4/10/2023
+#   Version     :   1.0
+#   Author      :   Shayan Sharif Zahid
+#   Description :   This module does the following:
+#                   1.  Gets inputs using argument parser:
+#                       a.  request journal recorded with start.py --record
+#                       b.  targets, speed, timeout and whether writes are replayed
+#                       c.  transport (tcp, udp) and framer (socket, rtu)
+#                       d.  optional JSON report
+#                   2.  Replays the recorded traffic against the simulators
+#                   3.  Prints the report
+#=========================================================================================
+
+#Set path to current directory
+import sys
+import os
+sys.path.append(os.path.join(os.sep,"ess_datasim","modbus","lib"))
+
+#Import libraries
+from core import utils
+from client import load_generator
+from client import traffic_replayer
+import json
+
+#Function Definitions
+def parse_args():
+
+    #=====================================================================================
+    #   Function Name  :  parse_args
+    #   Description    :  Parses the replay command line arguments
+    #=====================================================================================
+
+    #Initialize argument parser
+    parser = utils.argparse.ArgumentParser(description='Arguments for Replaying a Recorded Request Journal against Data Simulators')
+
+    #Define command line arguments
+    parser.add_argument(
+                            'journal',
+                            type    =   str,
+                            help    =   'Enter the request journal recorded with start.py --record'
+                        )
+    parser.add_argument(
+                            '--targets',
+                            type    =   str,
+                            help    =   'Enter the simulators to replay against as host:port separated by commas, recorded clients are spread round robin',
+                            default =   utils.STR_DEFAULT_LOAD_TARGETS
+                        )
+    parser.add_argument(
+                            '--speed',
+                            type    =   float,
+                            help    =   'Enter the replay speed, 1 replays at the recorded pace, 2 twice as fast, 0 sends every request as soon as the previous one is answered',
+                            default =   utils.FLOAT_DEFAULT_REPLAY_SPEED
+                        )
+    parser.add_argument(
+                            '--timeout',
+                            type    =   float,
+                            help    =   'Enter the response timeout in seconds',
+                            default =   utils.FLOAT_DEFAULT_REPLAY_TIMEOUT
+                        )
+    parser.add_argument(
+                            '--writes',
+                            action  =   'store_true',
+                            help    =   'Also replay the recorded writes, writing zeros since the journal holds no values'
+                        )
+    parser.add_argument(
+                            '--transport',
+                            type    =   str,
+                            choices =   utils.LIST_MODBUS_TRANSPORTS,
+                            help    =   'Enter the transport of the simulators, every recorded client gets its own UDP socket',
+                            default =   utils.STR_DEFAULT_MODBUS_TRANSPORT
+                        )
+    parser.add_argument(
+                            '--framer',
+                            type    =   str,
+                            choices =   utils.LIST_MODBUS_FRAMERS,
+                            help    =   'Enter the framing of the simulators, socket (MBAP) or rtu',
+                            default =   utils.STR_DEFAULT_MODBUS_FRAMER
+                        )
+    parser.add_argument(
+                            '--json',
+                            type    =   str,
+                            help    =   'Enter a file path to write the report to as JSON',
+                            default =   None
+                        )
+
+    return parser.parse_args()
+
+def print_report(dict_summary):
+
+    #=====================================================================================
+    #   Function Name  :  print_report
+    #   Description    :  Prints the replay report
+    #=====================================================================================
+
+    print(f"\n{'='*30}\n{' '*5}Modbus Replay Report\n{'='*30}")
+    print(f"Journal             :   {dict_summary['int_records']} requests over {dict_summary['float_recorded_seconds']:.1f}s from {dict_summary['int_connection_count']} clients, {dict_summary['int_skipped']} skipped")
+    print(f"Requests            :   {dict_summary['int_requests']} sent, {dict_summary['int_responses']} answered, {dict_summary['int_exceptions']} exceptions")
+    print(f"Failures            :   {dict_summary['int_timeouts']} timeouts, {dict_summary['int_errors']} connection errors, {dict_summary['int_reconnects']} reconnects")
+    print(f"Throughput          :   {dict_summary['float_requests_per_s']:.0f} req/s in {dict_summary['float_seconds']:.1f}s, {dict_summary['float_registers_per_s']:.0f} registers/s")
+
+    if dict_summary['float_latency_mean_ms'] is not None:
+        print(f"Latency (ms)        :   mean {dict_summary['float_latency_mean_ms']:.2f}, "
+              + ", ".join(f"p{float_percentile:g} {dict_summary[f'float_latency_p{float_percentile:g}_ms']:.2f}" for float_percentile in load_generator.LIST_LATENCY_PERCENTILES)
+              + f", max {dict_summary['float_latency_max_ms']:.2f}")
+
+    if dict_summary['float_lag_mean_ms'] is not None:
+        print(f"Schedule Lag (ms)   :   mean {dict_summary['float_lag_mean_ms']:.2f}, max {dict_summary['float_lag_max_ms']:.2f} behind the recorded pace at {dict_summary['float_speed']:g}x")
+
+#Main entry point when script is run directly
+if __name__ == '__main__':
+
+    #Parse command line arguments
+    args                    =   parse_args()
+
+    #Replay the journal
+    obj_traffic_replayer    =   traffic_replayer.DataSimTrafficReplayer (
+                                                                            str_journal_filepath    =   args.journal,
+                                                                            str_targets             =   args.targets,
+                                                                            float_speed             =   args.speed,
+                                                                            float_timeout           =   args.timeout,
+                                                                            bool_writes             =   args.writes,
+                                                                            str_transport           =   args.transport,
+                                                                            str_framer              =   args.framer
+                                                                        )
+
+    #Print message
+    print(f"Replay              :   {args.journal} to {args.targets} ({args.transport}, {args.framer} framer) at {f'{args.speed:g}x' if args.speed else 'maximum speed'}")
+
+    dict_summary            =   obj_traffic_replayer.run()
+    print_report(dict_summary)
+
+    #Write the JSON report
+    if args.json:
+        with open(args.json, 'w') as obj_file:
+            json.dump(dict_summary, obj_file, indent=4)
@@ -47,8 +47,21 @@ parser.add_argument(
 parser.add_argument(
                         '--sample_duration',
                         type    =   str,
-                        help    =   'Enter the time duration for data simulation',
-                        default =    '1T'
+                        help    =   'Enter the period the tag data is resampled to at load time, e.g. 1s, 1min',
+                        default =    utils.STR_DEFAULT_SAMPLE_DURATION
+                    )
+parser.add_argument(
+                        '--resample_method',
+                        type    =   str,
+                        help    =   'Enter the resample method (interpolate, ffill, nearest) for all tags, or per data type e.g. Word=ffill,Short=interpolate (default: ffill for Bool, interpolate otherwise)',
+                        default =    None
+                    )
+parser.add_argument(
+                        '--playback',
+                        type    =   str,
+                        choices =   utils.LIST_PLAYBACK_MODES,
+                        help    =   'Enter the playback mode: row publishes the next row every tick, timestamp advances the rows with the publish interval over the sample duration',
+                        default =    utils.STR_DEFAULT_PLAYBACK_MODE
                     )
 parser.add_argument(
                         '--asset',
@@ -62,6 +75,176 @@ parser.add_argument(
                         help    =   'Enter the publish interval of data',
                         default =    utils.FLOAT_DEFAULT_PUBLISH_INTERVAL
                     )
+parser.add_argument(
+                        '--overrun_policy',
+                        type    =   str,
+                        help    =   'Enter the policy for ticks that finish late: skip, catchup or stretch',
+                        choices =   utils.LIST_OVERRUN_POLICIES,
+                        default =    utils.STR_DEFAULT_OVERRUN_POLICY
+                    )
+parser.add_argument(
+                        '--log_mode',
+                        type    =   str,
+                        help    =   'Enter the log mode: queue (file I/O on a background thread) or sync',
+                        choices =   utils.LIST_LOG_MODES,
+                        default =    utils.STR_DEFAULT_LOG_MODE
+                    )
+parser.add_argument(
+                        '--log_max_bytes',
+                        type    =   int,
+                        help    =   'Enter the log file size in bytes that triggers a rotation',
+                        default =    utils.INT_DEFAULT_LOG_MAX_BYTES
+                    )
+parser.add_argument(
+                        '--log_backups',
+                        type    =   int,
+                        help    =   'Enter the number of rotated log files to keep',
+                        default =    utils.INT_DEFAULT_LOG_BACKUP_COUNT
+                    )
+parser.add_argument(
+                        '--log_trace_every',
+                        type    =   int,
+                        help    =   'Enter N to log every register value once every N ticks (0 disables the trace)',
+                        default =    utils.INT_DEFAULT_LOG_TRACE_EVERY
+                    )
+parser.add_argument(
+                        '--log_trace_range',
+                        type    =   str,
+                        help    =   'Enter the register address range to trace as start:end',
+                        default =    None
+                    )
+parser.add_argument(
+                        '--devices',
+                        type    =   int,
+                        help    =   'Enter the number of virtual devices (unit IDs from --unit_id upwards) served on the port',
+                        default =    utils.INT_DEFAULT_DEVICE_COUNT
+                    )
+parser.add_argument(
+                        '--phase_step',
+                        type    =   int,
+                        help    =   'Enter the number of data rows each virtual device plays ahead of the previous one',
+                        default =    utils.INT_DEFAULT_PHASE_STEP
+                    )
+parser.add_argument(
+                        '--phase_offset',
+                        type    =   int,
+                        help    =   'Enter the number of data rows the first virtual device plays ahead, so devices split over several servers keep distinct phases',
+                        default =    0
+                    )
+parser.add_argument(
+                        '--shared_frames',
+                        action  =   'store_true',
+                        help    =   'Share the decoded tag data with other simulator processes of the same asset through shared memory'
+                    )
+parser.add_argument(
+                        '--stream',
+                        action  =   'store_true',
+                        help    =   'Stream the tag data file through a prefetched ring buffer instead of loading it, for recordings too large for memory'
+                    )
+parser.add_argument(
+                        '--stream_file',
+                        type    =   str,
+                        help    =   'Enter the path of the recorded tag data CSV to stream (default: the asset tag data CSV)',
+                        default =   None
+                    )
+parser.add_argument(
+                        '--stream_buffer_rows',
+                        type    =   int,
+                        help    =   'Enter the number of upcoming frames buffered by the stream prefetch thread',
+                        default =   utils.INT_DEFAULT_STREAM_BUFFER_ROWS
+                    )
+parser.add_argument(
+                        '--stream_stop_at_eof',
+                        action  =   'store_true',
+                        help    =   'Hold the last frame at the end of the streamed file instead of looping'
+                    )
+parser.add_argument(
+                        '--signals',
+                        action  =   'store_true',
+                        help    =   'Compute procedural signals from the waveform columns of the tag list each tick instead of playing the tag data'
+                    )
+parser.add_argument(
+                        '--seed',
+                        type    =   int,
+                        help    =   'Enter the random seed of the procedural signals (random walk, noise and fault events)',
+                        default =   utils.INT_DEFAULT_SIGNAL_SEED
+                    )
+parser.add_argument(
+                        '--metrics_port',
+                        type    =   int,
+                        help    =   'Enter the HTTP port of the Prometheus metrics endpoint (disabled by default)',
+                        default =   None
+                    )
+parser.add_argument(
+                        '--profile',
+                        type    =   str,
+                        choices =   utils.LIST_PROFILE_MODES,
+                        help    =   'Enter the profiler (cprofile or sample) to capture --profile_seconds of the running server into the log directory, SIGUSR1 starts another capture',
+                        default =   None
+                    )
+parser.add_argument(
+                        '--profile_seconds',
+                        type    =   float,
+                        help    =   'Enter the length of a profile capture in seconds',
+                        default =   utils.FLOAT_DEFAULT_PROFILE_SECONDS
+                    )
+parser.add_argument(
+                        '--spans',
+                        action  =   'store_true',
+                        help    =   'Time the load, tick compute, datastore write and request spans from the start, SIGUSR2 toggles them at runtime'
+                    )
+parser.add_argument(
+                        '--faults',
+                        type    =   str,
+                        help    =   'Enter the fault config CSV (file name in config/csv or a path) to inject latency, bandwidth caps, drops, exceptions, resets and stalls into the responses',
+                        default =   None
+                    )
+parser.add_argument(
+                        '--fault_seed',
+                        type    =   int,
+                        help    =   'Enter the random seed of the fault probabilities and latency distributions',
+                        default =   utils.INT_DEFAULT_SIGNAL_SEED
+                    )
+parser.add_argument(
+                        '--prepare_ahead',
+                        action  =   'store_true',
+                        help    =   'Compute the next frame and write it into the back buffers in a worker thread before its deadline, the event loop only swaps the buffers'
+                    )
+parser.add_argument(
+                        '--watch',
+                        action  =   'store_true',
+                        help    =   'Reload the asset tag list and tag data when they change without restarting the server or dropping client connections'
+                    )
+parser.add_argument(
+                        '--transport',
+                        type    =   str,
+                        choices =   utils.LIST_MODBUS_TRANSPORTS,
+                        help    =   'Modbus transport, tcp or udp, both serve the same registers and tick engine',
+                        default =    utils.STR_DEFAULT_MODBUS_TRANSPORT
+                    )
+parser.add_argument(
+                        '--framer',
+                        type    =   str,
+                        choices =   utils.LIST_MODBUS_FRAMERS,
+                        help    =   'Modbus framing, socket (MBAP header) or rtu (RTU frames with CRC, e.g. RTU over TCP for serial gateways)',
+                        default =    utils.STR_DEFAULT_MODBUS_FRAMER
+                    )
+parser.add_argument(
+                        '--response_cache',
+                        action  =   'store_true',
+                        help    =   'Answer repeated reads of the same unit ID and range within a tick from a cache of encoded responses, cleared on every publish and client write'
+                    )
+parser.add_argument(
+                        '--record',
+                        type    =   str,
+                        help    =   'Enter the request journal (file name in the log directory or a path) to append every incoming request to, replay it with replay.py',
+                        default =   None
+                    )
+parser.add_argument(
+                        '--no_frame_cache',
+                        action  =   'store_true',
+                        help    =   'Parse the tag data CSVs on every start instead of memory mapping the compiled frame cache'
+                    )
 
 #Parse command line arguments
 args                        =   parser.parse_args()
@@ -69,8 +252,39 @@ str_type                    =   args.type
 str_port                    =   args.port
 str_unit_id                 =   args.unit_id
 str_sample_duration         =   args.sample_duration
+str_resample_method         =   args.resample_method
+str_playback_mode           =   args.playback
 str_asset_type              =   args.asset
 float_publish_interval      =   args.pub_int
+str_overrun_policy          =   args.overrun_policy
+str_log_mode                =   args.log_mode
+int_log_max_bytes           =   args.log_max_bytes
+int_log_backup_count        =   args.log_backups
+int_log_trace_every         =   args.log_trace_every
+str_log_trace_range         =   args.log_trace_range
+int_device_count            =   args.devices
+int_phase_step              =   args.phase_step
+int_phase_offset            =   args.phase_offset
+bool_shared_frames          =   args.shared_frames
+bool_frame_cache            =   not args.no_frame_cache
+bool_stream                 =   args.stream
+str_stream_filepath         =   args.stream_file
+int_stream_buffer_rows      =   args.stream_buffer_rows
+bool_stream_loop            =   not args.stream_stop_at_eof
+bool_signals                =   args.signals
+int_signal_seed             =   args.seed
+int_metrics_port            =   args.metrics_port
+str_profile_mode            =   args.profile
+float_profile_seconds       =   args.profile_seconds
+bool_spans                  =   args.spans
+str_fault_config_filepath   =   args.faults
+int_fault_seed              =   args.fault_seed
+bool_prepare_ahead          =   args.prepare_ahead
+bool_watch                  =   args.watch
+str_journal_filepath        =   args.record
+bool_response_cache         =   args.response_cache
+str_transport               =   args.transport
+str_framer                  =   args.framer
 
 #Main entry point when script is run directly
 if __name__ == '__main__':
@@ -78,8 +292,9 @@ if __name__ == '__main__':
     #If server type is modbus
     if str_type  ==  'modbus':
 
-        #Generate the latest test data before the start of the program
-        generate_test_data.generate()
+        #Generate the test data of this asset if its tag list changed, signals need none
+        if not bool_signals:
+            generate_test_data.generate(list_asset_types=[str_asset_type])
 
         #Log/print message
         print(f"\n{'='*30}\n{' '*4}Modbus Server Simulator\n{' '*10}Starting\n{'='*30}")
@@ -89,8 +304,40 @@ if __name__ == '__main__':
                                                 str_server_port             =   str_port,
                                                 str_server_unit_id          =   str_unit_id,
                                                 str_data_sample_duration    =   str_sample_duration,
+                                                str_resample_method         =   str_resample_method,
+                                                str_playback_mode           =   str_playback_mode,
                                                 str_asset_type              =   str_asset_type,
                                                 float_publish_interval      =   float_publish_interval,
+                                                str_overrun_policy          =   str_overrun_policy,
+                                                str_log_mode                =   str_log_mode,
+                                                int_log_max_bytes           =   int_log_max_bytes,
+                                                int_log_backup_count        =   int_log_backup_count,
+                                                int_log_trace_every         =   int_log_trace_every,
+                                                str_log_trace_range         =   str_log_trace_range,
+                                                int_device_count            =   int_device_count,
+                                                int_phase_step              =   int_phase_step,
+                                                int_phase_offset            =   int_phase_offset,
+                                                bool_shared_frames          =   bool_shared_frames,
+                                                bool_frame_cache            =   bool_frame_cache,
+                                                bool_stream                 =   bool_stream,
+                                                str_stream_filepath         =   str_stream_filepath,
+                                                int_stream_buffer_rows      =   int_stream_buffer_rows,
+                                                bool_stream_loop            =   bool_stream_loop,
+                                                bool_signals                =   bool_signals,
+                                                int_signal_seed             =   int_signal_seed,
+                                                int_metrics_port            =   int_metrics_port,
+                                                str_profile_mode            =   str_profile_mode,
+                                                float_profile_seconds       =   float_profile_seconds,
+                                                bool_spans                  =   bool_spans,
+                                                str_fault_config_filepath   =   str_fault_config_filepath,
+                                                int_fault_seed              =   int_fault_seed,
+                                                bool_prepare_ahead          =   bool_prepare_ahead,
+                                                bool_watch                  =   bool_watch,
+                                                str_journal_filepath        =   str_journal_filepath,
+                                                bool_response_cache         =   bool_response_cache,
+                                                str_transport               =   str_transport,
+                                                str_framer                  =   str_framer,
+                                                func_generate_test_data     =   lambda: generate_test_data.generate(list_asset_types=[str_asset_type]),
                                             )
     
     else: